@@ -1,11 +1,32 @@
 import os
-import hashlib
-import time
+import queue
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import json
+import contextlib
 from pathlib import Path
 
+import compare
+import duplicates
+import hash_engine
+import manifest
+from algorithms import available_algorithms
+from checkpoint import default_checkpoint_path
+from digest_cache import DigestCache
+from job_queue import JOB_DONE, JOB_FAILED, JOB_PENDING, JobQueue, parse_path_list
+from progress import ProgressTracker, format_duration
+from result_sink import (diff_summary_record, file_record, folder_file_record, folder_record, open_sink,
+                         status_record, verify_summary_record)
+from result_view import ResultView
+from scanner import TraversalSpec
+from task_runner import BackgroundTask
+
+# 可选：安装 tkinterdnd2 后批量任务列表支持从文件管理器拖入文件
+try:
+    from tkinterdnd2 import DND_FILES, TkinterDnD
+except ImportError:
+    TkinterDnD = None
+
 
 class LanguageManager:
     def __init__(self):
@@ -94,6 +115,7 @@ class LanguageManager:
             "file_count_different": "- 文件数量不同 (文件夹1: {}, 文件夹2: {})",
             "size_different": "- 总大小不同 (文件夹1: {:.2f} MB, 文件夹2: {:.2f} MB)",
             "processing": "正在处理: {} ({}/{})",
+            "processing_bytes": "正在处理: {} ({}/{} 个文件, {:.1f}/{:.1f} MB, {:.1f} MB/s, 剩余 {})",
             "calculating_file_hash": "正在计算文件哈希值...",
             "calculating_folder_hash": "正在计算文件夹哈希值...",
             "comparing_files": "正在计算并比较文件哈希值...",
@@ -124,7 +146,96 @@ class LanguageManager:
             "folder_hash_error": "计算文件夹哈希值时出错: {}",
             "exit_confirmation": "退出",
             "exit_message": "确定要退出程序吗？",
-            "all_files": "所有文件"
+            "all_files": "所有文件",
+            "cancel": "取消",
+            "cancelling": "正在取消...",
+            "task_cancelled": "任务已取消",
+            "task_running": "已有任务正在运行，请等待完成或先取消",
+            "parallel_mode": "文件夹并行计算 (逐文件摘要)",
+            "worker_count": "并行数:",
+            "use_digest_cache": "使用摘要缓存 (跳过未修改的文件)",
+            "digest_from_cache": "摘要来自缓存 (文件未修改)",
+            "cached_files": "缓存命中文件数: {}",
+            "algorithm_not_selected": "请至少选择一种哈希算法",
+            "create_manifest": "生成校验清单",
+            "verify_manifest": "按清单校验",
+            "fast_verify": "快速校验 (跳过清单生成后未修改的文件)",
+            "save_manifest": "保存校验清单",
+            "select_manifest": "选择校验清单",
+            "manifest_files": "校验清单",
+            "creating_manifest": "正在生成校验清单...",
+            "verifying_manifest": "正在按清单校验...",
+            "manifest_path": "校验清单: {}",
+            "manifest_created": "校验清单已生成 - 耗时: {:.2f} 秒",
+            "manifest_error": "生成校验清单时出错: {}",
+            "verify_error": "按清单校验时出错: {}",
+            "verify_summary": "一致: {}，未修改 (跳过): {}，缺失: {}，多余: {}，内容不一致: {}，无法读取: {}",
+            "verify_success": "✅ 文件夹与校验清单一致！",
+            "verify_fail": "❌ 文件夹与校验清单不一致！",
+            "unreadable_files": "无法读取的文件: {}",
+            "verify_complete": "校验完成 - 耗时: {:.2f} 秒",
+            "merkle_mode": "Merkle 目录树摘要 (逐目录合并)",
+            "fast_compare": "快速比较 (只比较内容，不计算哈希值，遇到第一个不同字节即停止)",
+            "bytes_compared": "已比较字节数: {}",
+            "content_match": "✅ 两个文件的内容完全一致！",
+            "content_size_differs": "❌ 两个文件的大小不同，内容不一致！",
+            "content_differs_at": "❌ 两个文件的内容不一致！第一个不同的字节位于偏移量 {}",
+            "folder_diff_mode": "逐文件比较 (列出新增、删除和修改的文件)",
+            "diff_added": "[新增]",
+            "diff_removed": "[删除]",
+            "diff_modified": "[修改]",
+            "diff_error": "[出错]",
+            "diff_summary": "新增: {}，删除: {}，修改: {}，未变化: {}，出错: {}",
+            "diff_hashed": "计算摘要的文件数: {} ({:.2f} MB)",
+            "diff_identical": "✅ 两个文件夹的内容一致！",
+            "diff_different": "❌ 两个文件夹的内容不一致！",
+            "verify_ok": "[通过]",
+            "verify_skipped": "[跳过]",
+            "verify_missing": "[缺失]",
+            "verify_extra": "[多余]",
+            "verify_corrupted": "[不一致]",
+            "column_status": "状态",
+            "column_path": "路径",
+            "column_detail": "说明",
+            "filter_results": "筛选:",
+            "duplicates_tab": "重复文件",
+            "find_duplicates": "查找重复文件",
+            "finding_duplicates": "正在查找重复文件...",
+            "duplicates_summary": "重复文件组: {}，可释放空间: {:.2f} MB (完整读取了 {} 个文件)",
+            "duplicate_group": "{} 个文件，每个 {} 字节，可释放 {:.2f} MB",
+            "column_group": "重复组",
+            "duplicates_complete": "查找完成，找到 {} 组重复文件，耗时 {:.2f} 秒",
+            "resume_mode": "断点续算 (中断后从上次的位置继续)",
+            "resumed_files": "从检查点恢复的文件数: {}",
+            "checkpoint_saved": "已完成文件的进度已保存，再次计算时将从中断处继续",
+            "export_results": "导出结果 (JSON Lines / CSV / SQLite)",
+            "export_selected": "结果将同时导出到: {}",
+            "export_to": "结果已导出到: {}",
+            "batch_tab": "批量任务",
+            "batch_add_files": "添加文件",
+            "batch_add_folder": "添加文件夹",
+            "batch_paste": "粘贴路径列表",
+            "batch_raise": "提高优先级",
+            "batch_lower": "降低优先级",
+            "batch_retry": "重试失败的任务",
+            "batch_remove": "移除所选",
+            "batch_start": "开始计算",
+            "column_priority": "优先级",
+            "column_attempts": "尝试次数",
+            "column_size": "大小 (字节)",
+            "column_result": "摘要或错误",
+            "batch_status_pending": "等待",
+            "batch_status_running": "运行中",
+            "batch_status_done": "完成",
+            "batch_status_failed": "失败",
+            "batch_added": "已加入 {} 个任务",
+            "batch_clipboard_empty": "剪贴板中没有路径 (每行一个)",
+            "batch_empty": "队列中没有等待的任务",
+            "batch_running": "正在运行批量任务...",
+            "batch_complete": "批量任务完成: 成功 {}，失败 {}，共 {:.2f} MB，耗时 {:.2f} 秒",
+            "exclude_patterns": "排除 (以 ; 分隔，如 .git/; *.tmp):",
+            "skip_hidden": "跳过隐藏文件和目录",
+            "sorted_traversal": "按名称排序遍历 (摘要与文件系统无关)"
         }
 
     def get(self, key, *args):
@@ -147,6 +258,43 @@ class LanguageManager:
             return key
 
 
+# 算法选择区每行显示的算法数
+ALGORITHMS_PER_ROW = 7
+
+
+def open_digest_cache(enabled):
+    """启用时打开默认位置的摘要缓存，否则返回空的上下文 (得到 None)"""
+    if enabled:
+        return DigestCache()
+    return contextlib.nullcontext()
+
+
+def open_result_sink(path):
+    """设置了导出文件时打开导出写入器 (见 result_sink.py)，否则返回空的上下文 (得到 None)"""
+    if path:
+        return open_sink(path)
+    return contextlib.nullcontext()
+
+
+def describe_error(exc):
+    """错误说明，文件读取失败时包含出错的文件名"""
+    if isinstance(exc, OSError) and exc.strerror:
+        return "{}: {}".format(exc.filename, exc.strerror) if exc.filename else exc.strerror
+    return str(exc) or exc.__class__.__name__
+
+
+def algorithm_label(algorithms):
+    """算法名列表的显示文本，如 SHA256, MD5"""
+    return ", ".join(algo.upper() for algo in algorithms)
+
+
+def format_digests(digests):
+    """只有一个算法时直接显示摘要，多个算法时每行显示一个 "算法: 摘要" """
+    if len(digests) == 1:
+        return next(iter(digests.values()))
+    return "\n".join("{}: {}".format(algo.upper(), digest) for algo, digest in digests.items())
+
+
 class HashCalculatorApp:
     def __init__(self, root):
         self.root = root
@@ -155,8 +303,11 @@ class HashCalculatorApp:
         self.root.geometry("1000x800")
         self.root.resizable(True, True)
 
-        # 设置默认哈希算法
-        self.hash_algorithm = tk.StringVar(value="sha256")
+        # 已勾选的哈希算法，默认 SHA-256；勾选多个时每个文件只读取一次
+        self.algorithm_vars = {}
+
+        # 当前正在运行的后台任务
+        self.current_task = None
 
         # 创建主框架
         self.main_frame = ttk.Frame(root, padding=10)
@@ -166,23 +317,94 @@ class HashCalculatorApp:
         algo_frame = ttk.LabelFrame(self.main_frame, text=self.lang.get("algorithm_frame"), padding=10)
         algo_frame.pack(fill=tk.X, padx=10, pady=5)
 
-        algorithms = [
-            ("SHA-256", "sha256"),
-            ("SHA-1", "sha1"),
-            ("MD5", "md5"),
-            ("SHA-512", "sha512")
-        ]
-
-        for i, (text, algo) in enumerate(algorithms):
-            rb = ttk.Radiobutton(
-                algo_frame,
-                text=text,
-                variable=self.hash_algorithm,
-                value=algo,
+        # 算法列表按运行环境生成：安装了 blake3、xxhash、crc32c 等库时出现对应的算法
+        algo_list_frame = ttk.Frame(algo_frame)
+        algo_list_frame.grid(row=0, column=0, columnspan=4, sticky=tk.W)
+
+        for i, info in enumerate(available_algorithms()):
+            self.algorithm_vars[info.name] = tk.BooleanVar(value=(info.name == "sha256"))
+            cb = ttk.Checkbutton(
+                algo_list_frame,
+                text=info.label,
+                variable=self.algorithm_vars[info.name],
                 command=lambda: self.update_status(
-                    self.lang.get("hash_algorithm_selected", self.hash_algorithm.get().upper()))
+                    self.lang.get("hash_algorithm_selected", algorithm_label(self.selected_algorithms())))
             )
-            rb.grid(row=0, column=i, padx=10, pady=5, sticky=tk.W)
+            row, column = divmod(i, ALGORITHMS_PER_ROW)
+            cb.grid(row=row, column=column, padx=10, pady=5, sticky=tk.W)
+
+        # 文件夹并行计算选项 (records 模式)
+        self.parallel_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("parallel_mode"),
+            variable=self.parallel_var
+        ).grid(row=1, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
+        ttk.Label(algo_frame, text=self.lang.get("worker_count")).grid(row=1, column=2, padx=10, pady=5, sticky=tk.E)
+        self.workers_var = tk.IntVar(value=os.cpu_count() or 1)
+        ttk.Spinbox(
+            algo_frame,
+            from_=1,
+            to=64,
+            width=5,
+            textvariable=self.workers_var
+        ).grid(row=1, column=3, padx=10, pady=5, sticky=tk.W)
+
+        # 摘要缓存：未修改的文件直接使用上次的计算结果
+        self.cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("use_digest_cache"),
+            variable=self.cache_var
+        ).grid(row=2, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
+        # Merkle 目录树摘要：配合摘要缓存时只重新计算变化的目录
+        self.merkle_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("merkle_mode"),
+            variable=self.merkle_var
+        ).grid(row=2, column=2, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
+        # 断点续算：定期保存已完成的文件，中断后再次计算同一文件夹时从上次的位置继续
+        self.resume_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("resume_mode"),
+            variable=self.resume_var
+        ).grid(row=3, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
+        # 导出结果：文件夹哈希、校验和逐文件比较的结果同时写入 JSON Lines、CSV 或 SQLite 文件
+        self.export_path = ""
+        self.export_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("export_results"),
+            variable=self.export_var,
+            command=self.toggle_export
+        ).grid(row=3, column=2, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
+        # 遍历规则：排除的文件和目录、是否包括隐藏文件、是否按名称排序
+        ttk.Label(algo_frame, text=self.lang.get("exclude_patterns")).grid(row=4, column=0, padx=10, pady=5,
+                                                                           sticky=tk.W)
+        self.exclude_var = tk.StringVar()
+        ttk.Entry(algo_frame, textvariable=self.exclude_var).grid(row=4, column=1, columnspan=3, padx=10, pady=5,
+                                                                  sticky=tk.EW)
+
+        self.skip_hidden_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("skip_hidden"),
+            variable=self.skip_hidden_var
+        ).grid(row=5, column=0, columnspan=2, padx=10, pady=5, sticky=tk.W)
+
+        self.sorted_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            algo_frame,
+            text=self.lang.get("sorted_traversal"),
+            variable=self.sorted_var
+        ).grid(row=5, column=2, columnspan=2, padx=10, pady=5, sticky=tk.W)
 
         # 创建标签页
         self.notebook = ttk.Notebook(self.main_frame)
@@ -200,10 +422,27 @@ class HashCalculatorApp:
         # 创建文件夹比较标签页
         self.create_folder_compare_tab()
 
+        # 创建重复文件标签页
+        self.create_duplicates_tab()
+
+        # 创建批量任务标签页
+        self.create_batch_tab()
+
         # 创建状态栏
+        status_frame = ttk.Frame(root)
+        status_frame.pack(side=tk.BOTTOM, fill=tk.X)
+
+        self.cancel_button = ttk.Button(
+            status_frame,
+            text=self.lang.get("cancel"),
+            command=self.cancel_task,
+            state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.RIGHT)
+
         self.status_var = tk.StringVar(value=self.lang.get("status_ready"))
-        self.status_bar = ttk.Label(root, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
-        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.status_bar = ttk.Label(status_frame, textvariable=self.status_var, relief=tk.SUNKEN, anchor=tk.W)
+        self.status_bar.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
         # 设置样式
         self.set_style()
@@ -265,6 +504,17 @@ class HashCalculatorApp:
         )
         self.calculate_button.pack(pady=10)
 
+        # 进度条
+        self.file_progress_var = tk.DoubleVar()
+        self.file_progress_bar = ttk.Progressbar(
+            file_frame,
+            variable=self.file_progress_var,
+            maximum=100,
+            mode="determinate"
+        )
+        self.file_progress_bar.pack(fill=tk.X, pady=5)
+        self.file_progress_bar.pack_forget()  # 初始隐藏
+
         # 结果显示部分
         result_frame = ttk.LabelFrame(self.single_file_tab, text=self.lang.get("result"), padding=10)
         result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -321,6 +571,25 @@ class HashCalculatorApp:
         )
         self.compare_button.pack(pady=10)
 
+        # 快速比较：只判断是否相同，不计算哈希值
+        self.fast_compare_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            self.compare_tab,
+            text=self.lang.get("fast_compare"),
+            variable=self.fast_compare_var
+        ).pack()
+
+        # 进度条
+        self.compare_progress_var = tk.DoubleVar()
+        self.compare_progress_bar = ttk.Progressbar(
+            self.compare_tab,
+            variable=self.compare_progress_var,
+            maximum=100,
+            mode="determinate"
+        )
+        self.compare_progress_bar.pack(fill=tk.X, padx=10, pady=5)
+        self.compare_progress_bar.pack_forget()  # 初始隐藏
+
         # 比较结果部分
         result_frame = ttk.LabelFrame(self.compare_tab, text=self.lang.get("result"), padding=10)
         result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
@@ -352,14 +621,39 @@ class HashCalculatorApp:
         self.browse_folder_button = ttk.Button(path_frame, text=self.lang.get("browse"), command=self.browse_folder)
         self.browse_folder_button.pack(side=tk.RIGHT)
 
-        # 计算按钮
+        # 计算按钮和校验清单按钮
+        button_frame = ttk.Frame(folder_frame)
+        button_frame.pack(pady=10)
+
         self.calculate_folder_button = ttk.Button(
-            folder_frame,
+            button_frame,
             text=self.lang.get("calculate_folder_hash"),
             command=self.calculate_folder_hash,
             state=tk.DISABLED
         )
-        self.calculate_folder_button.pack(pady=10)
+        self.calculate_folder_button.pack(side=tk.LEFT, padx=5)
+
+        self.create_manifest_button = ttk.Button(
+            button_frame,
+            text=self.lang.get("create_manifest"),
+            command=self.create_manifest,
+            state=tk.DISABLED
+        )
+        self.create_manifest_button.pack(side=tk.LEFT, padx=5)
+
+        self.verify_manifest_button = ttk.Button(
+            button_frame,
+            text=self.lang.get("verify_manifest"),
+            command=self.verify_manifest
+        )
+        self.verify_manifest_button.pack(side=tk.LEFT, padx=5)
+
+        self.fast_verify_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            folder_frame,
+            text=self.lang.get("fast_verify"),
+            variable=self.fast_verify_var
+        ).pack()
 
         # 进度条
         self.progress_var = tk.DoubleVar()
@@ -379,11 +673,15 @@ class HashCalculatorApp:
         self.folder_result_text = scrolledtext.ScrolledText(
             result_frame,
             wrap=tk.WORD,
+            height=8,
             state=tk.DISABLED
         )
         self.folder_result_text.pack(fill=tk.BOTH, expand=True)
         self.folder_result_text.config(font=("楷体", 11))
 
+        # 逐文件的校验结果：只渲染可见的行，支持排序和筛选
+        self.folder_result_view = self.create_result_view(result_frame)
+
     def create_folder_compare_tab(self):
         """创建文件夹比较标签页"""
         self.folder_compare_tab = ttk.Frame(self.notebook)
@@ -428,6 +726,14 @@ class HashCalculatorApp:
         )
         self.compare_folders_button.pack(pady=10)
 
+        # 逐文件比较：列出新增、删除和修改的文件，只有大小相同的文件才计算摘要
+        self.folder_diff_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(
+            self.folder_compare_tab,
+            text=self.lang.get("folder_diff_mode"),
+            variable=self.folder_diff_var
+        ).pack()
+
         # 进度条
         self.folder_compare_progress_var = tk.DoubleVar()
         self.folder_compare_progress_bar = ttk.Progressbar(
@@ -446,11 +752,133 @@ class HashCalculatorApp:
         self.folder_compare_text = scrolledtext.ScrolledText(
             result_frame,
             wrap=tk.WORD,
+            height=8,
             state=tk.DISABLED
         )
         self.folder_compare_text.pack(fill=tk.BOTH, expand=True)
         self.folder_compare_text.config(font=("楷体", 11))
 
+        # 逐文件比较的结果
+        self.folder_compare_view = self.create_result_view(result_frame)
+
+    def create_result_view(self, parent, first_column="column_status"):
+        """创建逐文件结果的表格 (状态、路径、说明)，first_column 为第一列标题的文本键"""
+        view = ResultView(parent, [(self.lang.get(first_column), 90), (self.lang.get("column_path"), 400),
+                                   (self.lang.get("column_detail"), 200)],
+                          filter_label=self.lang.get("filter_results"))
+        view.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        return view
+
+    def create_duplicates_tab(self):
+        """创建重复文件查找标签页"""
+        self.duplicates_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.duplicates_tab, text=self.lang.get("duplicates_tab"))
+
+        # 文件夹选择部分
+        folder_frame = ttk.LabelFrame(self.duplicates_tab, text=self.lang.get("select_folder"), padding=10)
+        folder_frame.pack(fill=tk.X, padx=10, pady=5)
+
+        path_frame = ttk.Frame(folder_frame)
+        path_frame.pack(fill=tk.X, pady=5)
+
+        self.dupes_path_var = tk.StringVar()
+        ttk.Entry(path_frame, textvariable=self.dupes_path_var, state="readonly").pack(
+            side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+
+        self.browse_dupes_button = ttk.Button(path_frame, text=self.lang.get("browse"),
+                                              command=self.browse_dupes_folder)
+        self.browse_dupes_button.pack(side=tk.RIGHT)
+
+        # 查找按钮
+        self.find_duplicates_button = ttk.Button(
+            folder_frame,
+            text=self.lang.get("find_duplicates"),
+            command=self.find_duplicates,
+            state=tk.DISABLED
+        )
+        self.find_duplicates_button.pack(pady=10)
+
+        # 进度条
+        self.dupes_progress_var = tk.DoubleVar()
+        self.dupes_progress_bar = ttk.Progressbar(
+            folder_frame,
+            variable=self.dupes_progress_var,
+            maximum=100,
+            mode="determinate"
+        )
+
+        # 结果显示部分
+        result_frame = ttk.LabelFrame(self.duplicates_tab, text=self.lang.get("result"), padding=10)
+        result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        self.dupes_result_text = scrolledtext.ScrolledText(
+            result_frame,
+            wrap=tk.WORD,
+            height=8,
+            state=tk.DISABLED
+        )
+        self.dupes_result_text.pack(fill=tk.BOTH, expand=True)
+        self.dupes_result_text.config(font=("楷体", 11))
+
+        # 每个重复文件一行 (组号、路径、说明)，重复文件可能很多，只渲染可见的行
+        self.dupes_result_view = self.create_result_view(result_frame, "column_group")
+
+    def create_batch_tab(self):
+        """创建批量任务标签页"""
+        self.batch_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.batch_tab, text=self.lang.get("batch_tab"))
+        self.job_queue = JobQueue()
+
+        # 加入任务和调整队列的按钮
+        button_frame = ttk.Frame(self.batch_tab)
+        button_frame.pack(fill=tk.X, padx=10, pady=5)
+        for key, command in (("batch_add_files", self.add_batch_files), ("batch_add_folder", self.add_batch_folder),
+                             ("batch_paste", self.paste_batch_paths),
+                             ("batch_raise", lambda: self.change_batch_priority(1)),
+                             ("batch_lower", lambda: self.change_batch_priority(-1)),
+                             ("batch_retry", self.retry_batch_jobs), ("batch_remove", self.remove_batch_jobs)):
+            ttk.Button(button_frame, text=self.lang.get(key), command=command).pack(side=tk.LEFT, padx=(0, 5))
+
+        self.start_batch_button = ttk.Button(
+            self.batch_tab,
+            text=self.lang.get("batch_start"),
+            command=self.start_batch
+        )
+        self.start_batch_button.pack(pady=5)
+
+        # 进度条：整个队列的字节进度
+        self.batch_progress_var = tk.DoubleVar()
+        self.batch_progress_bar = ttk.Progressbar(
+            self.batch_tab,
+            variable=self.batch_progress_var,
+            maximum=100,
+            mode="determinate"
+        )
+
+        # 任务列表
+        result_frame = ttk.LabelFrame(self.batch_tab, text=self.lang.get("result"), padding=10)
+        result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+        self.batch_result_frame = result_frame
+
+        columns = (("column_priority", 60), ("column_status", 80), ("column_path", 320),
+                   ("column_attempts", 70), ("column_size", 100), ("column_result", 300))
+        self.batch_tree = ttk.Treeview(result_frame, columns=[key for key, _ in columns], show="headings")
+        for key, width in columns:
+            self.batch_tree.heading(key, text=self.lang.get(key))
+            self.batch_tree.column(key, width=width, stretch=(key in ("column_path", "column_result")))
+        scrollbar = ttk.Scrollbar(result_frame, orient=tk.VERTICAL, command=self.batch_tree.yview)
+        self.batch_tree.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.batch_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        if TkinterDnD is not None:
+            try:
+                TkinterDnD._require(self.root)
+                self.batch_tree.drop_target_register(DND_FILES)
+                self.batch_tree.dnd_bind("<<Drop>>", self.on_batch_drop)
+            except (tk.TclError, AttributeError):
+                pass
+
     def update_status(self, message):
         """更新状态栏消息"""
         self.status_var.set(message)
@@ -490,6 +918,15 @@ class HashCalculatorApp:
         if folder_path:
             self.folder_path_var.set(folder_path)
             self.calculate_folder_button.state(["!disabled"])
+            self.create_manifest_button.state(["!disabled"])
+            self.update_status(self.lang.get("folder_selected", os.path.basename(folder_path)))
+
+    def browse_dupes_folder(self):
+        """浏览要查找重复文件的文件夹"""
+        folder_path = filedialog.askdirectory(title=self.lang.get("select_folder"))
+        if folder_path:
+            self.dupes_path_var.set(folder_path)
+            self.find_duplicates_button.state(["!disabled"])
             self.update_status(self.lang.get("folder_selected", os.path.basename(folder_path)))
 
     def browse_compare_folder(self, folder_num):
@@ -507,96 +944,120 @@ class HashCalculatorApp:
 
             self.update_status(self.lang.get("folder_num_selected", folder_num, os.path.basename(folder_path)))
 
-    def compute_file_hash(self, file_path):
+    def start_task(self, func, on_progress=None, on_done=None, on_error=None, on_finally=None):
         """
-        计算文件的哈希值
+        在后台线程中运行计算任务，同一时间只允许一个任务
 
-        :param file_path: 文件路径
-        :return: (哈希值, 计算耗时) 或 (None, None) 如果出错
+        :param func: 任务函数 func(report_progress, cancel_event)
+        :return: 是否成功启动
         """
-        # 检查文件是否存在
-        if not os.path.isfile(file_path):
-            return None, None
-
-        try:
-            algorithm = self.hash_algorithm.get()
-            # 初始化哈希对象
-            hash_obj = hashlib.new(algorithm)
-            file_size = os.path.getsize(file_path)
-
-            # 记录开始时间
-            start_time = time.time()
-
-            # 读取文件并计算哈希
-            with open(file_path, 'rb') as f:
-                while True:
-                    data = f.read(65536)  # 64KB块
-                    if not data:
-                        break
-                    hash_obj.update(data)
-
-            # 计算耗时
-            elapsed = time.time() - start_time
-
-            return hash_obj.hexdigest(), elapsed
-        except Exception as e:
-            return None, None
-
-    def compute_folder_hash(self, folder_path, progress_callback=None):
+        if self.current_task is not None:
+            messagebox.showwarning(self.lang.get("error"), self.lang.get("task_running"))
+            return False
+
+        def finish():
+            self.current_task = None
+            self.cancel_button.state(["disabled"])
+            if on_finally:
+                on_finally()
+
+        self.current_task = BackgroundTask(
+            self.root,
+            func,
+            on_progress=on_progress,
+            on_done=on_done,
+            on_error=on_error,
+            on_cancelled=lambda: self.update_status(self.lang.get("task_cancelled")),
+            on_finally=finish
+        )
+        self.cancel_button.state(["!disabled"])
+        self.current_task.start()
+        return True
+
+    def cancel_task(self):
+        """取消正在运行的任务"""
+        if self.current_task is not None:
+            self.current_task.cancel()
+            self.cancel_button.state(["disabled"])
+            self.update_status(self.lang.get("cancelling"))
+
+    def selected_algorithms(self):
+        """返回已勾选的算法列表，未勾选时提示并返回空列表"""
+        algorithms = [algo for algo, var in self.algorithm_vars.items() if var.get()]
+        if not algorithms:
+            messagebox.showwarning(self.lang.get("error"), self.lang.get("algorithm_not_selected"))
+        return algorithms
+
+    def folder_hash_options(self):
         """
-        计算文件夹的哈希值
-
-        :param folder_path: 文件夹路径
-        :param progress_callback: 进度回调函数
-        :return: (哈希值, 文件数量, 总大小, 计算耗时) 或 (None, 0, 0, 0) 如果出错
+        根据界面选项返回 compute_folder_hash 的模式参数，
+        并行计算、摘要缓存和断点续算需要 records 或 merkle 模式
         """
-        if not os.path.isdir(folder_path):
-            return None, 0, 0, 0
-
-        try:
-            algorithm = self.hash_algorithm.get()
-            hash_obj = hashlib.new(algorithm)
-            total_files = 0
-            processed_files = 0
-            total_size = 0
-            start_time = time.time()
-
-            # 首先统计文件总数和总大小
-            for root_dir, _, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root_dir, file)
-                    if os.path.isfile(file_path):
-                        total_files += 1
-                        total_size += os.path.getsize(file_path)
-
-            # 再次遍历文件，计算哈希
-            for root_dir, _, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root_dir, file)
-                    if os.path.isfile(file_path):
-                        # 添加文件相对路径到哈希
-                        rel_path = os.path.relpath(file_path, folder_path)
-                        hash_obj.update(rel_path.encode('utf-8'))
-
-                        # 添加文件内容到哈希
-                        with open(file_path, 'rb') as f:
-                            while True:
-                                data = f.read(65536)
-                                if not data:
-                                    break
-                                hash_obj.update(data)
-
-                        processed_files += 1
-                        if progress_callback:
-                            progress = (processed_files / total_files) * 100
-                            progress_callback(progress,
-                                              self.lang.get("processing", rel_path, processed_files, total_files))
-
-            # 计算耗时
-            elapsed = time.time() - start_time
-            return hash_obj.hexdigest(), total_files, total_size, elapsed
-        except Exception as e:
-            return None, 0, 0, 0
+        options = {}
+        traversal = self.traversal_spec()
+        if traversal is not None:
+            options["traversal"] = traversal
+        if self.merkle_var.get():
+            options["mode"] = "merkle"
+        elif self.parallel_var.get() or self.cache_var.get() or self.resume_var.get():
+            options["mode"] = "records"
+        else:
+            options["mode"] = "stream"
+            return options
+        if self.parallel_var.get():
+            try:
+                options["workers"] = max(1, int(self.workers_var.get()))
+            except (tk.TclError, ValueError):
+                options["workers"] = os.cpu_count() or 1
+        return options
+
+    def traversal_spec(self):
+        """根据界面上的遍历规则返回 TraversalSpec，未设置任何规则时返回 None (保持原有的遍历方式和摘要)"""
+        exclude = [pattern for pattern in self.exclude_var.get().replace(";", " ").split() if pattern]
+        if not (exclude or self.skip_hidden_var.get() or self.sorted_var.get()):
+            return None
+        return TraversalSpec(sort=self.sorted_var.get(), exclude=exclude, hidden=not self.skip_hidden_var.get())
+
+    def toggle_export(self):
+        """勾选导出结果时选择导出文件，取消选择则不导出"""
+        if not self.export_var.get():
+            self.export_path = ""
+            return
+        path = filedialog.asksaveasfilename(
+            title=self.lang.get("export_results"),
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("CSV", "*.csv"), ("SQLite", "*.db *.sqlite *.sqlite3")]
+        )
+        if not path:
+            self.export_var.set(False)
+            return
+        self.export_path = path
+        self.update_status(self.lang.get("export_selected", path))
+
+    def set_result_text(self, text_widget, result):
+        """替换结果文本框的内容"""
+        text_widget.config(state=tk.NORMAL)
+        text_widget.delete(1.0, tk.END)
+        text_widget.insert(tk.END, result)
+        text_widget.config(state=tk.DISABLED)
+
+    def append_result_text(self, text_widget, result):
+        """在结果文本框末尾追加内容"""
+        text_widget.config(state=tk.NORMAL)
+        text_widget.insert(tk.END, result)
+        text_widget.config(state=tk.DISABLED)
+        text_widget.see(tk.END)
+
+    def flush_result_rows(self, pending, view):
+        """把后台线程放入队列的结果行一次性追加到结果表格"""
+        rows = []
+        while True:
+            try:
+                rows.append(pending.get_nowait())
+            except queue.Empty:
+                break
+        if rows:
+            view.append(rows)
 
     def calculate_single_hash(self):
         """计算单个文件的哈希值"""
@@ -610,41 +1071,53 @@ class HashCalculatorApp:
             messagebox.showwarning(self.lang.get("error"), self.lang.get("file_not_exist", file_path))
             return
 
-        # 禁用按钮防止重复点击
-        self.calculate_button.state(["disabled"])
-        self.browse_button.state(["disabled"])
-        self.update_status(self.lang.get("calculating_file_hash"))
-        self.root.update()  # 立即更新UI
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        use_cache = self.cache_var.get()
+
+        def work(report_progress, cancel_event):
+            with open_digest_cache(use_cache) as cache:
+                return hash_engine.compute_file_hash(file_path, algorithms, report_progress, cancel_event, cache)
 
-        # 计算哈希值
-        hash_value, elapsed = self.compute_file_hash(file_path)
+        def on_progress(bytes_read, file_size):
+            self.file_progress_var.set(bytes_read / file_size * 100 if file_size else 100)
 
-        # 启用按钮
-        self.calculate_button.state(["!disabled"])
-        self.browse_button.state(["!disabled"])
+        def on_done(result):
+            file_size_mb = result.size / (1024 * 1024)  # 转换为MB
 
-        if hash_value is None:
+            text = self.lang.get("file_path", file_path) + "\n"
+            text += self.lang.get("file_size", result.size, file_size_mb) + "\n"
+            text += self.lang.get("hash_algorithm", algorithm_label(algorithms)) + "\n"
+            text += self.lang.get("time_taken", result.elapsed) + "\n"
+            if result.cached:
+                text += self.lang.get("digest_from_cache") + "\n"
+            text += self.lang.get("hash_value", format_digests(result.digests))
+
+            self.set_result_text(self.result_text, text)
+            self.update_status(self.lang.get("calculation_complete", result.elapsed))
+
+        def on_error(e):
             self.update_status(self.lang.get("calculation_failed"))
             messagebox.showerror(self.lang.get("error"), self.lang.get("hash_calculation_error", file_path))
-            return
 
-        # 显示结果
-        file_size = os.path.getsize(file_path)
-        file_size_mb = file_size / (1024 * 1024)  # 转换为MB
+        def on_finally():
+            # 启用按钮
+            self.calculate_button.state(["!disabled"])
+            self.browse_button.state(["!disabled"])
+            self.file_progress_bar.pack_forget()  # 隐藏进度条
 
-        result = self.lang.get("file_path", file_path) + "\n"
-        result += self.lang.get("file_size", file_size, file_size_mb) + "\n"
-        result += self.lang.get("hash_algorithm", self.hash_algorithm.get().upper()) + "\n"
-        result += self.lang.get("time_taken", elapsed) + "\n"
-        result += self.lang.get("hash_value", hash_value)
+        if not self.start_task(work, on_progress, on_done, on_error, on_finally):
+            return
 
-        # 更新结果文本框
-        self.result_text.config(state=tk.NORMAL)
-        self.result_text.delete(1.0, tk.END)
-        self.result_text.insert(tk.END, result)
-        self.result_text.config(state=tk.DISABLED)
+        # 禁用按钮防止重复点击
+        self.calculate_button.state(["disabled"])
+        self.browse_button.state(["disabled"])
+        self.update_status(self.lang.get("calculating_file_hash"))
 
-        self.update_status(self.lang.get("calculation_complete", elapsed))
+        # 显示进度条
+        self.file_progress_var.set(0)
+        self.file_progress_bar.pack(fill=tk.X, pady=5)
 
     def compare_files(self):
         """比较两个文件的哈希值"""
@@ -667,59 +1140,122 @@ class HashCalculatorApp:
             messagebox.showwarning(self.lang.get("error"), self.lang.get("same_file_error"))
             return
 
-        # 禁用按钮防止重复点击
-        self.compare_button.state(["disabled"])
-        self.browse1_button.state(["disabled"])
-        self.browse2_button.state(["disabled"])
-        self.update_status(self.lang.get("comparing_files"))
-        self.root.update()  # 立即更新UI
+        if self.fast_compare_var.get():
+            self.compare_file_contents(file1, file2)
+            return
 
-        # 计算第一个文件的哈希值
-        hash1, elapsed1 = self.compute_file_hash(file1)
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        use_cache = self.cache_var.get()
 
-        # 计算第二个文件的哈希值
-        hash2, elapsed2 = None, None
-        if hash1 is not None:
-            hash2, elapsed2 = self.compute_file_hash(file2)
+        def work(report_progress, cancel_event):
+            # 两个文件的进度合并为一个：按两者的总字节数计算
+            tracker = ProgressTracker(report_progress)
+            tracker.add_total(2, os.path.getsize(file1) + os.path.getsize(file2))
 
-        # 启用按钮
-        self.compare_button.state(["!disabled"])
-        self.browse1_button.state(["!disabled"])
-        self.browse2_button.state(["!disabled"])
+            def hash_one(file_path, cancel):
+                try:
+                    result = hash_engine.compute_file_hash(file_path, algorithms, tracker.file_reporter(), cancel,
+                                                           cache)
+                except OSError as e:
+                    # 保留原来的异常类型和错误码，只在没有文件名时补上出错的一侧
+                    if e.filename is None:
+                        e.filename = file_path
+                    raise
+                tracker.file_done(file_path, result.size if result.cached else 0)
+                return result
+
+            with open_digest_cache(use_cache) as cache:
+                # 位于不同设备时两个文件同时计算，同一设备上依次计算以免来回寻道
+                results = compare.hash_pair(hash_one, file1, file2, cancel_event=cancel_event)
+            tracker.finish()
+            return results
+
+        def on_progress(snapshot):
+            self.show_progress_snapshot(snapshot, self.compare_progress_var)
+
+        def on_done(results):
+            result1, result2 = results
 
-        if hash1 is None:
-            self.update_status(self.lang.get("calculation_failed"))
-            messagebox.showerror(self.lang.get("error"), self.lang.get("hash_calculation_error", file1))
-            return
+            # 准备比较结果
+            text = self.lang.get("file1", file1) + "\n"
+            text += self.lang.get("file_size", result1.size, result1.size / (1024 * 1024)) + "\n"
+            text += self.lang.get("file1_hash", algorithm_label(algorithms), format_digests(result1.digests)) + "\n"
+            text += self.lang.get("time_taken", result1.elapsed) + "\n\n"
+
+            text += self.lang.get("file2", file2) + "\n"
+            text += self.lang.get("file_size", result2.size, result2.size / (1024 * 1024)) + "\n"
+            text += self.lang.get("file2_hash", algorithm_label(algorithms), format_digests(result2.digests)) + "\n"
+            text += self.lang.get("time_taken", result2.elapsed) + "\n\n"
+
+            if result1.digests == result2.digests:
+                text += self.lang.get("match_success")
+            else:
+                text += self.lang.get("match_fail")
 
-        if hash2 is None:
+            self.set_result_text(self.compare_text, text)
+            self.update_status(self.lang.get("comparison_complete", result1.elapsed + result2.elapsed))
+
+        def on_error(e):
             self.update_status(self.lang.get("calculation_failed"))
-            messagebox.showerror(self.lang.get("error"), self.lang.get("hash_calculation_error", file2))
+            messagebox.showerror(self.lang.get("error"), self.lang.get("hash_calculation_error", describe_error(e)))
+
+        if not self.start_task(work, on_progress, on_done, on_error, self.end_compare_task):
             return
+        self.begin_compare_task()
 
-        # 准备比较结果
-        result = self.lang.get("file1", file1) + "\n"
-        result += self.lang.get("file_size", os.path.getsize(file1)) + "\n"
-        result += self.lang.get("file1_hash", self.hash_algorithm.get().upper(), hash1) + "\n"
-        result += self.lang.get("time_taken", elapsed1) + "\n\n"
+    def begin_compare_task(self):
+        """禁用文件比较标签页的按钮防止重复点击，并显示进度条"""
+        self.compare_button.state(["disabled"])
+        self.browse1_button.state(["disabled"])
+        self.browse2_button.state(["disabled"])
+        self.update_status(self.lang.get("comparing_files"))
+        self.compare_progress_var.set(0)
+        self.compare_progress_bar.pack(fill=tk.X, padx=10, pady=5)
 
-        result += self.lang.get("file2", file2) + "\n"
-        result += self.lang.get("file_size", os.path.getsize(file2)) + "\n"
-        result += self.lang.get("file2_hash", self.hash_algorithm.get().upper(), hash2) + "\n"
-        result += self.lang.get("time_taken", elapsed2) + "\n\n"
+    def end_compare_task(self):
+        """恢复文件比较标签页的按钮并隐藏进度条"""
+        self.compare_button.state(["!disabled"])
+        self.browse1_button.state(["!disabled"])
+        self.browse2_button.state(["!disabled"])
+        self.compare_progress_bar.pack_forget()
+
+    def compare_file_contents(self, file1, file2):
+        """快速比较：大小不同直接得出结论，否则逐块比较内容，在第一个不同的字节处停止"""
+        parallel = self.parallel_var.get()
+
+        def work(report_progress, cancel_event):
+            return compare.compare_file_contents(file1, file2, parallel=parallel,
+                                                 progress_callback=report_progress, cancel_event=cancel_event)
+
+        def on_progress(compared, file_size):
+            self.compare_progress_var.set(compared / file_size * 100 if file_size else 100)
+
+        def on_done(result):
+            text = self.lang.get("file1", file1) + "\n"
+            text += self.lang.get("file_size", result.size1, result.size1 / (1024 * 1024)) + "\n"
+            text += self.lang.get("file2", file2) + "\n"
+            text += self.lang.get("file_size", result.size2, result.size2 / (1024 * 1024)) + "\n"
+            text += self.lang.get("bytes_compared", result.bytes_compared) + "\n"
+            text += self.lang.get("time_taken", result.elapsed) + "\n\n"
+            if result.identical:
+                text += self.lang.get("content_match")
+            elif result.reason == compare.REASON_SIZE:
+                text += self.lang.get("content_size_differs")
+            else:
+                text += self.lang.get("content_differs_at", result.first_difference)
 
-        if hash1 == hash2:
-            result += self.lang.get("match_success")
-        else:
-            result += self.lang.get("match_fail")
+            self.set_result_text(self.compare_text, text)
+            self.update_status(self.lang.get("comparison_complete", result.elapsed))
 
-        # 更新结果文本框
-        self.compare_text.config(state=tk.NORMAL)
-        self.compare_text.delete(1.0, tk.END)
-        self.compare_text.insert(tk.END, result)
-        self.compare_text.config(state=tk.DISABLED)
+        def on_error(e):
+            self.update_status(self.lang.get("comparison_failed"))
+            messagebox.showerror(self.lang.get("error"), self.lang.get("hash_calculation_error", describe_error(e)))
 
-        self.update_status(self.lang.get("comparison_complete", elapsed1 + elapsed2))
+        if not self.start_task(work, on_progress, on_done, on_error, self.end_compare_task):
+            return
+        self.begin_compare_task()
 
     def calculate_folder_hash(self):
         """计算文件夹的哈希值"""
@@ -733,55 +1269,212 @@ class HashCalculatorApp:
             messagebox.showwarning(self.lang.get("error"), self.lang.get("folder_not_exist", folder_path))
             return
 
-        # 禁用按钮防止重复点击
-        self.calculate_folder_button.state(["disabled"])
-        self.browse_folder_button.state(["disabled"])
-        self.update_status(self.lang.get("calculating_folder_hash"))
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        options = self.folder_hash_options()
+        use_cache = self.cache_var.get()
+        resumable = self.resume_var.get()
+        if resumable:
+            options["checkpoint"] = default_checkpoint_path(folder_path, algorithms, options["mode"])
+
+        export_path = self.export_path
+
+        def work(report_progress, cancel_event):
+            # 进度按字节汇总，每秒最多报告约 10 次，与文件数无关
+            tracker = ProgressTracker(report_progress)
+            with open_digest_cache(use_cache) as cache, open_result_sink(export_path) as sink:
+                if sink is not None and options["mode"] == "records":
+                    options["file_callback"] = lambda rel_path, size, digests: sink.write(
+                        folder_file_record(folder_path, rel_path, size, digests))
+                result = hash_engine.compute_folder_hash(folder_path, algorithms, None, cancel_event,
+                                                         cache=cache, tracker=tracker, **options)
+                if sink is not None:
+                    sink.write(folder_record(result))
+                return result
+
+        def on_done(result):
+            # 显示结果
+            text = self.lang.get("folder_path", folder_path) + "\n"
+            text += self.lang.get("total_files", result.total_files) + "\n"
+            text += self.lang.get("folder_size", result.total_size, result.total_size / (1024 * 1024)) + "\n"
+            text += self.lang.get("hash_algorithm", algorithm_label(algorithms)) + "\n"
+            text += self.lang.get("time_taken", result.elapsed) + "\n"
+            if use_cache:
+                text += self.lang.get("cached_files", result.cached_files) + "\n"
+            if result.resumed_files:
+                text += self.lang.get("resumed_files", result.resumed_files) + "\n"
+            text += self.lang.get("folder_hash", format_digests(result.digests))
+            if export_path:
+                text += "\n" + self.lang.get("export_to", export_path)
+
+            self.set_result_text(self.folder_result_text, text)
+            self.update_status(self.lang.get("folder_calculation_complete", result.elapsed))
+
+        def on_error(e):
+            message = self.lang.get("folder_hash_error", folder_path) + "\n" + describe_error(e)
+            if resumable:
+                message += "\n" + self.lang.get("checkpoint_saved")
+            messagebox.showerror(self.lang.get("error"), message)
+            self.update_status(self.lang.get("folder_calculation_failed"))
 
-        # 显示进度条
+        def on_progress(snapshot):
+            self.show_progress_snapshot(snapshot, self.progress_var)
+
+        if not self.start_task(work, on_progress, on_done, on_error, self.end_folder_task):
+            return
+        self.begin_folder_task(self.lang.get("calculating_folder_hash"))
+
+    def on_folder_progress(self, processed_files, total_files, rel_path):
+        """文件夹标签页的进度回调"""
+        if total_files:
+            self.progress_var.set(processed_files / total_files * 100)
+        self.update_status(self.lang.get("processing", rel_path, processed_files, total_files))
+
+    def show_progress_snapshot(self, snapshot, progress_var):
+        """显示 ProgressTracker 汇总的进度：字节比例、文件数、吞吐量和剩余时间"""
+        progress_var.set(snapshot.fraction * 100)
+        mb = 1024 * 1024
+        self.update_status(self.lang.get("processing_bytes", snapshot.current, snapshot.files_done,
+                                         snapshot.files_total, snapshot.bytes_done / mb, snapshot.bytes_total / mb,
+                                         snapshot.rate / mb, format_duration(snapshot.eta)))
+
+    def begin_folder_task(self, status):
+        """禁用文件夹标签页的按钮防止重复点击，并显示进度条"""
+        for button in (self.calculate_folder_button, self.create_manifest_button,
+                       self.verify_manifest_button, self.browse_folder_button):
+            button.state(["disabled"])
+        self.folder_result_view.clear()
+        self.update_status(status)
         self.progress_var.set(0)
         self.progress_bar.pack(fill=tk.X, pady=5)
-        self.root.update()  # 立即更新UI
 
-        def update_progress(progress, status):
-            self.progress_var.set(progress)
-            self.update_status(status)
-            self.root.update()
+    def end_folder_task(self):
+        """恢复文件夹标签页的按钮并隐藏进度条"""
+        self.browse_folder_button.state(["!disabled"])
+        self.verify_manifest_button.state(["!disabled"])
+        if self.folder_path_var.get():
+            self.calculate_folder_button.state(["!disabled"])
+            self.create_manifest_button.state(["!disabled"])
+        self.progress_bar.pack_forget()
 
-        try:
-            # 计算文件夹哈希
-            folder_hash, total_files, total_size, elapsed = self.compute_folder_hash(
-                folder_path,
-                update_progress
-            )
+    def create_manifest(self):
+        """为所选文件夹生成逐文件的校验清单"""
+        folder_path = self.folder_path_var.get()
+        if not folder_path or not os.path.isdir(folder_path):
+            messagebox.showwarning(self.lang.get("error"), self.lang.get("folder_not_exist", folder_path))
+            return
 
-            if folder_hash is None:
-                raise Exception(self.lang.get("folder_hash_error", folder_path))
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        manifest_path = filedialog.asksaveasfilename(
+            title=self.lang.get("save_manifest"),
+            initialdir=folder_path,
+            initialfile="{}SUMS".format(algorithms[0].upper()) if len(algorithms) == 1 else "CHECKSUMS",
+            filetypes=[(self.lang.get("manifest_files"), "*SUMS *.md5 *.sha1 *.sha256 *.sha512 *.sfv"),
+                       (self.lang.get("all_files"), "*.*")]
+        )
+        if not manifest_path:
+            return
+        # .sfv 只能保存 CRC32
+        if manifest.is_sfv_path(manifest_path):
+            algorithms = ["crc32"]
+        options = self.folder_hash_options()
+        workers = options.get("workers", 1)
+        traversal = options.get("traversal")
+        use_cache = self.cache_var.get()
+
+        def work(report_progress, cancel_event):
+            with open_digest_cache(use_cache) as cache:
+                return manifest.create_manifest(folder_path, manifest_path, algorithms, workers=workers,
+                                                progress_callback=report_progress, cancel_event=cancel_event,
+                                                cache=cache, traversal=traversal)
+
+        def on_done(result):
+            text = self.lang.get("manifest_path", manifest_path) + "\n"
+            text += self.lang.get("folder_path", folder_path) + "\n"
+            text += self.lang.get("total_files", len(result.entries)) + "\n"
+            text += self.lang.get("folder_size", result.total_size, result.total_size / (1024 * 1024)) + "\n"
+            text += self.lang.get("hash_algorithm", algorithm_label(result.algorithms)) + "\n"
+            text += self.lang.get("time_taken", result.elapsed)
+            self.set_result_text(self.folder_result_text, text)
+            self.update_status(self.lang.get("manifest_created", result.elapsed))
+
+        def on_error(e):
+            messagebox.showerror(self.lang.get("error"), self.lang.get("manifest_error", e))
+            self.update_status(self.lang.get("folder_calculation_failed"))
 
-            # 显示结果
-            result = self.lang.get("folder_path", folder_path) + "\n"
-            result += self.lang.get("total_files", total_files) + "\n"
-            result += self.lang.get("folder_size", total_size, total_size / (1024 * 1024)) + "\n"
-            result += self.lang.get("hash_algorithm", self.hash_algorithm.get().upper()) + "\n"
-            result += self.lang.get("time_taken", elapsed) + "\n"
-            result += self.lang.get("folder_hash", folder_hash)
-
-            # 更新结果文本框
-            self.folder_result_text.config(state=tk.NORMAL)
-            self.folder_result_text.delete(1.0, tk.END)
-            self.folder_result_text.insert(tk.END, result)
-            self.folder_result_text.config(state=tk.DISABLED)
-
-            self.update_status(self.lang.get("folder_calculation_complete", elapsed))
-
-        except Exception as e:
-            messagebox.showerror(self.lang.get("error"), str(e))
+        if not self.start_task(work, self.on_folder_progress, on_done, on_error, self.end_folder_task):
+            return
+        self.begin_folder_task(self.lang.get("creating_manifest"))
+
+    def verify_manifest(self):
+        """按校验清单检查清单所在的文件夹，逐个列出缺失、多余和内容不一致的文件"""
+        manifest_path = filedialog.askopenfilename(
+            title=self.lang.get("select_manifest"),
+            initialdir=self.folder_path_var.get() or None,
+            filetypes=[(self.lang.get("manifest_files"), "*SUMS *.md5 *.sha1 *.sha256 *.sha512 *.sfv"),
+                       (self.lang.get("all_files"), "*.*")]
+        )
+        if not manifest_path:
+            return
+        options = self.folder_hash_options()
+        workers = options.get("workers", 1)
+        traversal = options.get("traversal")
+        fast = self.fast_verify_var.get()
+        use_cache = self.cache_var.get()
+        pending = queue.Queue()
+        labels = {
+            manifest.STATUS_OK: self.lang.get("verify_ok"),
+            manifest.STATUS_SKIPPED: self.lang.get("verify_skipped"),
+            manifest.STATUS_MISSING: self.lang.get("verify_missing"),
+            manifest.STATUS_EXTRA: self.lang.get("verify_extra"),
+            manifest.STATUS_CORRUPTED: self.lang.get("verify_corrupted"),
+            manifest.STATUS_ERROR: self.lang.get("diff_error"),
+        }
+
+        export_path = self.export_path
+
+        def work(report_progress, cancel_event):
+            with open_digest_cache(use_cache) as cache, open_result_sink(export_path) as sink:
+                def on_result(status, rel_path, detail):
+                    pending.put((labels[status], rel_path, detail))
+                    if sink is not None:
+                        sink.write(status_record(status, rel_path, detail, "error"))
+
+                report = manifest.verify_manifest(manifest_path, workers=workers, fast=fast, cache=cache,
+                                                  progress_callback=report_progress, result_callback=on_result,
+                                                  cancel_event=cancel_event, traversal=traversal)
+                if sink is not None:
+                    sink.write(verify_summary_record(manifest_path, report))
+                return report
+
+        def on_progress(processed_files, total_files, rel_path):
+            self.flush_result_rows(pending, self.folder_result_view)
+            self.on_folder_progress(processed_files, total_files, rel_path)
+
+        def on_done(report):
+            self.flush_result_rows(pending, self.folder_result_view)
+            text = self.lang.get("manifest_path", manifest_path) + "\n"
+            text += self.lang.get("folder_path", report.folder) + "\n"
+            text += self.lang.get("time_taken", report.elapsed) + "\n"
+            text += self.lang.get("verify_summary", len(report.ok), len(report.skipped), len(report.missing),
+                                  len(report.extra), len(report.corrupted), len(report.errors)) + "\n\n"
+            text += self.lang.get("verify_success" if report.matched else "verify_fail") + "\n"
+            if export_path:
+                text += self.lang.get("export_to", export_path) + "\n"
+            self.set_result_text(self.folder_result_text, text)
+            self.update_status(self.lang.get("verify_complete", report.elapsed))
+
+        def on_error(e):
+            self.flush_result_rows(pending, self.folder_result_view)
+            messagebox.showerror(self.lang.get("error"), self.lang.get("verify_error", e))
             self.update_status(self.lang.get("folder_calculation_failed"))
-        finally:
-            # 启用按钮
-            self.calculate_folder_button.state(["!disabled"])
-            self.browse_folder_button.state(["!disabled"])
-            self.progress_bar.pack_forget()  # 隐藏进度条
+
+        if not self.start_task(work, on_progress, on_done, on_error, self.end_folder_task):
+            return
+        self.begin_folder_task(self.lang.get("verifying_manifest"))
 
     def compare_folders(self):
         """比较两个文件夹的哈希值"""
@@ -804,94 +1497,382 @@ class HashCalculatorApp:
             messagebox.showwarning(self.lang.get("error"), self.lang.get("same_folder_error"))
             return
 
-        # 禁用按钮防止重复点击
-        self.compare_folders_button.state(["disabled"])
-        self.browse_folder1_button.state(["disabled"])
-        self.browse_folder2_button.state(["disabled"])
-        self.update_status(self.lang.get("comparing_folders"))
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        if self.folder_diff_var.get():
+            self.diff_folders(folder1, folder2, algorithms[0])
+            return
+        options = self.folder_hash_options()
+        use_cache = self.cache_var.get()
 
-        # 显示进度条
-        self.folder_compare_progress_var.set(0)
-        self.folder_compare_progress_bar.pack(fill=tk.X, padx=10, pady=5)
-        self.root.update()  # 立即更新UI
+        # 两个文件夹同时计算，位于同一设备时两侧分摊并行数
+        options["workers"] = compare.pair_workers(folder1, folder2, options.get("workers", 1))
 
-        def update_progress(progress, status):
-            self.folder_compare_progress_var.set(progress)
-            self.update_status(status)
-            self.root.update()
+        def work(report_progress, cancel_event):
+            # 两侧共用一个 tracker，进度条按两侧的总字节数推进
+            tracker = ProgressTracker(report_progress)
 
-        try:
-            # 计算第一个文件夹的哈希
-            self.update_status(self.lang.get("calculating_folder1"))
-            hash1, files1, size1, elapsed1 = self.compute_folder_hash(
-                folder1,
-                lambda p, s: update_progress(p / 2, s)
-            )
+            def hash_one(folder_path, cancel):
+                try:
+                    return hash_engine.compute_folder_hash(folder_path, algorithms, None, cancel, cache=cache,
+                                                           tracker=tracker, **options)
+                except OSError as e:
+                    if e.filename is None:
+                        e.filename = folder_path
+                    raise
 
-            if hash1 is None:
-                raise Exception(self.lang.get("folder_hash_error", folder1))
+            with open_digest_cache(use_cache) as cache:
+                return compare.hash_pair(hash_one, folder1, folder2, concurrent=True, cancel_event=cancel_event)
 
-            # 计算第二个文件夹的哈希
-            self.update_status(self.lang.get("calculating_folder2"))
-            hash2, files2, size2, elapsed2 = self.compute_folder_hash(
-                folder2,
-                lambda p, s: update_progress(50 + p / 2, s)
-            )
+        def on_progress(snapshot):
+            self.show_progress_snapshot(snapshot, self.folder_compare_progress_var)
 
-            if hash2 is None:
-                raise Exception(self.lang.get("folder_hash_error", folder2))
+        def on_done(results):
+            result1, result2 = results
+            hash1, files1, size1 = result1.digests, result1.total_files, result1.total_size
+            hash2, files2, size2 = result2.digests, result2.total_files, result2.total_size
+            algorithm_text = algorithm_label(algorithms)
 
             # 准备比较结果
-            result = self.lang.get("folder1", folder1) + "\n"
-            result += self.lang.get("total_files", files1) + "\n"
-            result += self.lang.get("folder_size", size1, size1 / (1024 * 1024)) + "\n"
-            result += self.lang.get("hash_algorithm", self.hash_algorithm.get().upper()) + "\n"
-            result += self.lang.get("time_taken", elapsed1) + "\n"
-            result += self.lang.get("folder1_hash", self.hash_algorithm.get().upper(), hash1) + "\n\n"
-
-            result += self.lang.get("folder2", folder2) + "\n"
-            result += self.lang.get("total_files", files2) + "\n"
-            result += self.lang.get("folder_size", size2, size2 / (1024 * 1024)) + "\n"
-            result += self.lang.get("hash_algorithm", self.hash_algorithm.get().upper()) + "\n"
-            result += self.lang.get("time_taken", elapsed2) + "\n"
-            result += self.lang.get("folder2_hash", self.hash_algorithm.get().upper(), hash2) + "\n\n"
+            text = self.lang.get("folder1", folder1) + "\n"
+            text += self.lang.get("total_files", files1) + "\n"
+            text += self.lang.get("folder_size", size1, size1 / (1024 * 1024)) + "\n"
+            text += self.lang.get("hash_algorithm", algorithm_text) + "\n"
+            text += self.lang.get("time_taken", result1.elapsed) + "\n"
+            text += self.lang.get("folder1_hash", algorithm_text, format_digests(hash1)) + "\n\n"
+
+            text += self.lang.get("folder2", folder2) + "\n"
+            text += self.lang.get("total_files", files2) + "\n"
+            text += self.lang.get("folder_size", size2, size2 / (1024 * 1024)) + "\n"
+            text += self.lang.get("hash_algorithm", algorithm_text) + "\n"
+            text += self.lang.get("time_taken", result2.elapsed) + "\n"
+            text += self.lang.get("folder2_hash", algorithm_text, format_digests(hash2)) + "\n\n"
 
             if hash1 == hash2:
-                result += self.lang.get("folder_match_success")
+                text += self.lang.get("folder_match_success")
                 if files1 != files2:
-                    result += "\n" + self.lang.get("file_count_warning", files1, files2)
+                    text += "\n" + self.lang.get("file_count_warning", files1, files2)
                 if size1 != size2:
-                    result += "\n" + self.lang.get("size_warning", size1 / (1024 * 1024), size2 / (1024 * 1024))
+                    text += "\n" + self.lang.get("size_warning", size1 / (1024 * 1024), size2 / (1024 * 1024))
             else:
-                result += self.lang.get("folder_match_fail")
+                text += self.lang.get("folder_match_fail")
                 if files1 != files2:
-                    result += "\n" + self.lang.get("file_count_different", files1, files2)
+                    text += "\n" + self.lang.get("file_count_different", files1, files2)
                 if size1 != size2:
-                    result += "\n" + self.lang.get("size_different", size1 / (1024 * 1024), size2 / (1024 * 1024))
+                    text += "\n" + self.lang.get("size_different", size1 / (1024 * 1024), size2 / (1024 * 1024))
                 else:
-                    result += "\n" + self.lang.get("size_same_content_different")
+                    text += "\n" + self.lang.get("size_same_content_different")
 
-            # 更新结果文本框
-            self.folder_compare_text.config(state=tk.NORMAL)
-            self.folder_compare_text.delete(1.0, tk.END)
-            self.folder_compare_text.insert(tk.END, result)
-            self.folder_compare_text.config(state=tk.DISABLED)
+            self.set_result_text(self.folder_compare_text, text)
+            self.update_status(self.lang.get("folder_comparison_complete", result1.elapsed + result2.elapsed))
 
-            self.update_status(self.lang.get("folder_comparison_complete", elapsed1 + elapsed2))
+        def on_error(e):
+            messagebox.showerror(self.lang.get("error"), self.lang.get("folder_hash_error", describe_error(e)))
+            self.update_status(self.lang.get("comparison_failed"))
+
+        if not self.start_task(work, on_progress, on_done, on_error, self.end_folder_compare_task):
+            return
+        self.begin_folder_compare_task()
+
+    def begin_folder_compare_task(self):
+        """禁用文件夹比较标签页的按钮防止重复点击，并显示进度条"""
+        self.compare_folders_button.state(["disabled"])
+        self.browse_folder1_button.state(["disabled"])
+        self.browse_folder2_button.state(["disabled"])
+        self.folder_compare_view.clear()
+        self.update_status(self.lang.get("comparing_folders"))
+        self.folder_compare_progress_var.set(0)
+        self.folder_compare_progress_bar.pack(fill=tk.X, padx=10, pady=5)
 
-        except Exception as e:
-            messagebox.showerror(self.lang.get("error"), str(e))
+    def end_folder_compare_task(self):
+        """恢复文件夹比较标签页的按钮并隐藏进度条"""
+        self.compare_folders_button.state(["!disabled"])
+        self.browse_folder1_button.state(["!disabled"])
+        self.browse_folder2_button.state(["!disabled"])
+        self.folder_compare_progress_bar.pack_forget()
+
+    def diff_folders(self, folder1, folder2, algorithm):
+        """逐文件比较两个文件夹，结果边比较边追加到结果框中"""
+        options = self.folder_hash_options()
+        workers = options.get("workers", 1)
+        traversal = options.get("traversal")
+        use_cache = self.cache_var.get()
+        # 后台任务只保留最新的进度消息，逐条结果通过单独的队列传给界面线程
+        pending = queue.Queue()
+        labels = {
+            compare.STATUS_ADDED: self.lang.get("diff_added"),
+            compare.STATUS_REMOVED: self.lang.get("diff_removed"),
+            compare.STATUS_MODIFIED: self.lang.get("diff_modified"),
+            compare.STATUS_ERROR: self.lang.get("diff_error"),
+        }
+
+        export_path = self.export_path
+
+        def work(report_progress, cancel_event):
+            with open_digest_cache(use_cache) as cache, open_result_sink(export_path) as sink:
+                # 导出文件中也包括未变化的文件
+                def on_result(status, rel_path, detail):
+                    if status != compare.STATUS_UNCHANGED:
+                        pending.put((labels[status], rel_path, detail))
+                    if sink is not None:
+                        sink.write(status_record(status, rel_path, detail))
+
+                result = compare.diff_folders(folder1, folder2, algorithm, workers=workers, cache=cache,
+                                              progress_callback=report_progress, result_callback=on_result,
+                                              cancel_event=cancel_event, traversal=traversal)
+                if sink is not None:
+                    sink.write(diff_summary_record(result))
+                return result
+
+        def on_progress(processed_files, total_files, rel_path):
+            self.flush_result_rows(pending, self.folder_compare_view)
+            self.folder_compare_progress_var.set(processed_files / total_files * 100 if total_files else 100)
+            self.update_status(self.lang.get("processing", rel_path, processed_files, total_files))
+
+        def on_done(result):
+            self.flush_result_rows(pending, self.folder_compare_view)
+            text = self.lang.get("diff_summary", len(result.added), len(result.removed),
+                                 len(result.modified), len(result.unchanged), len(result.errors)) + "\n"
+            text += self.lang.get("diff_hashed", result.files_hashed, result.bytes_hashed / (1024 * 1024)) + "\n"
+            text += self.lang.get("time_taken", result.elapsed) + "\n\n"
+            text += self.lang.get("diff_identical" if result.identical else "diff_different")
+            if export_path:
+                text += "\n" + self.lang.get("export_to", export_path)
+            self.append_result_text(self.folder_compare_text, text)
+            self.update_status(self.lang.get("folder_comparison_complete", result.elapsed))
+
+        def on_error(e):
+            self.flush_result_rows(pending, self.folder_compare_view)
+            messagebox.showerror(self.lang.get("error"), self.lang.get("folder_hash_error", describe_error(e)))
             self.update_status(self.lang.get("comparison_failed"))
-        finally:
-            # 启用按钮
-            self.compare_folders_button.state(["!disabled"])
-            self.browse_folder1_button.state(["!disabled"])
-            self.browse_folder2_button.state(["!disabled"])
-            self.folder_compare_progress_bar.pack_forget()  # 隐藏进度条
+
+        if not self.start_task(work, on_progress, on_done, on_error, self.end_folder_compare_task):
+            return
+        header = self.lang.get("folder1", folder1) + "\n" + self.lang.get("folder2", folder2) + "\n"
+        header += self.lang.get("hash_algorithm", algorithm.upper()) + "\n\n"
+        self.set_result_text(self.folder_compare_text, header)
+        self.begin_folder_compare_task()
+
+    def find_duplicates(self):
+        """在文件夹中查找内容相同的文件"""
+        folder_path = self.dupes_path_var.get()
+        if not os.path.isdir(folder_path):
+            messagebox.showwarning(self.lang.get("error"), self.lang.get("folder_not_exist", folder_path))
+            return
+
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        options = self.folder_hash_options()
+        workers = options.get("workers", 1)
+        traversal = options.get("traversal")
+        use_cache = self.cache_var.get()
+
+        def work(report_progress, cancel_event):
+            with open_digest_cache(use_cache) as cache:
+                return duplicates.find_duplicates([folder_path], algorithms[0], workers=workers, cache=cache,
+                                                  progress_callback=report_progress, cancel_event=cancel_event,
+                                                  traversal=traversal)
+
+        def on_progress(processed_files, total_files, path):
+            if total_files:
+                self.dupes_progress_var.set(processed_files / total_files * 100)
+            self.update_status(self.lang.get("processing", path, processed_files, total_files))
+
+        def on_done(report):
+            lines = [
+                self.lang.get("folder_path", folder_path),
+                self.lang.get("total_files", report.total_files),
+                self.lang.get("hash_algorithm", report.algorithm.upper()),
+                self.lang.get("time_taken", report.elapsed),
+                self.lang.get("duplicates_summary", len(report.groups), report.reclaimable / (1024 * 1024),
+                              report.full_hashed),
+            ]
+            if report.errors:
+                lines.append(self.lang.get("unreadable_files", len(report.errors)))
+            self.set_result_text(self.dupes_result_text, "\n".join(lines))
+
+            # 各组的文件和无法读取的文件放入表格，按组号排序时同组的文件相邻
+            rows = []
+            for number, group in enumerate(report.groups, 1):
+                detail = self.lang.get("duplicate_group", len(group.paths), group.size,
+                                       group.reclaimable / (1024 * 1024))
+                rows.extend((number, path, detail) for path in group.paths)
+            error_label = self.lang.get("diff_error")
+            rows.extend((None, path, "{} {}".format(error_label, error)) for path, error in report.errors.items())
+            self.dupes_result_view.append(rows)
+            self.update_status(self.lang.get("duplicates_complete", len(report.groups), report.elapsed))
+
+        def on_error(e):
+            messagebox.showerror(self.lang.get("error"),
+                                 self.lang.get("folder_hash_error", folder_path) + "\n" + describe_error(e))
+            self.update_status(self.lang.get("folder_calculation_failed"))
+
+        def on_finally():
+            self.find_duplicates_button.state(["!disabled"])
+            self.browse_dupes_button.state(["!disabled"])
+            self.dupes_progress_bar.pack_forget()
+
+        if not self.start_task(work, on_progress, on_done, on_error, on_finally):
+            return
+        self.find_duplicates_button.state(["disabled"])
+        self.browse_dupes_button.state(["disabled"])
+        self.set_result_text(self.dupes_result_text, "")
+        self.dupes_result_view.clear()
+        self.update_status(self.lang.get("finding_duplicates"))
+        self.dupes_progress_var.set(0)
+        self.dupes_progress_bar.pack(fill=tk.X, pady=5)
+
+    def add_batch_paths(self, paths):
+        """把路径加入批量任务队列并在列表中显示"""
+        added = self.job_queue.add(paths)
+        for job in added:
+            self.batch_tree.insert("", tk.END, iid=str(job.job_id), values=self.batch_row(job))
+        self.update_status(self.lang.get("batch_added", len(added)))
+
+    def add_batch_files(self):
+        paths = filedialog.askopenfilenames(
+            title=self.lang.get("select_file"),
+            filetypes=[(self.lang.get("all_files"), "*.*")]
+        )
+        if paths:
+            self.add_batch_paths(paths)
+
+    def add_batch_folder(self):
+        folder_path = filedialog.askdirectory(title=self.lang.get("select_folder"))
+        if folder_path:
+            self.add_batch_paths([folder_path])
+
+    def paste_batch_paths(self):
+        """从剪贴板加入路径列表 (每行一个)"""
+        try:
+            paths = parse_path_list(self.root.clipboard_get())
+        except tk.TclError:
+            paths = []
+        if not paths:
+            messagebox.showwarning(self.lang.get("error"), self.lang.get("batch_clipboard_empty"))
+            return
+        self.add_batch_paths(paths)
+
+    def on_batch_drop(self, event):
+        """拖入的文件和文件夹 (需要 tkinterdnd2)"""
+        self.add_batch_paths(self.root.tk.splitlist(event.data))
+
+    def batch_row(self, job):
+        """任务在列表中的一行"""
+        size = ""
+        detail = ""
+        if job.status == JOB_DONE:
+            size = job.result.total_size if job.kind == "folder" else job.result.size
+            # 列表的单元格只能显示一行
+            detail = format_digests(job.result.digests).replace("\n", "  ")
+        elif job.error is not None:
+            detail = describe_error(job.error)
+        return (job.priority, self.lang.get("batch_status_" + job.status), job.path, job.attempts, size, detail)
+
+    def refresh_batch_rows(self, jobs=None):
+        for job in jobs if jobs is not None else self.job_queue.jobs:
+            if self.batch_tree.exists(str(job.job_id)):
+                self.batch_tree.item(str(job.job_id), values=self.batch_row(job))
+
+    def selected_batch_jobs(self):
+        selected = set(self.batch_tree.selection())
+        return [job for job in self.job_queue.jobs if str(job.job_id) in selected]
+
+    def change_batch_priority(self, delta):
+        """调整所选任务的优先级，数值越大越先运行"""
+        jobs = self.selected_batch_jobs()
+        for job in jobs:
+            self.job_queue.set_priority(job, job.priority + delta)
+        self.refresh_batch_rows(jobs)
+
+    def retry_batch_jobs(self):
+        """重试所选的失败任务，未选择时重试全部失败任务"""
+        jobs = self.job_queue.retry(self.selected_batch_jobs() or None)
+        self.refresh_batch_rows(jobs)
+
+    def remove_batch_jobs(self):
+        """移除所选的任务 (运行中的任务除外)"""
+        jobs = self.selected_batch_jobs()
+        self.job_queue.remove(jobs)
+        remaining = {str(job.job_id) for job in self.job_queue.jobs}
+        for job in jobs:
+            if str(job.job_id) not in remaining:
+                self.batch_tree.delete(str(job.job_id))
+
+    def start_batch(self):
+        """按优先级运行队列中等待的任务，运行期间仍可加入任务"""
+        if not self.job_queue.counts()[JOB_PENDING]:
+            messagebox.showwarning(self.lang.get("error"), self.lang.get("batch_empty"))
+            return
+        algorithms = self.selected_algorithms()
+        if not algorithms:
+            return
+        folder_options = self.folder_hash_options()
+        try:
+            concurrency = max(1, int(self.workers_var.get()))
+        except (tk.TclError, ValueError):
+            concurrency = os.cpu_count() or 1
+        use_cache = self.cache_var.get()
+        export_path = self.export_path
+        # 任务状态的变化通过单独的队列传给界面线程
+        updated = queue.Queue()
+
+        def work(report_progress, cancel_event):
+            tracker = ProgressTracker(report_progress)
+            with open_digest_cache(use_cache) as cache, open_result_sink(export_path) as sink:
+                def on_update(job):
+                    updated.put(job)
+                    if sink is None:
+                        return
+                    if job.status == JOB_DONE:
+                        sink.write(folder_record(job.result) if job.kind == "folder" else file_record(job.result))
+                    elif job.status == JOB_FAILED:
+                        sink.write({"path": job.path, "error": describe_error(job.error)})
+
+                return self.job_queue.run(algorithms, concurrency, folder_options, cache, tracker=tracker,
+                                          cancel_event=cancel_event, on_update=on_update)
+
+        def flush_updates():
+            jobs = {}
+            while True:
+                try:
+                    job = updated.get_nowait()
+                except queue.Empty:
+                    break
+                jobs[job.job_id] = job
+            self.refresh_batch_rows(jobs.values())
+
+        def on_progress(snapshot):
+            flush_updates()
+            self.show_progress_snapshot(snapshot, self.batch_progress_var)
+
+        def on_done(report):
+            self.update_status(self.lang.get("batch_complete", report.done, report.failed,
+                                             report.total_size / (1024 * 1024), report.elapsed))
+
+        def on_error(e):
+            messagebox.showerror(self.lang.get("error"), describe_error(e))
+
+        def on_finally():
+            flush_updates()
+            self.start_batch_button.state(["!disabled"])
+            self.batch_progress_bar.pack_forget()
+
+        if not self.start_task(work, on_progress, on_done, on_error, on_finally):
+            return
+        self.start_batch_button.state(["disabled"])
+        self.update_status(self.lang.get("batch_running"))
+        self.batch_progress_var.set(0)
+        self.batch_progress_bar.pack(fill=tk.X, padx=10, pady=5, before=self.batch_result_frame)
 
     def on_close(self):
         """关闭窗口事件处理"""
         if messagebox.askokcancel(self.lang.get("exit_confirmation"), self.lang.get("exit_message")):
+            # 通知后台任务停止读取
+            if self.current_task is not None:
+                self.current_task.cancel()
             self.root.destroy()
 
 
@@ -0,0 +1,152 @@
+"""
+哈希算法注册表
+
+除 hashlib 的算法外，还提供两类更快的选择：
+  - 标准库自带：blake2b / blake2s (加密强度，单核通常快于 SHA-256)、crc32 (zlib)
+  - 安装了对应库时才可用：blake3 (内部多线程)、xxHash (xxh64 / xxh3_64 / xxh3_128)、crc32c
+xxHash 和 CRC 不是加密哈希，只适合检查传输和存储错误，不能防止有意篡改。
+
+available_algorithms() 返回当前环境中可用的算法，图形界面和命令行据此生成算法列表。
+"""
+import hashlib
+import zlib
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class AlgorithmInfo(NamedTuple):
+    """
+    :param name: 算法名 (小写，用于参数、缓存和清单)
+    :param label: 显示名称
+    :param cryptographic: 是否为加密哈希
+    :param factory: 创建哈希对象的函数
+    """
+    name: str
+    label: str
+    cryptographic: bool
+    factory: Callable
+
+
+class _CrcHash:
+    """CRC 函数 (crc32(data, value) -> int) 的 hashlib 风格封装"""
+    digest_size = 4
+
+    def __init__(self, name: str, func: Callable[[bytes, int], int], crc: int = 0):
+        self.name = name
+        self._func = func
+        self._crc = crc
+
+    def update(self, data) -> None:
+        self._crc = self._func(data, self._crc)
+
+    def copy(self):
+        return _CrcHash(self.name, self._func, self._crc)
+
+    def digest(self) -> bytes:
+        return self._crc.to_bytes(4, "big")
+
+    def hexdigest(self) -> str:
+        return "{:08x}".format(self._crc)
+
+
+def _crc32():
+    return _CrcHash("crc32", zlib.crc32)
+
+
+# 内置算法，按界面中的显示顺序排列
+_BUILTIN = (
+    AlgorithmInfo("sha256", "SHA-256", True, hashlib.sha256),
+    AlgorithmInfo("sha1", "SHA-1", True, hashlib.sha1),
+    AlgorithmInfo("md5", "MD5", True, hashlib.md5),
+    AlgorithmInfo("sha512", "SHA-512", True, hashlib.sha512),
+    AlgorithmInfo("blake2b", "BLAKE2b", True, hashlib.blake2b),
+    AlgorithmInfo("blake2s", "BLAKE2s", True, hashlib.blake2s),
+    AlgorithmInfo("crc32", "CRC32", False, _crc32),
+)
+
+
+def _crc32c_function() -> Optional[Callable[[bytes, int], int]]:
+    """crc32c 或 google-crc32c 库提供的 CRC32C 函数，均未安装时返回 None"""
+    try:
+        import crc32c
+        return crc32c.crc32c
+    except (ImportError, AttributeError):
+        pass
+    try:
+        import google_crc32c
+    except ImportError:
+        return None
+    return lambda data, crc: google_crc32c.extend(crc, data)
+
+
+def _optional_algorithms() -> List[AlgorithmInfo]:
+    """检测可选库，返回其中可用的算法"""
+    found = []
+    try:
+        import blake3
+    except ImportError:
+        pass
+    else:
+        # AUTO: 较大的数据块由 blake3 内部的线程池并行计算
+        found.append(AlgorithmInfo("blake3", "BLAKE3", True,
+                                   lambda: blake3.blake3(max_threads=blake3.blake3.AUTO)))
+
+    try:
+        import xxhash
+    except ImportError:
+        pass
+    else:
+        found.append(AlgorithmInfo("xxh64", "xxHash64", False, xxhash.xxh64))
+        if hasattr(xxhash, "xxh3_64"):
+            found.append(AlgorithmInfo("xxh3_64", "XXH3-64", False, xxhash.xxh3_64))
+            found.append(AlgorithmInfo("xxh3_128", "XXH3-128", False, xxhash.xxh3_128))
+
+    crc32c_func = _crc32c_function()
+    if crc32c_func is not None:
+        found.append(AlgorithmInfo("crc32c", "CRC32C", False, lambda: _CrcHash("crc32c", crc32c_func)))
+    return found
+
+
+_registry: Optional[Dict[str, AlgorithmInfo]] = None
+
+
+def _algorithms() -> Dict[str, AlgorithmInfo]:
+    global _registry
+    if _registry is None:
+        registry = {info.name: info for info in _BUILTIN}
+        registry.update((info.name, info) for info in _optional_algorithms()
+                        if _fixed_length(info.factory()))
+        _registry = registry
+    return _registry
+
+
+def _fixed_length(hash_obj) -> bool:
+    """
+    摘要长度是否固定。shake_128/shake_256 等可变长度算法 (XOF) 的 digest_size 为 0，
+    hexdigest() 需要指定长度，无法作为文件摘要使用
+    """
+    return getattr(hash_obj, "digest_size", 0) > 0
+
+
+def available_algorithms() -> List[AlgorithmInfo]:
+    """当前环境中可用的算法：内置算法在前，可选库提供的算法在后"""
+    return list(_algorithms().values())
+
+
+def algorithm_info(name: str) -> Optional[AlgorithmInfo]:
+    """注册表中的算法信息，hashlib 支持但未列出的算法 (如 sha3_256) 返回 None"""
+    return _algorithms().get(name.lower())
+
+
+def new_hash(name: str):
+    """
+    创建哈希对象，注册表中没有的算法交给 hashlib.new
+
+    :raises ValueError: 算法不受支持 (包括未安装对应库的可选算法和可变长度的算法)
+    """
+    info = _algorithms().get(name)
+    if info is not None:
+        return info.factory()
+    hash_obj = hashlib.new(name)
+    if not _fixed_length(hash_obj):
+        raise ValueError("variable-length hash algorithm is not supported: {}".format(name))
+    return hash_obj
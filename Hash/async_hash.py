@@ -0,0 +1,198 @@
+"""
+asyncio 接口
+
+在 asyncio 服务中直接调用 compute_file_hash 会阻塞事件循环。AsyncHasher 把读取文件和计算摘要
+交给自己的有界线程池，并用信号量限制同时提交的任务数：超出的调用在事件循环中等待，
+不会堆积在线程池的队列里。协程被取消时通过 cancel_event 通知后台线程，在下一个数据块处停止读取。
+
+    async with AsyncHasher(max_workers=8) as hasher:
+        result = await hasher.hash_file("a.iso", "sha256")
+        async for path, result, error in hasher.as_completed(paths, "sha256"):
+            ...
+
+进度回调在事件循环线程中调用，可以直接操作其他 asyncio 对象。
+"""
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterable, AsyncIterator, Callable, Iterable, List, Optional, Tuple, Union
+
+import hash_engine
+from digest_cache import DigestCache
+from file_reader import ReadOptions
+from hash_engine import THREADED_MIN_CHUNK, Algorithms, FileHashResult, FolderHashResult, MultiHash
+
+# as_completed 产出的结果: (路径, 结果, None) 或读取失败时的 (路径, None, OSError)
+HashOutcome = Tuple[str, Optional[FileHashResult], Optional[OSError]]
+
+
+async def _iterate(items: Union[Iterable, AsyncIterable]) -> AsyncIterator:
+    """把普通可迭代对象和异步可迭代对象统一为异步迭代器"""
+    if hasattr(items, "__aiter__"):
+        async for item in items:
+            yield item
+    else:
+        for item in items:
+            yield item
+
+
+class AsyncHasher:
+    """
+    哈希计算的 asyncio 封装
+
+    :param max_workers: 线程池大小，也是同时运行的阻塞任务数上限，默认为 CPU 数
+    :param cache: 摘要缓存 (可在多个线程中使用)
+    :param read_options: 读取策略和块大小
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, cache: Optional[DigestCache] = None,
+                 read_options: Optional[ReadOptions] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        if self.max_workers < 1:
+            raise ValueError("max_workers must be positive")
+        self.cache = cache
+        self.read_options = read_options
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="async-hash")
+        self._semaphore = asyncio.Semaphore(self.max_workers)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        """关闭线程池，不等待正在运行的任务 (已取消的任务会在下一个数据块处停止)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func: Callable, *args, progress_callback: Optional[Callable] = None, **kwargs):
+        """
+        在线程池中运行 func(*args, progress_callback, cancel_event, **kwargs)
+
+        进度回调转发到事件循环线程；协程被取消时设置 cancel_event 让后台线程停止。
+        """
+        loop = asyncio.get_running_loop()
+        cancel_event = threading.Event()
+
+        def report(*values):
+            loop.call_soon_threadsafe(progress_callback, *values)
+
+        async with self._semaphore:
+            call = functools.partial(func, *args, report if progress_callback else None, cancel_event, **kwargs)
+            try:
+                return await loop.run_in_executor(self._executor, call)
+            except asyncio.CancelledError:
+                cancel_event.set()
+                raise
+
+    async def hash_file(self, file_path: str, algorithm: Algorithms = "sha256",
+                        progress_callback: Optional[hash_engine.BytesProgressCallback] = None) -> FileHashResult:
+        """
+        compute_file_hash 的协程版本
+
+        :param progress_callback: 进度回调 (已读取字节数, 文件总字节数)，在事件循环线程中调用
+        :raises FileNotFoundError: 文件不存在
+        :raises OSError: 读取文件失败
+        """
+        return await self._run(hash_engine.compute_file_hash, file_path, algorithm,
+                               progress_callback=progress_callback, cache=self.cache,
+                               read_options=self.read_options)
+
+    async def hash_folder(self, folder_path: str, algorithm: Algorithms = "sha256",
+                          progress_callback: Optional[hash_engine.ProgressCallback] = None,
+                          **kwargs) -> FolderHashResult:
+        """
+        compute_folder_hash 的协程版本，占用线程池中的一个线程
+
+        :param kwargs: mode、workers、pool、queue_depth 等，含义与 compute_folder_hash 相同
+        :raises NotADirectoryError: 文件夹不存在
+        """
+        kwargs.setdefault("cache", self.cache)
+        kwargs.setdefault("read_options", self.read_options)
+        return await self._run(hash_engine.compute_folder_hash, folder_path, algorithm,
+                               progress_callback=progress_callback, **kwargs)
+
+    async def hash_files(self, paths: Iterable[str], algorithm: Algorithms = "sha256") -> List[FileHashResult]:
+        """
+        并发计算多个文件，结果与 paths 的顺序一致
+
+        :raises OSError: 任一文件读取失败 (其余任务随之取消)
+        """
+        tasks = [asyncio.ensure_future(self.hash_file(path, algorithm)) for path in paths]
+        try:
+            return list(await asyncio.gather(*tasks))
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def as_completed(self, paths: Union[Iterable[str], AsyncIterable[str]], algorithm: Algorithms = "sha256",
+                           window: Optional[int] = None) -> AsyncIterator[HashOutcome]:
+        """
+        并发计算多个文件，按完成顺序逐个产出结果
+
+        paths 可以是异步可迭代对象 (如上传队列)，只有在途任务少于 window 时才取下一个路径，
+        调用方处理结果较慢时不会无限制地提前读取。提前结束迭代时取消剩余的任务。
+
+        :param window: 最多同时在途的文件数，默认为 max_workers 的 2 倍
+        :return: 异步生成 (路径, FileHashResult, None) 或读取失败时的 (路径, None, OSError)
+        """
+        window = window or self.max_workers * 2
+        source = _iterate(paths).__aiter__()
+        exhausted = False
+        pending = set()
+
+        async def hash_one(path):
+            try:
+                return path, await self.hash_file(path, algorithm), None
+            except OSError as e:
+                return path, None, e
+
+        try:
+            while True:
+                while not exhausted and len(pending) < window:
+                    try:
+                        path = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    pending.add(asyncio.ensure_future(hash_one(path)))
+                if not pending:
+                    return
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def hash_chunks(self, chunks: AsyncIterable[bytes], algorithm: Algorithms = "sha256",
+                          name: str = "-") -> FileHashResult:
+        """
+        计算异步数据流 (如上传请求体) 的哈希值，不需要先写入文件
+
+        不小于 THREADED_MIN_CHUNK 的数据块在线程池中计算 (hashlib 会释放 GIL)，
+        较小的数据块直接在事件循环中计算，避免线程切换的开销超过计算本身。
+
+        :param chunks: 产出 bytes 的异步可迭代对象
+        :param name: 结果中记录的路径名
+        :return: FileHashResult，size 为数据总字节数
+        """
+        algorithms = hash_engine.normalize_algorithms(algorithm)
+        loop = asyncio.get_running_loop()
+        hash_obj = MultiHash(algorithms, threaded=False)
+        total = 0
+        start_time = loop.time()
+        async for data in chunks:
+            if len(data) >= THREADED_MIN_CHUNK:
+                async with self._semaphore:
+                    await loop.run_in_executor(self._executor, hash_obj.update, data)
+            else:
+                hash_obj.update(data)
+            total += len(data)
+        digests = hash_obj.hexdigests()
+        return FileHashResult(name, algorithms[0], digests[algorithms[0]], total, loop.time() - start_time,
+                              digests=digests)
@@ -0,0 +1,490 @@
+"""
+哈希吞吐量基准测试
+
+在临时目录中生成测试文件，测量不同读取策略和块大小下的吞吐量 (MB/s)，
+file_reader 中 auto 策略的阈值即根据这里的结果确定。
+--algorithms 测量各哈希算法在同一文件上的吞吐量 (auto 策略)，用于选择算法。
+
+--suite 运行完整的基准测试：生成三种测试数据 (单个大文件、大量小文件、深层目录树)，
+对每个 (算法, 块大小, 读取策略, 并行数) 组合测量 MB/s、files/s、stat 调用次数和峰值内存，
+结果写为 JSON，--compare 可以与之前保存的结果逐项对比，用于发现性能回退。
+每个组合默认在单独的子进程中运行，峰值内存互不影响。
+
+用法:
+    python benchmark.py [--sizes 64K 1M 16M 256M] [--repeat 3] [--algorithm sha256]
+    python benchmark.py --algorithms all [--sizes 256M]
+    python benchmark.py --suite [--fixtures huge tiny deep] [--algorithms sha256 blake2b]
+                        [--chunk-sizes auto 64K 1M] [--strategies auto readinto mmap] [--workers 1 4]
+                        [--output results.json] [--compare baseline.json]
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import hash_engine
+from algorithms import available_algorithms, new_hash
+from file_reader import READ_STRATEGIES, ReadOptions, update_hash_from_file
+from scanner import scan_folder
+
+try:
+    import resource
+except ImportError:
+    # Windows 上没有 resource 模块，不报告峰值内存
+    resource = None
+
+# 默认测试的文件大小
+DEFAULT_SIZES = ("4K", "64K", "1M", "16M", "256M")
+
+# 默认测试的 (读取策略, 块大小) 组合
+DEFAULT_CASES = (
+    ("read", 65536),
+    ("read", 1024 * 1024),
+    ("readinto", 65536),
+    ("readinto", 1024 * 1024),
+    ("mmap", 1024 * 1024),
+    ("auto", None),
+)
+
+
+def parse_size(text: str) -> int:
+    """解析 "64K"、"16M"、"1G" 这样的大小"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    """把字节数格式化为 "64K" 这样的形式"""
+    for unit, factor in (("G", 1024 ** 3), ("M", 1024 ** 2), ("K", 1024)):
+        if size >= factor and size % factor == 0:
+            return "{}{}".format(size // factor, unit)
+    return str(size)
+
+
+def write_test_file(path: str, size: int) -> None:
+    """写入指定大小的随机内容"""
+    block = os.urandom(min(size, 1024 * 1024)) if size else b""
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+
+def time_read(path: str, algorithm: str, options: ReadOptions, repeat: int) -> float:
+    """返回多次运行中最短的耗时 (秒)，文件内容处于页缓存中"""
+    best = float("inf")
+    for _ in range(repeat):
+        hash_obj = new_hash(algorithm)
+        start = time.perf_counter()
+        update_hash_from_file(hash_obj, path, options)
+        hash_obj.digest()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_read_strategies(sizes, cases=DEFAULT_CASES, algorithm="sha256", repeat=3, directory=None):
+    """
+    测量每种文件大小下各读取策略的吞吐量
+
+    :param sizes: 文件大小列表 (字节)
+    :param cases: (读取策略, 块大小) 列表
+    :param algorithm: 哈希算法
+    :param repeat: 每项重复次数，取最好成绩
+    :param directory: 存放测试文件的目录，默认为系统临时目录
+    :return: [{"size", "strategy", "chunk_size", "seconds", "mb_per_s"}, ...]
+    """
+    results = []
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, "bench_{}.bin".format(size))
+            write_test_file(path, size)
+            for strategy, chunk_size in cases:
+                # 关闭 fadvise，保证每次都在热缓存上比较策略本身的开销
+                options = ReadOptions(strategy, chunk_size, fadvise=False)
+                seconds = time_read(path, algorithm, options, repeat)
+                results.append({
+                    "size": size,
+                    "strategy": strategy,
+                    "chunk_size": chunk_size,
+                    "seconds": seconds,
+                    "mb_per_s": size / (1024 * 1024) / seconds if seconds > 0 else float("inf"),
+                })
+            os.remove(path)
+    return results
+
+
+def benchmark_algorithms(sizes, algorithms=None, repeat=3, directory=None):
+    """
+    测量每种文件大小下各哈希算法的吞吐量，读取策略为 auto
+
+    :param sizes: 文件大小列表 (字节)
+    :param algorithms: 算法名列表，默认为当前环境中所有可用的算法
+    :param repeat: 每项重复次数，取最好成绩
+    :param directory: 存放测试文件的目录，默认为系统临时目录
+    :return: [{"size", "algorithm", "seconds", "mb_per_s"}, ...]
+    """
+    if algorithms is None:
+        algorithms = [info.name for info in available_algorithms()]
+    results = []
+    options = ReadOptions(fadvise=False)
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        for size in sizes:
+            path = os.path.join(tmp, "bench_{}.bin".format(size))
+            write_test_file(path, size)
+            for algorithm in algorithms:
+                seconds = time_read(path, algorithm, options, repeat)
+                results.append({
+                    "size": size,
+                    "algorithm": algorithm,
+                    "seconds": seconds,
+                    "mb_per_s": size / (1024 * 1024) / seconds if seconds > 0 else float("inf"),
+                })
+            os.remove(path)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark file read strategies for hashing")
+    parser.add_argument("--suite", action="store_true",
+                        help="run the fixture suite (huge file, many tiny files, deep tree) and report JSON")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES, help="file sizes, e.g. 64K 16M 1G")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--algorithm", default="sha256")
+    parser.add_argument("--algorithms", nargs="+", metavar="NAME",
+                        help="compare hash algorithms instead of read strategies ('all' for every available one)")
+    parser.add_argument("--dir", default=None, help="directory for the generated test files")
+
+    suite = parser.add_argument_group("suite options")
+    suite.add_argument("--fixtures", nargs="+", choices=FIXTURES, default=list(FIXTURES))
+    suite.add_argument("--huge-size", type=parse_size, default="256M", help="size of the huge file (default: 256M)")
+    suite.add_argument("--tiny-count", type=int, default=10000, help="number of tiny files (default: 10000)")
+    suite.add_argument("--tiny-size", type=parse_size, default="1K", help="size of each tiny file (default: 1K)")
+    suite.add_argument("--depth", type=int, default=64, help="depth of the deep tree (default: 64)")
+    suite.add_argument("--chunk-sizes", nargs="+", default=["auto"], metavar="SIZE",
+                       help="read chunk sizes, 'auto' lets the strategy decide (default: auto)")
+    suite.add_argument("--strategies", nargs="+", choices=READ_STRATEGIES, default=["auto"])
+    suite.add_argument("--workers", nargs="+", type=int, default=sorted({1, os.cpu_count() or 1}),
+                       help="worker counts for the folder fixtures (default: 1 and the CPU count)")
+    suite.add_argument("--pool", choices=("thread", "process"), default="thread")
+    suite.add_argument("--output", "-o", default=None, help="write the JSON results here instead of stdout")
+    suite.add_argument("--compare", default=None, metavar="JSON", help="show the speedup against earlier results")
+    suite.add_argument("--no-isolate", action="store_true",
+                       help="run every case in this process (faster, but peak RSS only ever grows)")
+    args = parser.parse_args(argv)
+
+    if args.suite:
+        run_suite(args)
+        return
+
+    if args.algorithms:
+        names = None if args.algorithms == ["all"] else args.algorithms
+        results = benchmark_algorithms([parse_size(s) for s in args.sizes], names, args.repeat, args.dir)
+        print("{:>8} {:>10} {:>10}".format("size", "algorithm", "MB/s"))
+        for row in results:
+            print("{:>8} {:>10} {:>10.1f}".format(format_size(row["size"]), row["algorithm"], row["mb_per_s"]))
+        return
+
+    results = benchmark_read_strategies([parse_size(s) for s in args.sizes], algorithm=args.algorithm,
+                                        repeat=args.repeat, directory=args.dir)
+    print("{:>8} {:>9} {:>8} {:>10}".format("size", "strategy", "chunk", "MB/s"))
+    for row in results:
+        chunk = format_size(row["chunk_size"]) if row["chunk_size"] else "-"
+        print("{:>8} {:>9} {:>8} {:>10.1f}".format(format_size(row["size"]), row["strategy"], chunk,
+                                                   row["mb_per_s"]))
+
+
+# 基准测试结果的 JSON 格式版本
+SUITE_VERSION = 1
+
+# 测试数据种类
+FIXTURES = ("huge", "tiny", "deep")
+
+# 深层目录树每层的文件数和文件大小
+DEEP_FILES_PER_LEVEL = 4
+DEEP_FILE_SIZE = 16 * 1024
+
+# 大量小文件时每个子目录中的文件数
+TINY_FILES_PER_DIR = 100
+
+# 对比结果时用于匹配同一组合的字段
+CASE_KEY_FIELDS = ("fixture", "operation", "algorithm", "strategy", "chunk_size", "workers", "pool")
+
+
+def make_fixture(kind, root, huge_size=256 * 1024 ** 2, tiny_count=10000, tiny_size=1024, depth=64):
+    """
+    在 root 下生成一种测试数据
+
+    :param kind: "huge" 单个大文件，"tiny" 大量小文件，"deep" 每层几个文件的深层目录链
+    :return: (路径, 文件数, 总字节数)，huge 的路径为文件，其余为文件夹
+    """
+    if kind == "huge":
+        path = os.path.join(root, "huge.bin")
+        write_test_file(path, huge_size)
+        return path, 1, huge_size
+
+    path = os.path.join(root, kind)
+    if kind == "tiny":
+        for i in range(tiny_count):
+            dir_path = os.path.join(path, "d{:04d}".format(i // TINY_FILES_PER_DIR))
+            if i % TINY_FILES_PER_DIR == 0:
+                os.makedirs(dir_path)
+            with open(os.path.join(dir_path, "f{:06d}.bin".format(i)), "wb") as f:
+                f.write(os.urandom(tiny_size))
+        return path, tiny_count, tiny_count * tiny_size
+    if kind == "deep":
+        dir_path = path
+        for level in range(depth):
+            dir_path = os.path.join(dir_path, "l{}".format(level))
+            os.makedirs(dir_path)
+            for i in range(DEEP_FILES_PER_LEVEL):
+                write_test_file(os.path.join(dir_path, "f{}.bin".format(i)), DEEP_FILE_SIZE)
+        count = depth * DEEP_FILES_PER_LEVEL
+        return path, count, count * DEEP_FILE_SIZE
+    raise ValueError("unknown fixture: {}".format(kind))
+
+
+@contextlib.contextmanager
+def count_stat_calls():
+    """
+    统计 Python 层的 stat 调用次数：os.stat / os.lstat / os.fstat 以及 DirEntry.stat
+
+    计数会拖慢被测代码，只用于单独的一次运行，不与计时同时进行；
+    进程池的工作进程中的调用不计入。
+    """
+    counter = itertools.count()
+    patched = {name: getattr(os, name) for name in ("stat", "lstat", "fstat", "scandir")}
+
+    def counting(func):
+        def wrapper(*args, **kwargs):
+            next(counter)
+            return func(*args, **kwargs)
+        return wrapper
+
+    class CountingEntry:
+        def __init__(self, entry):
+            self._entry = entry
+
+        def __getattr__(self, name):
+            return getattr(self._entry, name)
+
+        def __fspath__(self):
+            return self._entry.path
+
+        def stat(self, **kwargs):
+            next(counter)
+            return self._entry.stat(**kwargs)
+
+    class CountingScandir:
+        def __init__(self, *args):
+            self._it = patched["scandir"](*args)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self._it.close()
+
+        def __iter__(self):
+            return (CountingEntry(entry) for entry in self._it)
+
+        def close(self):
+            self._it.close()
+
+    calls = {}
+    for name in ("stat", "lstat", "fstat"):
+        setattr(os, name, counting(patched[name]))
+    os.scandir = CountingScandir
+    try:
+        yield calls
+    finally:
+        for name, func in patched.items():
+            setattr(os, name, func)
+        calls["stat_calls"] = next(counter)
+
+
+def peak_rss_mb():
+    """当前进程及其已结束的子进程 (如进程池) 中最大的峰值常驻内存 (MB)，不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _run_operation(case):
+    options = ReadOptions(case["strategy"], case["chunk_size"], fadvise=False)
+    if case["operation"] == "scan":
+        for _ in scan_folder(case["path"]):
+            pass
+    elif case["fixture"] == "huge":
+        hash_engine.compute_file_hash(case["path"], case["algorithm"], read_options=options)
+    else:
+        hash_engine.compute_folder_hash(case["path"], case["algorithm"], mode="records", workers=case["workers"],
+                                        pool=case["pool"], read_options=options)
+
+
+def run_case(case):
+    """
+    运行一个组合：先计时 repeat 次取最好成绩，再单独运行一次统计 stat 调用
+
+    :param case: 包含 CASE_KEY_FIELDS 以及 path、files、bytes、repeat 的字典
+    :return: 加上 seconds、mb_per_s、files_per_s、stat_calls、peak_rss_mb 的结果字典
+    """
+    best = float("inf")
+    for _ in range(case["repeat"]):
+        start = time.perf_counter()
+        _run_operation(case)
+        best = min(best, time.perf_counter() - start)
+    with count_stat_calls() as counted:
+        _run_operation(case)
+
+    result = {key: value for key, value in case.items() if key != "path"}
+    result.update({
+        "seconds": best,
+        "mb_per_s": case["bytes"] / (1024 * 1024) / best if best > 0 and case["bytes"] else None,
+        "files_per_s": case["files"] / best if best > 0 else None,
+        "stat_calls": counted["stat_calls"],
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    return result
+
+
+def _case_process(conn, case):
+    try:
+        conn.send((run_case(case), None))
+    except BaseException as e:
+        conn.send((None, "{}: {}".format(type(e).__name__, e)))
+    finally:
+        conn.close()
+
+
+def run_case_isolated(case):
+    """
+    在新的 spawn 子进程中运行一个组合，使峰值内存只反映这一个组合
+
+    :raises RuntimeError: 子进程中运行失败或异常退出
+    """
+    context = multiprocessing.get_context("spawn")
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_case_process, args=(child_conn, case))
+    process.start()
+    child_conn.close()
+    try:
+        result, error = parent_conn.recv()
+    except EOFError:
+        process.join()
+        raise RuntimeError("benchmark worker exited with code {}".format(process.exitcode))
+    process.join()
+    if error is not None:
+        raise RuntimeError(error)
+    return result
+
+
+def suite_cases(fixtures, algorithms, chunk_sizes, strategies, workers, pool, repeat):
+    """
+    展开需要测量的组合
+
+    :param fixtures: {种类: (路径, 文件数, 总字节数)}
+    :return: 组合字典列表；大文件只以 1 个工作数测量，文件夹另外测量一次纯扫描
+    """
+    cases = []
+    for kind, (path, files, size) in fixtures.items():
+        base = {"fixture": kind, "path": path, "files": files, "bytes": size, "repeat": repeat, "pool": pool}
+        if kind != "huge":
+            cases.append(dict(base, operation="scan", algorithm=None, strategy="auto", chunk_size=None,
+                              workers=1, bytes=0))
+        for algorithm, chunk_size, strategy, worker_count in itertools.product(
+                algorithms, chunk_sizes, strategies, workers):
+            if kind == "huge" and worker_count != 1:
+                continue
+            cases.append(dict(base, operation="hash", algorithm=algorithm, strategy=strategy,
+                              chunk_size=chunk_size, workers=worker_count))
+    return cases
+
+
+def suite_metadata(args):
+    """描述运行环境和测试参数，便于判断两份结果是否可比"""
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "huge_size": args.huge_size,
+        "tiny_count": args.tiny_count,
+        "tiny_size": args.tiny_size,
+        "depth": args.depth,
+        "isolated": not args.no_isolate,
+    }
+
+
+def case_key(row):
+    return tuple(row.get(name) for name in CASE_KEY_FIELDS)
+
+
+def format_suite_row(row, baseline=None):
+    """一个结果的表格行；有对比基线时附加耗时之比 (大于 1 表示变快)"""
+    chunk = format_size(row["chunk_size"]) if row["chunk_size"] else "auto"
+    text = "{:>6} {:>5} {:>8} {:>9} {:>6} {:>3} {:>10} {:>10} {:>8} {:>8}".format(
+        row["fixture"], row["operation"], row["algorithm"] or "-", row["strategy"], chunk, row["workers"],
+        "{:.1f}".format(row["mb_per_s"]) if row["mb_per_s"] else "-",
+        "{:.0f}".format(row["files_per_s"]) if row["files_per_s"] else "-",
+        row["stat_calls"], "{:.1f}".format(row["peak_rss_mb"]) if row["peak_rss_mb"] is not None else "-")
+    if baseline is not None and baseline.get("seconds") and row["seconds"]:
+        text += " {:>7.2f}x".format(baseline["seconds"] / row["seconds"])
+    return text
+
+
+def run_suite(args):
+    algorithms = args.algorithms or ["sha256"]
+    if algorithms == ["all"]:
+        algorithms = [info.name for info in available_algorithms()]
+    chunk_sizes = [None if size == "auto" else parse_size(size) for size in args.chunk_sizes]
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {case_key(row): row for row in json.load(f)["results"]}
+
+    # JSON 写到标准输出时，表格写到标准错误
+    table = sys.stderr if args.output is None else sys.stdout
+    results = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        fixtures = {}
+        for kind in args.fixtures:
+            print("generating {} fixture...".format(kind), file=sys.stderr)
+            fixtures[kind] = make_fixture(kind, tmp, args.huge_size, args.tiny_count, args.tiny_size, args.depth)
+
+        print("{:>6} {:>5} {:>8} {:>9} {:>6} {:>3} {:>10} {:>10} {:>8} {:>8}".format(
+            "data", "op", "algo", "strategy", "chunk", "j", "MB/s", "files/s", "stat", "RSS MB")
+            + (" {:>8}".format("speedup") if baseline else ""), file=table)
+        run = run_case if args.no_isolate else run_case_isolated
+        for case in suite_cases(fixtures, algorithms, chunk_sizes, args.strategies, args.workers, args.pool,
+                                args.repeat):
+            row = run(case)
+            results.append(row)
+            print(format_suite_row(row, baseline.get(case_key(row)) if baseline else None), file=table)
+            table.flush()
+
+    document = {"version": SUITE_VERSION, "meta": suite_metadata(args), "results": results}
+    if args.output is None:
+        json.dump(document, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+文件夹哈希的断点续算
+
+检查点是一个只追加的 JSON Lines 文件：
+    第一行  {"checkpoint": 1, "folder": ..., "mode": ..., "algorithms": [...]}
+    文件行  {"p": 相对路径, "s": 大小, "m": mtime_ns, "i": inode, "t": 记录时间_ns, "d": {算法: 摘要}}
+文件行的顺序与完成顺序相同，续算时按相对路径查找，与文件的处理顺序无关。
+
+计算过程中每隔 CHECKPOINT_INTERVAL 秒把新完成的文件写入并 fsync，计算被取消、出错或进程崩溃时
+最多损失这段时间内的结果。再次运行时，元数据未变化的文件直接使用检查点中的摘要；
+计算成功完成后删除检查点文件。崩溃时写了一半的最后一行在读取时被忽略，并在继续追加之前截掉。
+"""
+import hashlib
+import json
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+from digest_cache import RACY_WINDOW_SECONDS, default_cache_path
+
+CHECKPOINT_VERSION = 1
+
+# 两次写入检查点之间的最长间隔 (秒)
+CHECKPOINT_INTERVAL = 10.0
+
+
+def default_checkpoint_path(folder_path: str, algorithms: Sequence[str], mode: str) -> str:
+    """
+    默认的检查点位置：摘要缓存目录下的 checkpoints 子目录，
+    文件名由文件夹绝对路径、模式和算法决定，同一任务再次运行时会找到同一个文件
+    """
+    key = "\0".join([os.path.abspath(folder_path), mode] + list(algorithms))
+    name = hashlib.sha1(key.encode("utf-8", "surrogateescape")).hexdigest() + ".jsonl"
+    return os.path.join(os.path.dirname(default_cache_path()), "checkpoints", name)
+
+
+class FolderCheckpoint:
+    """
+    一次文件夹哈希计算的检查点
+
+    :param path: 检查点文件路径
+    :param folder_path: 被计算的文件夹
+    :param algorithms: 算法名列表
+    :param mode: 文件夹哈希模式，与文件夹、算法一起用于判断检查点是否属于本次计算
+    :param interval: 两次写入之间的最长间隔 (秒)
+    """
+
+    def __init__(self, path: str, folder_path: str, algorithms: Sequence[str], mode: str,
+                 interval: float = CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.header = {"checkpoint": CHECKPOINT_VERSION, "folder": os.path.abspath(folder_path), "mode": mode,
+                       "algorithms": list(algorithms)}
+        self.resumed = 0
+        self._records: Dict[str, dict] = {}
+        self._pending = []
+        self._file = None
+        self._last_flush = time.monotonic()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.complete()
+        else:
+            self.close()
+
+    def open(self) -> int:
+        """
+        读取已有的检查点并准备追加，检查点不属于本次计算或无法解析时重新开始
+
+        :return: 读取到的文件数
+        """
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        # 崩溃时写了一半的最后一行没有换行符，追加前截掉，否则下一行会接在它后面
+        end = data.rfind(b"\n") + 1
+        lines = data[:end].decode("utf-8", "replace").splitlines()
+        records = {}
+        if lines and self._parse(lines[0]) == self.header:
+            for line in lines[1:]:
+                record = self._parse(line)
+                if record is not None and "p" in record:
+                    records[record["p"]] = record
+            if end < len(data):
+                os.truncate(self.path, end)
+        else:
+            lines = []
+        self._records = records
+
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._file = open(self.path, "a" if lines else "w", encoding="utf-8")
+        if not lines:
+            self._pending.append(self.header)
+            self.flush()
+        return len(records)
+
+    @staticmethod
+    def _parse(line: str) -> Optional[dict]:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            # 崩溃时只写了一半的行
+            return None
+        return record if isinstance(record, dict) else None
+
+    def lookup(self, entry) -> Optional[Dict[str, str]]:
+        """
+        查询检查点中的摘要，元数据与当前文件一致时视为已完成
+
+        记录时仍处于 racy 窗口内的文件 (mtime 距记录时间不足 RACY_WINDOW_SECONDS) 不采用。
+
+        :param entry: FileEntry
+        :return: {算法名: 摘要}，没有可用记录时返回 None
+        """
+        record = self._records.get(entry.rel_path)
+        if record is None or (record.get("s"), record.get("m"), record.get("i")) != (
+                entry.size, entry.mtime_ns, entry.inode):
+            return None
+        if record.get("t", 0) - entry.mtime_ns < RACY_WINDOW_SECONDS * 10 ** 9:
+            return None
+        digests = record.get("d") or {}
+        if any(name not in digests for name in self.header["algorithms"]):
+            return None
+        self.resumed += 1
+        return digests
+
+    def add(self, entry, digests: Dict[str, str]) -> None:
+        """记录一个已完成的文件，距上次写入超过 interval 秒时写入检查点"""
+        self._pending.append({"p": entry.rel_path, "s": entry.size, "m": entry.mtime_ns, "i": entry.inode,
+                              "t": time.time_ns(), "d": digests})
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def flush(self) -> None:
+        """把新完成的文件写入检查点并同步到磁盘"""
+        if self._file is None or not self._pending:
+            return
+        # 默认的 ASCII 转义可以保留文件名中无法编码的代理字符
+        lines = "".join(json.dumps(record) + "\n" for record in self._pending)
+        self._pending = []
+        self._file.write(lines)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """写入剩余的记录并关闭文件，保留检查点供下次继续"""
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._file = None
+
+    def complete(self) -> None:
+        """计算已完成：删除检查点文件"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,712 @@
+"""
+命令行接口
+
+不导入 tkinter，可在定时任务、CI 和无图形界面的存储节点上运行。
+
+用法:
+    python cli.py hash [-r] [-a sha256,md5] [-j 8] [--format sum|json] PATH... (PATH 为 - 时读取标准输入)
+    python cli.py hash --tree|--etag [--segment-size 8M] -j 8 FILE...
+    python cli.py compare [--fast] FILE1 FILE2
+    python cli.py folder [--mode stream|records|merkle] [-j 8] [--pool thread|process] [--resume] [--progress] DIR...
+    python cli.py compare-folders DIR1 DIR2
+    python cli.py diff [-v] DIR1 DIR2
+    python cli.py dupes [--min-size 1M] PATH...
+    python cli.py watch [--polling] [--interval 2] DIR
+    python cli.py manifest [-o SHA256SUMS] DIR
+    python cli.py verify [--fast] [-C DIR] SHA256SUMS
+
+处理文件夹的命令 (hash -r、folder、compare-folders、diff、dupes、manifest、verify) 都可以加遍历规则:
+    --sorted --exclude '.git/' --exclude '*.pyc' --include-regex '\.(jpg|png)$' --no-hidden
+    --symlinks skip|files|follow --one-file-system --min-file-size 1K --newer-than 2024-01-01
+给出任一规则时按 scanner.TraversalSpec 遍历；--sorted 按名称排序，使 stream 模式的摘要与文件系统无关
+
+每个命令都可以加 --export results.jsonl|results.csv|results.db，把所有结果 (包括 --quiet 等隐藏的逐文件结果)
+另外写入 JSON Lines、CSV 或 SQLite 文件 (见 result_sink.py)
+
+退出码: 0 成功 (比较或校验时表示一致)，1 比较或校验结果不一致，2 出错
+"""
+import argparse
+import contextlib
+import datetime
+import errno
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import compare
+import duplicates
+import hash_engine
+import manifest
+from algorithms import available_algorithms
+from checkpoint import default_checkpoint_path
+from digest_cache import DigestCache
+from file_reader import AUTO_CHUNK_SIZE, READ_STRATEGIES, ReadOptions
+from manifest import escape_sum_path, format_sum_lines
+from progress import ProgressTracker, format_duration
+from result_sink import (SINK_FORMATS, ExportError, diff_summary_record, file_record, folder_file_record,
+                         folder_record, open_sink, status_record, verify_summary_record)
+from scanner import SYMLINK_MODES, TraversalSpec, scan_folder
+from tree_hash import DEFAULT_SEGMENT_SIZE, compute_tree_hash
+from watch import DEFAULT_INTERVAL, FolderWatcher
+
+EXIT_OK = 0
+EXIT_DIFFERENT = 1
+EXIT_ERROR = 2
+
+
+def parse_algorithms(values):
+    """把 -a sha256 -a md5,sha1 这样的参数展开为算法列表"""
+    algorithms = []
+    for value in values or ["sha256"]:
+        algorithms.extend(name.strip() for name in value.split(",") if name.strip())
+    return list(hash_engine.normalize_algorithms(algorithms))
+
+
+def parse_chunk_size(text):
+    """解析 "64K"、"4M" 这样的块大小"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper()
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def parse_time(text):
+    """解析 POSIX 时间戳或 ISO 格式的日期/时间 ("2024-01-01"、"2024-01-01T12:00")，返回时间戳"""
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(text).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid time: {}".format(text)) from None
+
+
+def make_traversal(args):
+    """
+    按遍历参数创建 TraversalSpec；没有给出任何遍历参数时返回 None，保持原有的遍历方式和摘要
+
+    :raises ValueError: 正则表达式无效等
+    """
+    options = {
+        "include": args.include or (),
+        "exclude": args.exclude or (),
+        "include_regex": args.include_regex,
+        "exclude_regex": args.exclude_regex,
+        "min_size": args.min_file_size,
+        "max_size": args.max_file_size,
+        "newer_than": args.newer_than,
+        "older_than": args.older_than,
+    }
+    if not (args.sorted or args.symlinks or not args.hidden or args.one_file_system
+            or any(value for value in options.values())):
+        return None
+    return TraversalSpec(sort=args.sorted, symlinks=args.symlinks or "files", hidden=args.hidden,
+                         one_file_system=args.one_file_system, **options)
+
+
+class Output:
+    """按 --format 写出结果和错误，有 --export 时同时写入导出文件"""
+
+    def __init__(self, fmt, stream=None, sink=None):
+        self.fmt = fmt
+        self.stream = stream or sys.stdout
+        self.sink = sink
+
+    def write_record(self, record, sum_path=None, digests=None):
+        """
+        :param record: JSON 行的内容
+        :param sum_path: sum 格式下的路径，None 表示该记录不输出 sum 行
+        :param digests: sum 格式下的摘要
+        """
+        self.export(record)
+        if self.fmt == "json":
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        elif sum_path is not None:
+            for line in format_sum_lines(sum_path, digests):
+                self.stream.write(line + "\n")
+
+    def export(self, record):
+        """只写入导出文件 (用于不在标准输出中显示的结果)"""
+        if self.sink is not None:
+            self.sink.write(record)
+
+    def write_text(self, text):
+        """sum 格式下输出给人看的文本，json 格式下忽略"""
+        if self.fmt != "json":
+            self.stream.write(text + "\n")
+
+    def error(self, path, exc):
+        message = describe_error(exc, path)
+        self.export({"path": path, "error": message})
+        if self.fmt == "json":
+            self.stream.write(json.dumps({"path": path, "error": message}, ensure_ascii=False) + "\n")
+        print("{}: {}: {}".format(os.path.basename(sys.argv[0]), path, message), file=sys.stderr)
+
+
+def describe_error(exc, path=None):
+    """把异常转换为简短的说明，出错的文件不是 path 本身 (如文件夹中的某个文件) 时附上文件名"""
+    if isinstance(exc, OSError) and exc.strerror:
+        if exc.filename and exc.filename != path:
+            return "{}: {}".format(exc.filename, exc.strerror)
+        return exc.strerror
+    return str(exc) or exc.__class__.__name__
+
+
+def ordered_map(executor, func, items, depth):
+    """
+    与 executor.map 相同，按输入顺序返回 (item, 结果或异常)，
+    但最多只提交 depth 个任务，输入可以是很长的生成器
+    """
+    pending = deque()
+    for item in items:
+        pending.append((item, executor.submit(func, item)))
+        if len(pending) >= depth:
+            yield _result_of(*pending.popleft())
+    while pending:
+        yield _result_of(*pending.popleft())
+
+
+def _result_of(item, future):
+    try:
+        return item, future.result()
+    except Exception as e:
+        return item, e
+
+
+def iter_hash_targets(paths, recursive, traversal=None):
+    """展开命令行路径；目录在 -r 时按遍历规则展开为其中的文件"""
+    for path in paths:
+        if recursive and path != "-" and os.path.isdir(path):
+            for entry in scan_folder(path, spec=traversal):
+                yield os.path.join(path, entry.rel_path)
+        else:
+            yield path
+
+
+def cmd_hash(args, output, cache):
+    if args.tree == "etag":
+        # etag 只有 md5 一种形式，未指定 -a 时默认使用 md5
+        algorithms = parse_algorithms(args.algorithm or ["md5"])
+        if algorithms != ["md5"]:
+            raise ValueError("--etag only supports -a md5")
+    else:
+        algorithms = parse_algorithms(args.algorithm)
+    read_options = make_read_options(args)
+    status = EXIT_OK
+
+    def work(path):
+        if path == "-":
+            if args.tree:
+                # 分段读取需要按位置访问文件
+                raise ValueError("--tree/--etag cannot read stdin")
+            return hash_engine.compute_stream_hash(sys.stdin.buffer, algorithms)
+        if os.path.isdir(path):
+            raise IsADirectoryError(errno.EISDIR, os.strerror(errno.EISDIR), path)
+        if args.tree:
+            return compute_tree_hash(path, algorithms, args.segment_size, args.tree, workers=args.jobs)
+        return hash_engine.compute_file_hash(path, algorithms, cache=cache, read_options=read_options)
+
+    # --tree 时 -j 用于同一文件的各个段，文件之间依次计算
+    file_jobs = 1 if args.tree else args.jobs
+    targets = iter_hash_targets(args.paths, args.recursive, make_traversal(args))
+    with ThreadPoolExecutor(max_workers=file_jobs) as executor:
+        for path, result in ordered_map(executor, work, targets, file_jobs * 4):
+            if isinstance(result, Exception):
+                output.error(path, result)
+                status = EXIT_ERROR
+            else:
+                output.write_record(file_record(result), path, result.digests)
+    return status
+
+
+def cmd_compare(args, output, cache):
+    if args.fast:
+        return compare_contents(args, output)
+    algorithms = parse_algorithms(args.algorithm)
+    read_options = make_read_options(args)
+    failed = []
+
+    def work(path, cancel_event):
+        try:
+            return hash_engine.compute_file_hash(path, algorithms, cancel_event=cancel_event, cache=cache,
+                                                 read_options=read_options)
+        except Exception:
+            failed.append(path)
+            raise
+
+    # 两个文件位于不同设备时同时计算
+    try:
+        results = compare.hash_pair(work, args.file1, args.file2)
+    except Exception as e:
+        output.error(failed[0] if failed else args.file1, e)
+        return EXIT_ERROR
+
+    match = results[0].digests == results[1].digests
+    for result in results:
+        output.write_record(file_record(result), result.path, result.digests)
+    output.write_record({"match": match})
+    output.write_text("match" if match else "differ")
+    return EXIT_OK if match else EXIT_DIFFERENT
+
+
+def compare_contents(args, output):
+    """compare --fast：逐块比较内容，不计算哈希值"""
+    try:
+        result = compare.compare_file_contents(args.file1, args.file2, args.chunk_size or AUTO_CHUNK_SIZE,
+                                               parallel=args.jobs > 1)
+    except OSError as e:
+        output.error(e.filename or args.file1, e)
+        return EXIT_ERROR
+
+    output.write_record({
+        "path1": result.path1,
+        "path2": result.path2,
+        "size1": result.size1,
+        "size2": result.size2,
+        "match": result.identical,
+        "reason": result.reason,
+        "first_difference": result.first_difference,
+        "bytes_compared": result.bytes_compared,
+        "elapsed": round(result.elapsed, 6),
+    })
+    if result.identical:
+        output.write_text("match")
+    elif result.reason == compare.REASON_SIZE:
+        output.write_text("differ: sizes {} and {}".format(result.size1, result.size2))
+    else:
+        output.write_text("differ: first difference at byte {}".format(result.first_difference))
+    return EXIT_OK if result.identical else EXIT_DIFFERENT
+
+
+def folder_kwargs(args, cache):
+    """文件夹相关命令的公共参数"""
+    mode = args.mode
+    if mode is None:
+        # 并行计算、摘要缓存和断点续算都需要 records 模式
+        resumable = getattr(args, "resume", False) or getattr(args, "checkpoint", None)
+        mode = "records" if args.jobs > 1 or cache is not None or resumable else "stream"
+    return {
+        "mode": mode,
+        "workers": 1 if mode == "stream" else args.jobs,
+        "pool": args.pool,
+        "cache": cache,
+        "read_options": make_read_options(args),
+        "traversal": make_traversal(args),
+    }
+
+
+def print_progress(snapshot):
+    """把 ProgressTracker 的进度写到标准错误的同一行"""
+    mb = 1024 * 1024
+    line = "{:5.1f}% {}/{} files {:.1f}/{:.1f} MB {:.1f} MB/s ETA {}".format(
+        snapshot.fraction * 100, snapshot.files_done, snapshot.files_total, snapshot.bytes_done / mb,
+        snapshot.bytes_total / mb, snapshot.rate / mb, format_duration(snapshot.eta))
+    sys.stderr.write("\r\033[K" + line)
+    sys.stderr.flush()
+
+
+def cmd_folder(args, output, cache):
+    algorithms = parse_algorithms(args.algorithm)
+    kwargs = folder_kwargs(args, cache)
+    if args.checkpoint and len(args.paths) > 1:
+        output.error(args.checkpoint, ValueError("--checkpoint takes a single DIR, use --resume for several"))
+        return EXIT_ERROR
+    status = EXIT_OK
+    for path in args.paths:
+        if args.checkpoint:
+            kwargs["checkpoint"] = args.checkpoint
+        elif args.resume:
+            kwargs["checkpoint"] = default_checkpoint_path(path, algorithms, kwargs["mode"])
+        if args.progress:
+            kwargs["tracker"] = ProgressTracker(print_progress)
+        # 只有 records 模式逐个得出文件摘要
+        if output.sink is not None and kwargs["mode"] == "records":
+            kwargs["file_callback"] = lambda rel_path, size, digests, folder=path: output.export(
+                folder_file_record(folder, rel_path, size, digests))
+        try:
+            result = hash_engine.compute_folder_hash(path, algorithms, **kwargs)
+        except ExportError:
+            raise
+        except Exception as e:
+            if args.progress:
+                sys.stderr.write("\n")
+            output.error(path, e)
+            status = EXIT_ERROR
+            continue
+        if args.progress:
+            sys.stderr.write("\n")
+        output.write_record(folder_record(result), path, result.digests)
+    return status
+
+
+def cmd_compare_folders(args, output, cache):
+    algorithms = parse_algorithms(args.algorithm)
+    kwargs = folder_kwargs(args, cache)
+    # 两侧同时计算；位于同一设备时两侧分摊 -j 个读取
+    kwargs["workers"] = compare.pair_workers(args.folder1, args.folder2, kwargs["workers"])
+    failed = []
+
+    def work(path, cancel_event):
+        try:
+            return hash_engine.compute_folder_hash(path, algorithms, cancel_event=cancel_event, **kwargs)
+        except Exception:
+            failed.append(path)
+            raise
+
+    try:
+        results = compare.hash_pair(work, args.folder1, args.folder2, concurrent=True)
+    except Exception as e:
+        output.error(failed[0] if failed else args.folder1, e)
+        return EXIT_ERROR
+
+    match = results[0].digests == results[1].digests
+    for result in results:
+        output.write_record(folder_record(result), result.path, result.digests)
+    output.write_record({"match": match})
+    output.write_text("match" if match else "differ")
+    return EXIT_OK if match else EXIT_DIFFERENT
+
+
+def cmd_diff(args, output, cache):
+    algorithms = parse_algorithms(args.algorithm)
+    markers = {
+        compare.STATUS_ADDED: "+",
+        compare.STATUS_REMOVED: "-",
+        compare.STATUS_MODIFIED: "M",
+        compare.STATUS_UNCHANGED: "=",
+    }
+
+    def on_result(status, rel_path, detail):
+        if status == compare.STATUS_ERROR:
+            output.error(rel_path, OSError(detail))
+            return
+        record = status_record(status, rel_path, detail)
+        if status == compare.STATUS_UNCHANGED and not args.verbose:
+            output.export(record)
+            return
+        output.write_record(record)
+        escaped, display_path = escape_sum_path(rel_path)
+        output.write_text("{}{} {}".format("\\" if escaped else "", markers[status], display_path))
+
+    try:
+        result = compare.diff_folders(args.folder1, args.folder2, algorithms[0], workers=args.jobs, pool=args.pool,
+                                      cache=cache, read_options=make_read_options(args),
+                                      traversal=make_traversal(args), result_callback=on_result)
+    except OSError as e:
+        output.error(e.filename or args.folder1, e)
+        return EXIT_ERROR
+
+    output.write_record(diff_summary_record(result))
+    if result.errors:
+        return EXIT_ERROR
+    return EXIT_OK if result.identical else EXIT_DIFFERENT
+
+
+def cmd_dupes(args, output, cache):
+    algorithms = parse_algorithms(args.algorithm)
+    try:
+        report = duplicates.find_duplicates(args.paths, algorithms[0], args.min_size, workers=args.jobs,
+                                            pool=args.pool, cache=cache, read_options=make_read_options(args),
+                                            traversal=make_traversal(args))
+    except OSError as e:
+        output.error(e.filename or args.paths[0], e)
+        return EXIT_ERROR
+
+    for path, message in report.errors.items():
+        output.error(path, OSError(message))
+    # sum 格式下每组之间空一行，组前的注释行会被 sha256sum -c 忽略
+    for group in report.groups:
+        output.write_record({"digest": group.digest, "size": group.size, "paths": group.paths,
+                             "reclaimable": group.reclaimable})
+        output.write_text("# {} files, {} bytes each, {} bytes reclaimable".format(
+            len(group.paths), group.size, group.reclaimable))
+        for path in group.paths:
+            for line in format_sum_lines(path, {report.algorithm: group.digest}):
+                output.write_text(line)
+        output.write_text("")
+    output.write_record({"groups": len(report.groups), "reclaimable": report.reclaimable,
+                         "files": report.total_files, "size": report.total_size,
+                         "partial_hashed": report.partial_hashed, "full_hashed": report.full_hashed,
+                         "bytes_read": report.bytes_read, "errors": len(report.errors),
+                         "elapsed": round(report.elapsed, 6)})
+    output.write_text("# {} duplicate groups, {} bytes reclaimable ({} of {} files fully read)".format(
+        len(report.groups), report.reclaimable, report.full_hashed, report.total_files))
+    return EXIT_ERROR if report.errors else EXIT_OK
+
+
+def cmd_manifest(args, output, cache):
+    default = "crc32" if args.sfv else manifest.default_algorithm(args.output) or "sha256"
+    algorithms = parse_algorithms(args.algorithm or [default])
+    kwargs = {"workers": args.jobs, "pool": args.pool, "cache": cache, "read_options": make_read_options(args),
+              "traversal": make_traversal(args)}
+    try:
+        if args.output:
+            result = manifest.create_manifest(args.folder, args.output, algorithms, **kwargs)
+        else:
+            result = manifest.build_manifest(args.folder, algorithms, **kwargs)
+    except Exception as e:
+        output.error(args.folder, e)
+        return EXIT_ERROR
+
+    if args.output:
+        output.write_record({"path": args.output, "type": "manifest", "folder": args.folder,
+                             "files": len(result.entries), "size": result.total_size,
+                             "algorithms": list(result.algorithms), "elapsed": round(result.elapsed, 6)})
+    else:
+        for line in manifest.format_manifest(result, args.sfv):
+            output.stream.write(line + "\n")
+    return EXIT_OK
+
+
+def cmd_verify(args, output, cache):
+    # 与 sha256sum -c 相同的状态文字
+    labels = {
+        manifest.STATUS_OK: "OK",
+        manifest.STATUS_SKIPPED: "OK (unchanged)",
+        manifest.STATUS_MISSING: "MISSING",
+        manifest.STATUS_EXTRA: "EXTRA",
+        manifest.STATUS_CORRUPTED: "FAILED",
+        manifest.STATUS_ERROR: "FAILED open or read",
+    }
+
+    def on_result(status, rel_path, detail):
+        record = status_record(status, rel_path, detail, "error")
+        if args.quiet and status in (manifest.STATUS_OK, manifest.STATUS_SKIPPED):
+            output.export(record)
+            return
+        output.write_record(record)
+        escaped, display_path = escape_sum_path(rel_path)
+        output.write_text("{}{}: {}".format("\\" if escaped else "", display_path, labels[status]))
+
+    try:
+        report = manifest.verify_manifest(args.manifest, args.directory, workers=args.jobs, pool=args.pool,
+                                          fast=args.fast, check_extra=not args.no_extra, cache=cache,
+                                          read_options=make_read_options(args), traversal=make_traversal(args),
+                                          result_callback=on_result)
+    except (OSError, ValueError) as e:
+        output.error(args.manifest, e)
+        return EXIT_ERROR
+
+    output.write_record(verify_summary_record(args.manifest, report))
+    for count, description in ((len(report.corrupted), "computed checksums did NOT match"),
+                               (len(report.missing), "listed files are missing"),
+                               (len(report.extra), "files are not listed in the manifest"),
+                               (len(report.errors), "listed files could not be read")):
+        if count:
+            print("{}: WARNING: {} {}".format(os.path.basename(sys.argv[0]), count, description), file=sys.stderr)
+    if report.errors:
+        return EXIT_ERROR
+    return EXIT_OK if report.matched else EXIT_DIFFERENT
+
+
+def cmd_watch(args, output, cache):
+    """先计算整个文件夹，之后每次有变化时输出变化的文件和新的文件夹摘要，直到 Ctrl+C"""
+    algorithms = parse_algorithms(args.algorithm)
+    markers = {compare.STATUS_ADDED: "+", compare.STATUS_REMOVED: "-", compare.STATUS_MODIFIED: "M"}
+
+    def on_report(report):
+        for status, paths in ((compare.STATUS_ADDED, report.added), (compare.STATUS_MODIFIED, report.modified),
+                              (compare.STATUS_REMOVED, report.removed)):
+            for rel_path in paths:
+                output.write_record({"path": rel_path, "status": status})
+                escaped, display_path = escape_sum_path(rel_path)
+                output.write_text("{}{} {}".format("\\" if escaped else "", markers[status], display_path))
+        for rel_path, error in report.errors.items():
+            output.error(rel_path, error)
+        output.write_record({"path": args.folder, "type": "folder", "mode": "records",
+                             "total_files": report.total_files, "total_size": report.total_size,
+                             "algorithm": report.algorithm, "digest": report.digest, "digests": report.digests,
+                             "elapsed": round(report.elapsed, 6)}, args.folder, report.digests)
+        output.stream.flush()
+
+    watcher = FolderWatcher(args.folder, algorithms, workers=args.jobs, cache=cache,
+                            read_options=make_read_options(args), interval=args.interval,
+                            use_inotify=False if args.polling else None)
+    with watcher:
+        try:
+            initial = watcher.start()
+        except OSError as e:
+            output.error(args.folder, e)
+            return EXIT_ERROR
+        # 初始结果只输出文件夹摘要，不逐个列出文件
+        initial.added = []
+        on_report(initial)
+        print("{}: watching {} ({})".format(os.path.basename(sys.argv[0]), args.folder, watcher.backend),
+              file=sys.stderr)
+        try:
+            watcher.run(on_report)
+        except KeyboardInterrupt:
+            pass
+    return EXIT_OK
+
+
+def make_read_options(args):
+    return ReadOptions(args.read_strategy, args.chunk_size)
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-a", "--algorithm", action="append",
+                        help="hash algorithm, repeat or comma-separate for several (default: sha256; "
+                             "available: {})".format(", ".join(info.name for info in available_algorithms())))
+    common.add_argument("-j", "--jobs", type=int, default=1, help="number of parallel workers (default: 1)")
+    common.add_argument("--format", choices=("sum", "json"), default="sum",
+                        help="sha256sum-compatible lines or JSON lines (default: sum)")
+    common.add_argument("--read-strategy", choices=READ_STRATEGIES, default="auto")
+    common.add_argument("--chunk-size", type=parse_chunk_size, default=None, help="read chunk size, e.g. 1M")
+    common.add_argument("--cache", nargs="?", const="", default=None, metavar="DB",
+                        help="reuse digests of unchanged files from a digest cache (default location if no DB)")
+    common.add_argument("--export", metavar="FILE",
+                        help="also write every result to FILE (.jsonl, .csv or .db/.sqlite), in batches")
+    common.add_argument("--export-format", choices=SINK_FORMATS, default=None,
+                        help="format of --export (default: from the file extension)")
+
+    folder_common = argparse.ArgumentParser(add_help=False)
+    folder_common.add_argument("--mode", choices=("stream", "records", "merkle"), default=None,
+                               help="folder digest mode (default: stream, records when -j > 1 or --cache)")
+    folder_common.add_argument("--pool", choices=("thread", "process"), default="thread")
+
+    traversal = argparse.ArgumentParser(add_help=False)
+    group = traversal.add_argument_group("folder traversal")
+    group.add_argument("--sorted", action="store_true",
+                       help="visit directory entries in name order, so stream digests do not depend on the "
+                            "file system (changes the stream digest)")
+    group.add_argument("--include", action="append", metavar="GLOB",
+                       help="only hash files matching the pattern; patterns with / match the relative path, "
+                            "others the name (repeatable)")
+    group.add_argument("--exclude", action="append", metavar="GLOB",
+                       help="skip matching files and do not enter matching directories, a trailing / only "
+                            "matches directories (repeatable), e.g. --exclude .git/ --exclude '*.pyc'")
+    group.add_argument("--include-regex", metavar="REGEX", help="only hash files whose relative path matches")
+    group.add_argument("--exclude-regex", metavar="REGEX",
+                       help="skip files and directories whose relative path matches")
+    group.add_argument("--symlinks", choices=SYMLINK_MODES,
+                       help="skip all links, follow links to files only (default) or also enter linked "
+                            "directories (loops are skipped)")
+    group.add_argument("--no-hidden", dest="hidden", action="store_false", help="skip hidden files and directories")
+    group.add_argument("--one-file-system", action="store_true", help="do not cross mount points")
+    group.add_argument("--min-file-size", type=parse_chunk_size, metavar="SIZE", help="skip smaller files, e.g. 1K")
+    group.add_argument("--max-file-size", type=parse_chunk_size, metavar="SIZE", help="skip larger files, e.g. 1G")
+    group.add_argument("--newer-than", type=parse_time, metavar="TIME",
+                       help="only files modified at or after TIME (timestamp or ISO date)")
+    group.add_argument("--older-than", type=parse_time, metavar="TIME",
+                       help="only files modified before TIME (timestamp or ISO date)")
+
+    parser = argparse.ArgumentParser(prog="hash", description="File and folder hash calculation and verification")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("hash", parents=[common, traversal], help="hash files or stdin")
+    p.add_argument("paths", nargs="+", metavar="PATH", help="files to hash, - for stdin")
+    p.add_argument("-r", "--recursive", action="store_true", help="hash every file under directories")
+    p.add_argument("--tree", action="store_const", const="tree", default=None,
+                   help="hash fixed-size segments of each file in parallel (-j workers) and combine them into a "
+                        "root digest; the result differs from the plain digest")
+    p.add_argument("--etag", action="store_const", const="etag", dest="tree",
+                   help="like --tree, but produce object-store multipart upload ETags (md5 only, the default "
+                        "algorithm with --etag)")
+    p.add_argument("--segment-size", type=parse_chunk_size, default=DEFAULT_SEGMENT_SIZE,
+                   help="segment size for --tree/--etag, must match the upload part size for --etag (default: 8M)")
+    p.set_defaults(func=cmd_hash)
+
+    p = sub.add_parser("compare", parents=[common], help="compare two files")
+    p.add_argument("file1")
+    p.add_argument("file2")
+    p.add_argument("--fast", action="store_true",
+                   help="compare contents chunk by chunk and stop at the first difference instead of hashing; "
+                        "-j > 1 reads both files at once")
+    p.set_defaults(func=cmd_compare)
+
+    p = sub.add_parser("folder", parents=[common, folder_common, traversal], help="compute folder digests")
+    p.add_argument("paths", nargs="+", metavar="DIR")
+    p.add_argument("--resume", action="store_true",
+                   help="save progress to a checkpoint in the cache directory and continue from it next time")
+    p.add_argument("--checkpoint", metavar="FILE", help="like --resume, with an explicit checkpoint file")
+    p.add_argument("--progress", action="store_true",
+                   help="show bytes done, throughput and ETA on stderr (at most 10 updates per second)")
+    p.set_defaults(func=cmd_folder)
+
+    p = sub.add_parser("compare-folders", parents=[common, folder_common, traversal], help="compare two folders")
+    p.add_argument("folder1")
+    p.add_argument("folder2")
+    p.set_defaults(func=cmd_compare_folders)
+
+    pool_option = argparse.ArgumentParser(add_help=False)
+    pool_option.add_argument("--pool", choices=("thread", "process"), default="thread")
+
+    p = sub.add_parser("diff", parents=[common, pool_option, traversal],
+                       help="list added (+), removed (-) and modified (M) files between two folders")
+    p.add_argument("folder1", metavar="OLD")
+    p.add_argument("folder2", metavar="NEW")
+    p.add_argument("-v", "--verbose", action="store_true", help="also list unchanged (=) files")
+    p.set_defaults(func=cmd_diff)
+
+    p = sub.add_parser("dupes", parents=[common, pool_option, traversal], help="find duplicate files")
+    p.add_argument("paths", nargs="+", metavar="PATH", help="folders (scanned recursively) or files")
+    p.add_argument("--min-size", type=parse_chunk_size, default=1,
+                   help="ignore files smaller than this, e.g. 1M (default: 1, skipping empty files)")
+    p.set_defaults(func=cmd_dupes)
+
+    p = sub.add_parser("watch", parents=[common], help="watch a folder and re-hash only changed files")
+    p.add_argument("folder", metavar="DIR")
+    p.add_argument("--polling", action="store_true", help="scan metadata periodically instead of using inotify")
+    p.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                   help="seconds between scans when polling (default: {})".format(DEFAULT_INTERVAL))
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("manifest", parents=[common, pool_option, traversal], help="write a per-file checksum manifest")
+    p.add_argument("folder", metavar="DIR")
+    p.add_argument("-o", "--output", metavar="FILE",
+                   help="manifest file, the algorithm follows its extension (.md5, .sfv, SHA256SUMS...); "
+                        "paths are relative to DIR (default: stdout)")
+    p.add_argument("--sfv", action="store_true", help="write SFV format to stdout (implies -a crc32)")
+    p.set_defaults(func=cmd_manifest)
+
+    p = sub.add_parser("verify", parents=[common, pool_option, traversal], help="check a folder against a manifest")
+    p.add_argument("manifest", metavar="MANIFEST")
+    p.add_argument("-C", "--directory", metavar="DIR",
+                   help="folder the manifest paths are relative to (default: the manifest's folder)")
+    p.add_argument("--fast", action="store_true",
+                   help="skip files not modified since the manifest was written (stat only)")
+    p.add_argument("--no-extra", action="store_true", help="do not report files missing from the manifest")
+    p.add_argument("-q", "--quiet", action="store_true", help="only report files that do not match")
+    p.set_defaults(func=cmd_verify)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.jobs < 1:
+        parser.error("--jobs must be positive")
+    try:
+        with contextlib.ExitStack() as stack:
+            sink = None
+            if args.export:
+                try:
+                    sink = stack.enter_context(open_sink(args.export, args.export_format))
+                except OSError as e:
+                    Output(args.format).error(args.export, e)
+                    return EXIT_ERROR
+            output = Output(args.format, sink=sink)
+            cache = stack.enter_context(DigestCache(args.cache or None)) if args.cache is not None else None
+            return args.func(args, output, cache)
+    except ExportError as e:
+        # 导出文件的写入错误不是参数错误，不显示用法
+        print("{}: {}".format(os.path.basename(sys.argv[0]), e), file=sys.stderr)
+        return EXIT_ERROR
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        return 130
+    except BrokenPipeError:
+        # 输出被管道截断 (如 | head)
+        sys.stderr.close()
+        return EXIT_ERROR
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,361 @@
+"""
+文件和文件夹比较
+
+只需知道两个文件是否相同时不必计算哈希值：大小不同直接得出结论，
+否则同步读取两个文件并逐块比较，在第一个不同的块处停止，并给出第一个不同字节的偏移量。
+
+比较两个文件夹时各扫描一次，按相对路径配对，给出新增、删除、修改和未变化的文件：
+大小不同的文件直接判定为已修改，只有大小相同的文件才需要在两侧计算摘要。
+
+需要两侧的完整摘要时 (比较哈希值)，hash_pair 同时计算两侧：两个路径位于不同设备时，
+依次计算会让其中一个设备始终空闲。
+"""
+import contextlib
+import errno
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+import hash_engine
+from digest_cache import DigestCache
+from file_reader import AUTO_CHUNK_SIZE, ReadOptions, read_full
+from hash_engine import check_cancel
+from scanner import BackgroundScan, TraversalSpec
+
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+
+# 比较结论的原因
+REASON_SAME_FILE = "same_file"
+REASON_SIZE = "size"
+REASON_CONTENT = "content"
+
+# 文件夹比较中每个文件的状态
+STATUS_ADDED = "added"
+STATUS_REMOVED = "removed"
+STATUS_MODIFIED = "modified"
+STATUS_UNCHANGED = "unchanged"
+STATUS_ERROR = "error"
+
+# 文件夹比较的结果回调 (状态, 相对路径, 说明)
+DiffCallback = Callable[[str, str, str], None]
+
+T = TypeVar("T")
+
+
+def same_device(path1: str, path2: str) -> bool:
+    """两个路径是否位于同一设备 (同一文件系统)，无法 stat 时视为同一设备"""
+    try:
+        return os.stat(path1).st_dev == os.stat(path2).st_dev
+    except OSError:
+        return True
+
+
+def pair_workers(path1: str, path2: str, workers: int) -> int:
+    """
+    同时计算两个文件夹时每侧的并行数：同一设备上两侧共用 workers 个读取，不同设备上各自使用 workers 个
+    """
+    return max(1, workers // 2) if same_device(path1, path2) else workers
+
+
+class _PairCancel:
+    """调用方取消或另一侧出错时都视为取消，不修改调用方的 cancel_event"""
+
+    def __init__(self, parent: Optional[threading.Event]):
+        self._parent = parent
+        self._event = threading.Event()
+
+    def set(self) -> None:
+        self._event.set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set() or (self._parent is not None and self._parent.is_set())
+
+
+def hash_pair(func: Callable[[str, Optional[threading.Event]], T], path1: str, path2: str,
+              concurrent: Optional[bool] = None,
+              cancel_event: Optional[threading.Event] = None) -> Tuple[T, T]:
+    """
+    对两个路径分别调用 func(路径, cancel_event)，返回两个结果
+
+    concurrent 时两侧在两个线程中同时运行 (func 需要可以并发调用)；一侧出错时另一侧在下一个数据块处停止，
+    抛出出错一侧的异常。
+
+    :param func: 计算一侧的函数，如包装了 compute_file_hash / compute_folder_hash 的闭包
+    :param concurrent: 是否同时计算，None 表示按设备决定：位于不同设备时同时计算
+    :param cancel_event: 被设置时中止两侧的计算
+    :raises HashCancelled: 计算被取消
+    """
+    if concurrent is None:
+        concurrent = not same_device(path1, path2)
+    if not concurrent:
+        return func(path1, cancel_event), func(path2, cancel_event)
+
+    pair_cancel = _PairCancel(cancel_event)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="hash-pair") as executor:
+        future = executor.submit(func, path2, pair_cancel)
+        # 文件2先失败时让文件1也尽快停止
+        future.add_done_callback(lambda f: f.exception() is not None and pair_cancel.set())
+        try:
+            result1 = func(path1, pair_cancel)
+        except hash_engine.HashCancelled:
+            error = future.exception()
+            if error is not None and not isinstance(error, hash_engine.HashCancelled):
+                raise error
+            raise
+        except BaseException:
+            pair_cancel.set()
+            raise
+        return result1, future.result()
+
+
+@dataclass
+class FileCompareResult:
+    """
+    两个文件的内容比较结果
+
+    :param identical: 内容是否相同
+    :param reason: 得出结论的依据，REASON_* 之一；内容逐字节相同时为 None
+    :param first_difference: 第一个不同字节的偏移量，大小不同时为 None
+    :param bytes_compared: 每个文件实际读取的字节数
+    """
+    path1: str
+    path2: str
+    identical: bool
+    size1: int
+    size2: int
+    reason: Optional[str]
+    first_difference: Optional[int]
+    bytes_compared: int
+    elapsed: float
+
+
+def _first_difference(data1, data2) -> int:
+    """二分查找两个等长且不同的块中第一个不同字节的位置"""
+    lo, hi = 0, len(data1)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if data1[lo:mid] == data2[lo:mid]:
+            lo = mid
+        else:
+            hi = mid
+    return lo
+
+
+def compare_file_contents(path1: str, path2: str, chunk_size: int = AUTO_CHUNK_SIZE, parallel: bool = False,
+                          progress_callback: Optional[Callable[[int, int], None]] = None,
+                          cancel_event: Optional[threading.Event] = None) -> FileCompareResult:
+    """
+    逐块比较两个文件的内容，遇到第一个不同的块即停止
+
+    :param path1: 文件1路径
+    :param path2: 文件2路径
+    :param chunk_size: 每次读取的块大小
+    :param parallel: 在另一个线程中同时读取文件2，两个文件位于不同磁盘时可以重叠 I/O
+    :param progress_callback: 进度回调 (已比较字节数, 文件大小)
+    :param cancel_event: 被设置时中止比较
+    :return: FileCompareResult
+    :raises OSError: 文件无法读取
+    :raises HashCancelled: 比较被取消
+    """
+    start_time = time.perf_counter()
+    st1 = os.stat(path1)
+    st2 = os.stat(path2)
+
+    def result(identical, reason, first_difference=None, compared=0):
+        return FileCompareResult(path1, path2, identical, st1.st_size, st2.st_size, reason, first_difference,
+                                 compared, time.perf_counter() - start_time)
+
+    if os.path.samestat(st1, st2):
+        return result(True, REASON_SAME_FILE)
+    if st1.st_size != st2.st_size:
+        return result(False, REASON_SIZE)
+
+    buffer1 = bytearray(chunk_size)
+    buffer2 = bytearray(chunk_size)
+    offset = 0
+    # 读取线程放在最内层：退出时先等待它结束，再关闭文件
+    reader = ThreadPoolExecutor(max_workers=1) if parallel else contextlib.nullcontext()
+    with open(path1, "rb", buffering=0) as f1, open(path2, "rb", buffering=0) as f2, reader:
+        if _HAS_FADVISE:
+            os.posix_fadvise(f1.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            os.posix_fadvise(f2.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while True:
+            check_cancel(cancel_event)
+            if parallel:
+                future = reader.submit(read_full, f2, buffer2)
+                length1 = read_full(f1, buffer1)
+                length2 = future.result()
+            else:
+                length1 = read_full(f1, buffer1)
+                length2 = read_full(f2, buffer2)
+            if not length1 and not length2:
+                return result(True, None, compared=offset)
+
+            # 整块时直接比较 bytearray (memcmp)，末尾的短块才需要切片
+            length = min(length1, length2)
+            if length == chunk_size:
+                same = buffer1 == buffer2
+                data1, data2 = buffer1, buffer2
+            else:
+                data1, data2 = bytes(buffer1[:length]), bytes(buffer2[:length])
+                same = data1 == data2
+            if not same:
+                return result(False, REASON_CONTENT, offset + _first_difference(data1, data2), offset + length)
+            offset += length
+            if length1 != length2:
+                # 一侧先到达文件末尾：比较过程中文件被截断或追加
+                return result(False, REASON_CONTENT, offset, offset)
+            if progress_callback:
+                progress_callback(offset, st1.st_size)
+
+
+@dataclass
+class FolderDiffResult:
+    """
+    两个文件夹的逐文件比较结果，各列表中为 "/" 分隔的相对路径
+
+    added 为只在文件夹2中存在的文件，removed 为只在文件夹1中存在的文件。
+    """
+    folder1: str
+    folder2: str
+    algorithm: str
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    files_hashed: int = 0
+    bytes_hashed: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def identical(self) -> bool:
+        return not (self.added or self.removed or self.modified or self.errors)
+
+
+def _scan_files(scan: BackgroundScan) -> dict:
+    return {entry.rel_path.replace(os.sep, "/"): entry for entry in scan}
+
+
+def diff_folders(folder1: str, folder2: str, algorithm: str = "sha256", workers: int = 1, pool: str = "thread",
+                 cache: Optional[DigestCache] = None, read_options: Optional[ReadOptions] = None,
+                 progress_callback: Optional[hash_engine.ProgressCallback] = None,
+                 result_callback: Optional[DiffCallback] = None,
+                 cancel_event: Optional[threading.Event] = None,
+                 traversal: Optional[TraversalSpec] = None) -> FolderDiffResult:
+    """
+    逐文件比较两个文件夹
+
+    两个文件夹同时在后台扫描；按相对路径配对后，只在一侧存在的文件和大小不同的文件
+    立即得出结果，大小相同的文件在两侧交替提交到同一个池中计算摘要，
+    每对文件的摘要都得出后即通过 result_callback 报告，不必等待全部完成。
+
+    :param folder1: 文件夹1 (旧)
+    :param folder2: 文件夹2 (新)
+    :param algorithm: 比较内容时使用的算法
+    :param workers: 并行工作数
+    :param pool: "thread" 或 "process"
+    :param cache: 摘要缓存
+    :param read_options: 读取策略和块大小
+    :param progress_callback: 进度回调 (已得出结果的路径数, 路径总数, 相对路径)
+    :param result_callback: 每个路径得出结果时调用 (状态, 相对路径, 说明)
+    :param cancel_event: 被设置时中止比较
+    :param traversal: 两侧共用的遍历规则 (见 scanner.TraversalSpec)，被排除的文件不参与比较
+    :return: FolderDiffResult
+    :raises NotADirectoryError: 文件夹不存在
+    :raises HashCancelled: 比较被取消
+    """
+    start_time = time.perf_counter()
+    algorithms = hash_engine.normalize_algorithms(algorithm)[:1]
+    for folder_path in (folder1, folder2):
+        if not os.path.isdir(folder_path):
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), folder_path)
+
+    with BackgroundScan(folder1, spec=traversal) as scan1, BackgroundScan(folder2, spec=traversal) as scan2:
+        files1 = _scan_files(scan1)
+        files2 = _scan_files(scan2)
+    check_cancel(cancel_event)
+
+    result = FolderDiffResult(folder1, folder2, algorithms[0])
+    lists = {
+        STATUS_ADDED: result.added,
+        STATUS_REMOVED: result.removed,
+        STATUS_MODIFIED: result.modified,
+        STATUS_UNCHANGED: result.unchanged,
+    }
+    total = len(files1.keys() | files2.keys())
+    done = 0
+
+    def finish(status, rel_path, detail=""):
+        nonlocal done
+        if status == STATUS_ERROR:
+            result.errors[rel_path] = detail
+        else:
+            lists[status].append(rel_path)
+        done += 1
+        if progress_callback:
+            progress_callback(done, total, rel_path)
+        if result_callback:
+            result_callback(status, rel_path, detail)
+
+    for rel_path in sorted(files1.keys() - files2.keys()):
+        finish(STATUS_REMOVED, rel_path)
+    for rel_path in sorted(files2.keys() - files1.keys()):
+        finish(STATUS_ADDED, rel_path)
+
+    # 大小相同的候选文件：{相对路径: [文件1摘要, 文件2摘要]}
+    candidates = {}
+    for rel_path in sorted(files1.keys() & files2.keys()):
+        if files1[rel_path].size != files2[rel_path].size:
+            finish(STATUS_MODIFIED, rel_path, REASON_SIZE)
+        else:
+            candidates[rel_path] = [None, None]
+
+    def settle(rel_path, side, digests):
+        pair = candidates.get(rel_path)
+        if pair is None:
+            # 另一侧已经出错
+            return
+        pair[side] = digests[algorithms[0]]
+        if None not in pair:
+            del candidates[rel_path]
+            finish(STATUS_UNCHANGED if pair[0] == pair[1] else STATUS_MODIFIED, rel_path,
+                   "" if pair[0] == pair[1] else REASON_CONTENT)
+
+    # iter_file_digests 原样返回条目对象，用 id 找回它属于哪个路径的哪一侧
+    owners = {}
+
+    def entries_to_hash():
+        for rel_path in list(candidates):
+            if rel_path not in candidates:
+                continue
+            for side, entry in enumerate((files1[rel_path], files2[rel_path])):
+                digests = hash_engine.cached_digests(cache, entry, algorithms)
+                if digests is None:
+                    owners[id(entry)] = (rel_path, side)
+                    yield entry
+                else:
+                    settle(rel_path, side, digests)
+
+    for entry, digests, error in hash_engine.iter_file_digests(entries_to_hash(), algorithms, workers, pool,
+                                                               cancel_event=cancel_event,
+                                                               read_options=read_options):
+        rel_path, side = owners.pop(id(entry))
+        if error is not None:
+            if candidates.pop(rel_path, None) is not None:
+                finish(STATUS_ERROR, rel_path, "{}: {}".format(entry.path, error.strerror or error))
+            continue
+        result.files_hashed += 1
+        result.bytes_hashed += entry.size
+        hash_engine.store_digests(cache, entry, digests)
+        settle(rel_path, side, digests)
+    if cache is not None:
+        cache.flush()
+
+    for paths in lists.values():
+        paths.sort()
+    result.elapsed = time.perf_counter() - start_time
+    return result
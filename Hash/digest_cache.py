@@ -0,0 +1,205 @@
+"""
+持久化摘要缓存
+
+按 (路径, 算法) 保存文件摘要，并记录计算时文件的大小、mtime_ns 和 inode。
+再次计算时只要这些元数据都未变化就直接返回缓存的摘要，不再读取文件内容。
+另外按 (目录路径, 算法) 保存 Merkle 模式的目录节点哈希及目录元数据指纹。
+条目数超过上限时按最近使用时间淘汰。
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+# 写入达到该数量时提交一次事务
+COMMIT_INTERVAL = 1000
+
+# 修改时间距现在小于该秒数的文件不写入缓存：
+# 同一时间戳内文件可能再次被修改，而元数据不会变化
+RACY_WINDOW_SECONDS = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    path TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (path, algorithm)
+);
+CREATE INDEX IF NOT EXISTS digests_last_used ON digests (last_used);
+CREATE TABLE IF NOT EXISTS nodes (
+    path TEXT NOT NULL,
+    algorithm TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    last_used REAL NOT NULL,
+    PRIMARY KEY (path, algorithm)
+);
+CREATE INDEX IF NOT EXISTS nodes_last_used ON nodes (last_used);
+"""
+
+_TABLES = ("digests", "nodes")
+
+
+def default_cache_path() -> str:
+    """默认缓存数据库位置"""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "file_hash", "digest_cache.sqlite3")
+
+
+class DigestCache:
+    """
+    基于 SQLite 的文件摘要缓存，可在多个线程中使用
+
+    :param db_path: 数据库文件路径，默认为 default_cache_path()
+    :param max_entries: 最多保留的条目数
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 1000000):
+        self.db_path = db_path or default_cache_path()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        parent = os.path.dirname(self.db_path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._pending_writes = 0
+        # 命中的条目: {(路径, 算法): 使用时间}，与写入一起批量更新到数据库
+        self._touched = {table: {} for table in _TABLES}
+        # 各表的近似条目数 (替换也会计入)，仅用于判断是否需要淘汰
+        self._entries = {table: self._conn.execute("SELECT COUNT(*) FROM " + table).fetchone()[0]
+                         for table in _TABLES}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def get(self, path: str, size: int, mtime_ns: int, inode: int, algorithm: str) -> Optional[str]:
+        """
+        查询缓存
+
+        :return: 元数据全部匹配时返回摘要，否则返回 None
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, digest FROM digests WHERE path = ? AND algorithm = ?",
+                (path, algorithm)
+            ).fetchone()
+            if row is None or tuple(row[:3]) != (size, mtime_ns, inode):
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touch("digests", path, algorithm)
+            return row[3]
+
+    def put(self, path: str, size: int, mtime_ns: int, inode: int, algorithm: str, digest: str) -> None:
+        """写入或更新缓存条目"""
+        if time.time() - mtime_ns / 1e9 < RACY_WINDOW_SECONDS:
+            return
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO digests (path, algorithm, size, mtime_ns, inode, digest, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(path), algorithm, size, mtime_ns, inode, digest, time.time())
+            )
+            self._count_write("digests", cursor)
+
+    def get_node(self, path: str, algorithm: str, fingerprint: str) -> Optional[str]:
+        """
+        查询目录节点哈希
+
+        :param fingerprint: 目录的元数据指纹
+        :return: 指纹匹配时返回节点哈希，否则返回 None
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fingerprint, digest FROM nodes WHERE path = ? AND algorithm = ?",
+                (path, algorithm)
+            ).fetchone()
+            if row is None or row[0] != fingerprint:
+                return None
+            self._touch("nodes", path, algorithm)
+            return row[1]
+
+    def put_node(self, path: str, algorithm: str, fingerprint: str, digest: str) -> None:
+        """写入或更新目录节点哈希，调用方需保证目录中没有处于 racy 窗口内的文件"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR REPLACE INTO nodes (path, algorithm, fingerprint, digest, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (os.path.abspath(path), algorithm, fingerprint, digest, time.time())
+            )
+            self._count_write("nodes", cursor)
+
+    def _touch(self, table, path, algorithm):
+        """
+        记录最近使用时间。批量更新，避免每次命中都写数据库；
+        只命中不写入时 (如重新校验已缓存的目录树) 累积到 COMMIT_INTERVAL 条也提交一次，内存占用有上限
+        """
+        self._touched[table][(path, algorithm)] = time.time()
+        if len(self._touched[table]) >= COMMIT_INTERVAL:
+            self._flush()
+
+    def _count_write(self, table, cursor):
+        if cursor.rowcount:
+            self._entries[table] += 1
+        self._pending_writes += 1
+        if self._pending_writes >= COMMIT_INTERVAL:
+            self._flush()
+
+    def lookup_stat(self, path: str, st: os.stat_result, algorithm: str) -> Optional[str]:
+        """用 os.stat 结果查询缓存"""
+        return self.get(path, st.st_size, st.st_mtime_ns, st.st_ino, algorithm)
+
+    def store_stat(self, path: str, st: os.stat_result, algorithm: str, digest: str) -> None:
+        """用 os.stat 结果写入缓存"""
+        self.put(path, st.st_size, st.st_mtime_ns, st.st_ino, algorithm, digest)
+
+    def flush(self) -> None:
+        """提交未写入的更改并执行淘汰"""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        for table in _TABLES:
+            if self._touched[table]:
+                self._conn.executemany(
+                    "UPDATE " + table + " SET last_used = ? WHERE path = ? AND algorithm = ?",
+                    [(used, path, algorithm) for (path, algorithm), used in self._touched[table].items()]
+                )
+                self._touched[table] = {}
+            if self._entries[table] > self.max_entries:
+                self._evict(table)
+        self._conn.commit()
+        self._pending_writes = 0
+
+    def _evict(self, table):
+        """淘汰最久未使用的条目，保留上限的 90%，避免每次提交都触发淘汰"""
+        self._entries[table] = self._conn.execute("SELECT COUNT(*) FROM " + table).fetchone()[0]
+        if self._entries[table] <= self.max_entries:
+            return
+        excess = self._entries[table] - int(self.max_entries * 0.9)
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM " + table + " WHERE rowid IN "
+                "(SELECT rowid FROM " + table + " ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._entries[table] -= excess
+
+    def close(self) -> None:
+        """提交并关闭数据库"""
+        with self._lock:
+            self._flush()
+            self._conn.close()
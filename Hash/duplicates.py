@@ -0,0 +1,207 @@
+"""
+重复文件查找
+
+分阶段筛选，典型的目录树中大部分文件不需要完整读取：
+  1. 按大小分组，大小唯一的文件不可能有重复
+  2. 大小相同的文件计算开头和结尾各 partial_size 字节的部分摘要，再次分组
+  3. 部分摘要仍然相同的文件才 (并行) 计算完整摘要，完整摘要相同即为重复
+不超过 2 * partial_size 的小文件部分摘要就等于读完整个文件，因此直接计算完整摘要。
+同一文件的多个硬链接 (设备号和 inode 相同) 只保留第一个路径，它们不占用额外空间。
+"""
+import functools
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import hash_engine
+from digest_cache import DigestCache
+from file_reader import ReadOptions, read_full
+from scanner import BackgroundScan, FileEntry, TraversalSpec
+
+# 部分摘要读取的开头和结尾字节数
+PARTIAL_SIZE = 4096
+
+
+@dataclass
+class DuplicateGroup:
+    """内容相同的一组文件"""
+    digest: str
+    size: int
+    paths: List[str]
+
+    @property
+    def reclaimable(self) -> int:
+        """只保留一份时可以释放的字节数"""
+        return self.size * (len(self.paths) - 1)
+
+
+@dataclass
+class DuplicateReport:
+    """
+    重复文件查找结果
+
+    :param groups: 重复文件组，按可释放字节数从大到小排列
+    :param partial_hashed: 计算了部分摘要的文件数
+    :param full_hashed: 计算了完整摘要的文件数 (不含缓存命中)
+    :param bytes_read: 为计算摘要读取的字节数 (近似值)
+    :param errors: {路径: 错误说明}
+    """
+    algorithm: str
+    groups: List[DuplicateGroup] = field(default_factory=list)
+    total_files: int = 0
+    total_size: int = 0
+    partial_hashed: int = 0
+    full_hashed: int = 0
+    bytes_read: int = 0
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def reclaimable(self) -> int:
+        return sum(group.reclaimable for group in self.groups)
+
+
+def partial_digest(path: str, size: int, partial_size: int = PARTIAL_SIZE) -> str:
+    """文件开头和结尾各 partial_size 字节的摘要，用于在完整计算之前排除不同的文件"""
+    hash_obj = hashlib.blake2b(digest_size=16)
+    buffer = bytearray(partial_size)
+    with open(path, "rb", buffering=0) as f:
+        hash_obj.update(buffer[:read_full(f, buffer)])
+        if size > partial_size:
+            f.seek(max(partial_size, size - partial_size))
+            hash_obj.update(buffer[:read_full(f, buffer)])
+    return hash_obj.hexdigest()
+
+
+def _partial_entry(partial_size, entry):
+    return partial_digest(entry.path, entry.size, partial_size)
+
+
+def _iter_entries(paths, report, traversal=None):
+    """展开输入路径：文件夹按遍历规则扫描其中的文件，文件直接使用"""
+    for path in paths:
+        if os.path.isdir(path):
+            with BackgroundScan(path, spec=traversal) as scan:
+                yield from scan
+            continue
+        try:
+            st = os.stat(path)
+        except OSError as e:
+            report.errors[path] = e.strerror or str(e)
+            continue
+        yield FileEntry(path, os.path.basename(path), st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+
+def _group(entries, key):
+    groups = {}
+    for entry in entries:
+        groups.setdefault(key(entry), []).append(entry)
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def find_duplicates(paths: Sequence[str], algorithm: str = "sha256", min_size: int = 1,
+                    partial_size: int = PARTIAL_SIZE, workers: int = 1, pool: str = "thread",
+                    cache: Optional[DigestCache] = None, read_options: Optional[ReadOptions] = None,
+                    progress_callback: Optional[hash_engine.ProgressCallback] = None,
+                    cancel_event: Optional[threading.Event] = None,
+                    traversal: Optional[TraversalSpec] = None) -> DuplicateReport:
+    """
+    在若干文件夹 (或文件) 中查找内容相同的文件
+
+    :param paths: 文件夹或文件路径
+    :param algorithm: 完整摘要使用的算法
+    :param min_size: 忽略小于该大小的文件，默认忽略空文件
+    :param partial_size: 部分摘要读取的开头和结尾字节数
+    :param workers: 并行工作数
+    :param pool: "thread" 或 "process"
+    :param cache: 摘要缓存，命中时不再读取完整内容
+    :param read_options: 计算完整摘要时的读取策略
+    :param progress_callback: 进度回调 (本阶段已处理文件数, 本阶段文件数, 路径)，部分摘要和完整摘要阶段各计一次
+    :param cancel_event: 被设置时中止查找
+    :param traversal: 扫描文件夹时的遍历规则 (见 scanner.TraversalSpec)
+    :return: DuplicateReport
+    :raises HashCancelled: 查找被取消
+    """
+    start_time = time.perf_counter()
+    algorithms = hash_engine.normalize_algorithms(algorithm)[:1]
+    report = DuplicateReport(algorithms[0])
+
+    # 1. 按大小分组，同一个 inode 只保留一个路径
+    seen_inodes = set()
+    by_size = {}
+    for entry in _iter_entries(paths, report, traversal):
+        hash_engine.check_cancel(cancel_event)
+        if entry.inode:
+            inode_key = (entry.device, entry.inode)
+            if inode_key in seen_inodes:
+                continue
+            seen_inodes.add(inode_key)
+        report.total_files += 1
+        report.total_size += entry.size
+        if entry.size >= min_size:
+            by_size.setdefault(entry.size, []).append(entry)
+    size_groups = [group for group in by_size.values() if len(group) > 1]
+
+    def collect(completed, total):
+        """收集一个阶段的并行结果，返回 {id(条目): 结果}，读取失败的文件记入 errors"""
+        results = {}
+        processed = 0
+        for entry, value, error in completed:
+            processed += 1
+            if error is not None:
+                report.errors[entry.path] = error.strerror or str(error)
+            else:
+                results[id(entry)] = value
+            if progress_callback:
+                progress_callback(processed, total, entry.path)
+        return results
+
+    # 2. 较大的文件先比较头尾的部分摘要
+    candidates = []
+    partial_entries = []
+    for group in size_groups:
+        if group[0].size <= 2 * partial_size:
+            candidates.append(group)
+        else:
+            partial_entries.extend(group)
+    partials = collect(hash_engine.iter_completed(functools.partial(_partial_entry, partial_size), partial_entries,
+                                                  workers, pool, cancel_event=cancel_event), len(partial_entries))
+    report.partial_hashed = len(partials)
+    report.bytes_read += sum(min(entry.size, 2 * partial_size) for entry in partial_entries)
+    for group in size_groups:
+        if group[0].size > 2 * partial_size:
+            hashed = [entry for entry in group if id(entry) in partials]
+            candidates.extend(_group(hashed, lambda entry: partials[id(entry)]))
+
+    # 3. 剩余的候选文件计算完整摘要
+    full_digests = {}
+    to_hash = []
+    for group in candidates:
+        for entry in group:
+            digests = hash_engine.cached_digests(cache, entry, algorithms)
+            if digests is None:
+                to_hash.append(entry)
+            else:
+                full_digests[id(entry)] = digests[algorithms[0]]
+    hashed = collect(hash_engine.iter_file_digests(to_hash, algorithms, workers, pool, cancel_event=cancel_event,
+                                                   read_options=read_options), len(to_hash))
+    for entry in to_hash:
+        if id(entry) in hashed:
+            hash_engine.store_digests(cache, entry, hashed[id(entry)])
+            full_digests[id(entry)] = hashed[id(entry)][algorithms[0]]
+            report.full_hashed += 1
+            report.bytes_read += entry.size
+    if cache is not None:
+        cache.flush()
+
+    for group in candidates:
+        hashed_group = [entry for entry in group if id(entry) in full_digests]
+        for duplicates in _group(hashed_group, lambda entry: full_digests[id(entry)]):
+            report.groups.append(DuplicateGroup(full_digests[id(duplicates[0])], duplicates[0].size,
+                                                sorted(entry.path for entry in duplicates)))
+    report.groups.sort(key=lambda group: (-group.reclaimable, group.paths[0]))
+    report.elapsed = time.perf_counter() - start_time
+    return report
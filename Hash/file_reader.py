@@ -0,0 +1,236 @@
+"""
+文件读取策略
+
+把文件内容送入哈希对象的几种方式：
+  read      每次 f.read(chunk_size)，每块分配新的 bytes 对象 (原始实现)
+  readinto  复用同一个 bytearray，通过 readinto + memoryview 零分配读取
+  mmap      映射整个文件，按块把 memoryview 切片交给哈希对象，无需复制
+  auto      按文件大小在 read 和 readinto 之间选择，阈值来自 benchmark.py 的测量结果
+
+mmap 只在明确指定时使用：文件在计算过程中被其他进程截断时，访问映射中已不存在的部分
+会使整个进程收到 SIGBUS 而退出 (图形界面、命令行和监视模式都无法恢复)，
+其他策略在这种情况下只是读到较短的内容或得到 OSError。
+对大文件 mmap 省去的复制通常只带来几个百分点的差异，可用 benchmark.py 在目标机器上比较。
+
+在支持 posix_fadvise 的系统上会提示内核顺序读取，并在读完大文件后
+丢弃其页缓存，避免一次遍历把其他进程常用的缓存挤出去。
+"""
+import mmap
+import os
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+READ_STRATEGIES = ("auto", "read", "readinto", "mmap")
+
+# 原始实现使用的块大小
+DEFAULT_CHUNK_SIZE = 65536
+
+# auto 策略使用的块大小
+AUTO_CHUNK_SIZE = 1024 * 1024
+
+# 不超过该大小的文件用一次 read 读完
+SMALL_FILE_SIZE = 256 * 1024
+
+# 不小于该大小的文件读完后丢弃页缓存
+DROP_CACHE_MIN_SIZE = 32 * 1024 * 1024
+
+_HAS_FADVISE = hasattr(os, "posix_fadvise")
+_HAS_PREADV = hasattr(os, "preadv")
+_HAS_PREAD = hasattr(os, "pread")
+
+
+@dataclass(frozen=True)
+class ReadOptions:
+    """
+    读取参数
+
+    :param strategy: READ_STRATEGIES 之一
+    :param chunk_size: 块大小，None 表示由策略决定
+    :param fadvise: 是否使用 posix_fadvise 提示
+    """
+    strategy: str = "auto"
+    chunk_size: Optional[int] = None
+    fadvise: bool = True
+
+    def __post_init__(self):
+        if self.strategy not in READ_STRATEGIES:
+            raise ValueError("unknown read strategy: {}".format(self.strategy))
+        if self.chunk_size is not None and self.chunk_size <= 0:
+            raise ValueError("chunk_size must be positive")
+
+
+def choose_strategy(file_size: int, options: ReadOptions):
+    """
+    确定实际使用的读取策略和块大小
+
+    :return: (策略, 块大小)
+    """
+    strategy = options.strategy
+    if strategy == "auto":
+        # 不自动使用 mmap，见模块说明
+        strategy = "read" if file_size <= SMALL_FILE_SIZE else "readinto"
+        chunk_size = options.chunk_size or AUTO_CHUNK_SIZE
+    else:
+        chunk_size = options.chunk_size or DEFAULT_CHUNK_SIZE
+    # 空文件无法映射
+    if strategy == "mmap" and file_size == 0:
+        strategy = "read"
+    return strategy, chunk_size
+
+
+def update_hash_from_file(hash_obj, file_path: str, options: Optional[ReadOptions] = None,
+                          check_cancel: Optional[Callable[[], None]] = None,
+                          bytes_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    按读取策略把文件内容写入哈希对象
+
+    :param hash_obj: 具有 update() 方法的哈希对象
+    :param file_path: 文件路径
+    :param options: 读取参数
+    :param check_cancel: 每块之前调用，需要中止时抛出异常
+    :param bytes_callback: 每块之后调用，参数为该块的字节数
+    :return: 读取的总字节数
+    """
+    options = options or ReadOptions()
+    with open(file_path, 'rb', buffering=0) as f:
+        fd = f.fileno()
+        file_size = os.fstat(fd).st_size
+        strategy, chunk_size = choose_strategy(file_size, options)
+
+        if options.fadvise and _HAS_FADVISE:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        if strategy == "mmap":
+            total = _hash_mmap(hash_obj, f, chunk_size, check_cancel, bytes_callback)
+        elif strategy == "readinto":
+            total = _hash_readinto(hash_obj, f, chunk_size, check_cancel, bytes_callback)
+        else:
+            total = _hash_read(hash_obj, f, chunk_size, check_cancel, bytes_callback)
+
+        if options.fadvise and _HAS_FADVISE and total >= DROP_CACHE_MIN_SIZE:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    return total
+
+
+def _hash_read(hash_obj, f, chunk_size, check_cancel, bytes_callback):
+    total = 0
+    while True:
+        if check_cancel:
+            check_cancel()
+        data = f.read(chunk_size)
+        if not data:
+            break
+        hash_obj.update(data)
+        total += len(data)
+        if bytes_callback:
+            bytes_callback(len(data))
+    return total
+
+
+def _hash_readinto(hash_obj, f, chunk_size, check_cancel, bytes_callback):
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total = 0
+    try:
+        while True:
+            if check_cancel:
+                check_cancel()
+            length = f.readinto(buffer)
+            if not length:
+                break
+            hash_obj.update(view[:length])
+            total += length
+            if bytes_callback:
+                bytes_callback(length)
+    finally:
+        view.release()
+    return total
+
+
+def _hash_mmap(hash_obj, f, chunk_size, check_cancel, bytes_callback):
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        # 以映射时的实际长度为准，文件可能在 fstat 之后被修改
+        file_size = len(mapped)
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, file_size, chunk_size):
+                if check_cancel:
+                    check_cancel()
+                block = view[offset:offset + chunk_size]
+                hash_obj.update(block)
+                block.release()
+                if bytes_callback:
+                    bytes_callback(min(chunk_size, file_size - offset))
+        finally:
+            view.release()
+    return file_size
+
+
+def update_hash_from_range(hash_obj, file_path: str, offset: int, length: int,
+                           chunk_size: int = AUTO_CHUNK_SIZE,
+                           check_cancel: Optional[Callable[[], None]] = None,
+                           bytes_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    把文件中 [offset, offset + length) 的内容写入哈希对象
+
+    按位置读取 (os.preadv / os.pread)，不依赖文件指针，多个线程可以同时读取同一文件的不同区域；
+    不支持的系统上退回 seek + readinto。缓冲区复用，内存占用不超过 chunk_size。
+
+    :param offset: 起始偏移
+    :param length: 读取的字节数
+    :param chunk_size: 每次读取的字节数
+    :param check_cancel: 每块之前调用，需要中止时抛出异常
+    :param bytes_callback: 每块之后调用，参数为该块的字节数
+    :return: 实际读取的字节数，文件在读取期间被截断时小于 length
+    """
+    buffer = bytearray(max(1, min(chunk_size, length)))
+    view = memoryview(buffer)
+    total = 0
+    try:
+        with open(file_path, 'rb', buffering=0) as f:
+            while total < length:
+                if check_cancel:
+                    check_cancel()
+                with view[:min(len(buffer), length - total)] as target:
+                    count = _pread_into(f, target, offset + total)
+                if not count:
+                    break
+                with view[:count] as block:
+                    hash_obj.update(block)
+                total += count
+                if bytes_callback:
+                    bytes_callback(count)
+    finally:
+        view.release()
+    return total
+
+
+def read_full(f, buffer: bytearray) -> int:
+    """
+    读满 buffer，返回读取的字节数；只有到达文件末尾时才少于 buffer 的长度
+
+    FUSE、NFS/SMB 等文件系统和无缓冲的文件 (buffering=0) 在文件末尾之前也可能返回较短的读取结果，
+    比较内容或计算部分摘要时需要读满。
+    """
+    length = 0
+    with memoryview(buffer) as view:
+        while length < len(buffer):
+            count = f.readinto(view[length:])
+            if not count:
+                break
+            length += count
+    return length
+
+
+def _pread_into(f, target: memoryview, offset: int) -> int:
+    """从 offset 处读取到 target 中，返回读取的字节数"""
+    if _HAS_PREADV:
+        return os.preadv(f.fileno(), [target], offset)
+    if _HAS_PREAD:
+        data = os.pread(f.fileno(), len(target), offset)
+        target[:len(data)] = data
+        return len(data)
+    f.seek(offset)
+    return f.readinto(target)
@@ -0,0 +1,594 @@
+"""
+哈希计算引擎
+
+不依赖 tkinter，可在无图形界面的环境（批处理任务、服务器）中直接调用。
+图形界面 HashCalculatorApp 只是该模块的一个调用方。
+"""
+import errno
+import functools
+import os
+import stat
+import time
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import BinaryIO, Callable, Dict, Iterable, Optional, Sequence, Tuple, Union
+
+from algorithms import new_hash
+from checkpoint import FolderCheckpoint
+from digest_cache import DigestCache
+from file_reader import AUTO_CHUNK_SIZE, ReadOptions, update_hash_from_file
+from progress import ProgressTracker
+from scanner import BackgroundScan, TraversalSpec
+
+
+# 多算法同时计算时，单块数据不小于该大小才分给多个线程
+THREADED_MIN_CHUNK = 64 * 1024
+
+# 算法参数: 单个算法名，或多个算法名 (只读取一次文件)
+Algorithms = Union[str, Sequence[str]]
+
+
+@dataclass
+class FileHashResult:
+    """
+    单个文件的哈希计算结果
+
+    algorithm/digest 为第一个算法及其摘要，digests 包含所有算法的摘要。
+    """
+    path: str
+    algorithm: str
+    digest: str
+    size: int
+    elapsed: float
+    cached: bool = False
+    digests: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class FolderHashResult:
+    """
+    文件夹的哈希计算结果
+
+    algorithm/digest 为第一个算法及其摘要，digests 包含所有算法的摘要。
+    """
+    path: str
+    algorithm: str
+    digest: str
+    total_files: int
+    total_size: int
+    elapsed: float
+    mode: str = "stream"
+    cached_files: int = 0
+    digests: Dict[str, str] = field(default_factory=dict)
+    resumed_files: int = 0
+
+
+class HashCancelled(Exception):
+    """计算被调用方通过 cancel_event 取消"""
+
+
+# 进度回调: (已处理文件数, 文件总数, 当前文件相对路径)
+ProgressCallback = Callable[[int, int, str], None]
+
+# 字节进度回调: (已读取字节数, 文件总字节数)
+BytesProgressCallback = Callable[[int, int], None]
+
+# 逐文件结果回调: (相对路径, 文件大小, {算法名: 摘要})
+FileResultCallback = Callable[[str, int, Dict[str, str]], None]
+
+
+def normalize_algorithms(algorithm: Algorithms) -> Tuple[str, ...]:
+    """
+    把算法参数统一为去重后的算法名元组，并检查算法是否受支持
+
+    :raises ValueError: 没有算法或算法不受支持
+    """
+    if isinstance(algorithm, str):
+        algorithm = (algorithm,)
+    algorithms = tuple(dict.fromkeys(a.lower() for a in algorithm))
+    if not algorithms:
+        raise ValueError("at least one hash algorithm is required")
+    for name in algorithms:
+        new_hash(name)
+    return algorithms
+
+
+class MultiHash:
+    """
+    同时计算多个摘要的哈希对象：每块数据只读取一次，写入所有算法
+
+    threaded 为 True 时，每块数据由共享线程池中的线程分别写入各算法
+    (hashlib 在处理较大的数据块时会释放 GIL)；默认在多核且多算法时启用。
+    """
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, algorithms: Sequence[str], threaded: Optional[bool] = None):
+        self.algorithms = tuple(algorithms)
+        self._hashes = [new_hash(name) for name in self.algorithms]
+        if threaded is None:
+            threaded = (os.cpu_count() or 1) > 1
+        self._threaded = threaded and len(self._hashes) > 1
+
+    @classmethod
+    def _get_executor(cls) -> ThreadPoolExecutor:
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(thread_name_prefix="multi-hash")
+            return cls._executor
+
+    def update(self, data) -> None:
+        if self._threaded and len(data) >= THREADED_MIN_CHUNK:
+            # 必须等所有算法处理完再返回：readinto 策略会复用同一个缓冲区
+            executor = self._get_executor()
+            futures = [executor.submit(h.update, data) for h in self._hashes[1:]]
+            self._hashes[0].update(data)
+            for future in futures:
+                future.result()
+        else:
+            for h in self._hashes:
+                h.update(data)
+
+    def digests(self) -> Dict[str, bytes]:
+        return {name: h.digest() for name, h in zip(self.algorithms, self._hashes)}
+
+    def hexdigests(self) -> Dict[str, str]:
+        return {name: h.hexdigest() for name, h in zip(self.algorithms, self._hashes)}
+
+
+def check_cancel(cancel_event: Optional[threading.Event]) -> None:
+    """如果已请求取消则抛出 HashCancelled"""
+    if cancel_event is not None and cancel_event.is_set():
+        raise HashCancelled()
+
+
+def _update_from_file(hash_obj, file_path: str, cancel_event: Optional[threading.Event] = None,
+                      bytes_callback: Optional[Callable[[int], None]] = None,
+                      read_options: Optional[ReadOptions] = None) -> None:
+    """按读取策略把文件内容写入哈希对象，每块之间检查取消请求"""
+    cancel_check = (lambda: check_cancel(cancel_event)) if cancel_event is not None else None
+    update_hash_from_file(hash_obj, file_path, read_options, cancel_check, bytes_callback)
+
+
+def compute_file_hash(file_path: str, algorithm: Algorithms = "sha256",
+                      progress_callback: Optional[BytesProgressCallback] = None,
+                      cancel_event: Optional[threading.Event] = None,
+                      cache: Optional[DigestCache] = None,
+                      read_options: Optional[ReadOptions] = None) -> FileHashResult:
+    """
+    计算文件的哈希值
+
+    :param file_path: 文件路径
+    :param algorithm: 算法名 (见 algorithms 模块)，或多个算法名 (文件只读取一次)
+    :param progress_callback: 进度回调函数 (已读取字节数, 文件总字节数)
+    :param cancel_event: 被设置时中止计算
+    :param cache: 摘要缓存，文件元数据未变化时直接使用缓存的摘要
+    :param read_options: 读取策略和块大小，默认按文件大小自动选择
+    :return: FileHashResult
+    :raises FileNotFoundError: 文件不存在
+    :raises HashCancelled: 计算被取消
+    :raises OSError: 读取文件失败
+    """
+    algorithms = normalize_algorithms(algorithm)
+    start_time = time.perf_counter()
+    # 只做一次 stat：既判断是否为普通文件，也用于查询缓存
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_path)
+    file_size = st.st_size
+
+    if cache is not None:
+        digests = {name: cache.lookup_stat(file_path, st, name) for name in algorithms}
+        if None not in digests.values():
+            return _file_result(file_path, algorithms, digests, file_size, time.perf_counter() - start_time, True)
+
+    hash_obj = MultiHash(algorithms)
+    bytes_read = 0
+
+    def on_chunk(length):
+        nonlocal bytes_read
+        bytes_read += length
+        progress_callback(bytes_read, file_size)
+
+    _update_from_file(hash_obj, file_path, cancel_event, on_chunk if progress_callback else None, read_options)
+    digests = hash_obj.hexdigests()
+    if cache is not None:
+        for name, digest in digests.items():
+            cache.store_stat(file_path, st, name, digest)
+    elapsed = time.perf_counter() - start_time
+
+    return _file_result(file_path, algorithms, digests, file_size, elapsed)
+
+
+def _file_result(file_path, algorithms, digests, file_size, elapsed, cached=False):
+    return FileHashResult(file_path, algorithms[0], digests[algorithms[0]], file_size, elapsed, cached, digests)
+
+
+def hash_file_digest(file_path: str, algorithm: str = "sha256",
+                     cancel_event: Optional[threading.Event] = None,
+                     read_options: Optional[ReadOptions] = None) -> str:
+    """
+    计算单个文件内容的十六进制摘要
+
+    作为模块级函数以便在进程池中调用。
+
+    :param file_path: 文件路径
+    :param algorithm: 算法名 (见 algorithms 模块)
+    :param cancel_event: 被设置时中止计算 (进程池中无效)
+    :param read_options: 读取策略和块大小
+    :return: 十六进制摘要
+    """
+    hash_obj = new_hash(algorithm)
+    _update_from_file(hash_obj, file_path, cancel_event, read_options=read_options)
+    return hash_obj.hexdigest()
+
+
+def hash_file_digests(file_path: str, algorithms: Sequence[str],
+                      cancel_event: Optional[threading.Event] = None,
+                      read_options: Optional[ReadOptions] = None,
+                      bytes_callback: Optional[Callable[[int], None]] = None) -> Dict[str, str]:
+    """
+    读取一次文件，计算多个算法的十六进制摘要
+
+    在线程池/进程池中调用时文件之间已经并行，因此不再为每个算法开线程。
+
+    :param bytes_callback: 每读取一块调用一次 (本块字节数)
+    :return: {算法名: 十六进制摘要}
+    """
+    hash_obj = MultiHash(algorithms, threaded=False)
+    _update_from_file(hash_obj, file_path, cancel_event, bytes_callback, read_options)
+    return hash_obj.hexdigests()
+
+
+def compute_stream_hash(stream: BinaryIO, algorithm: Algorithms = "sha256", name: str = "-",
+                        chunk_size: int = AUTO_CHUNK_SIZE,
+                        cancel_event: Optional[threading.Event] = None) -> FileHashResult:
+    """
+    计算二进制流 (如标准输入) 的哈希值，边读边算，不需要知道总长度
+
+    :param stream: 以二进制方式打开的流，需支持 readinto 或 read
+    :param algorithm: 算法名 (见 algorithms 模块)，或多个算法名
+    :param name: 结果中记录的路径名
+    :param chunk_size: 每次读取的字节数
+    :param cancel_event: 被设置时中止计算
+    :return: FileHashResult，size 为读取的总字节数
+    """
+    algorithms = normalize_algorithms(algorithm)
+    hash_obj = MultiHash(algorithms)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    total = 0
+    start_time = time.perf_counter()
+    readinto = getattr(stream, "readinto", None)
+    while True:
+        check_cancel(cancel_event)
+        if readinto is not None:
+            length = readinto(buffer)
+            data = view[:length] if length else None
+        else:
+            data = stream.read(chunk_size)
+            length = len(data)
+        if not length:
+            break
+        hash_obj.update(data)
+        total += length
+    view.release()
+    return _file_result(name, algorithms, hash_obj.hexdigests(), total, time.perf_counter() - start_time)
+
+
+def folder_record(rel_path: str, digest: str) -> bytes:
+    """
+    records 模式下单个文件写入文件夹哈希的记录
+
+    格式为 "相对路径\0十六进制摘要\n"，相对路径统一使用 "/" 分隔，
+    保证不同平台上得到相同的文件夹哈希。路径按 os.fsencode 编码 (与 merkle_record 相同)：
+    有效的 UTF-8 名称得到相同的字节，无法解码的名称还原为磁盘上的原始字节。
+    """
+    return os.fsencode(rel_path.replace(os.sep, "/")) + b"\0" + digest.encode('ascii') + b"\n"
+
+
+def _create_pool(pool: str, workers: int) -> Executor:
+    """创建线程池或进程池"""
+    if pool == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="folder-hash")
+    if pool == "process":
+        # 进程池依赖 multiprocessing，按需导入以缩短命令行的启动时间
+        from concurrent.futures import ProcessPoolExecutor
+        return ProcessPoolExecutor(max_workers=workers)
+    raise ValueError("unknown pool type: {}".format(pool))
+
+
+def compute_folder_hash(folder_path: str, algorithm: Algorithms = "sha256",
+                        progress_callback: Optional[ProgressCallback] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        mode: str = "stream", workers: int = 1, pool: str = "thread",
+                        queue_depth: Optional[int] = None,
+                        cache: Optional[DigestCache] = None,
+                        read_options: Optional[ReadOptions] = None,
+                        checkpoint: Optional[str] = None,
+                        tracker: Optional[ProgressTracker] = None,
+                        file_callback: Optional[FileResultCallback] = None,
+                        traversal: Optional[TraversalSpec] = None) -> FolderHashResult:
+    """
+    计算文件夹的哈希值
+
+    stream 模式依次将每个文件的相对路径和内容写入同一个哈希对象；
+    records 模式先分别计算每个文件的摘要 (可并行)，再按相对路径排序，
+    把 folder_record() 生成的记录写入文件夹哈希；
+    merkle 模式按目录自底向上合并子项摘要 (见 merkle.py)，配合缓存时只重新计算变化的路径。
+    三种模式的结果互不相同。
+
+    :param folder_path: 文件夹路径
+    :param algorithm: 算法名 (见 algorithms 模块)，或多个算法名 (每个文件只读取一次)
+    :param progress_callback: 进度回调函数 (已处理文件数, 文件总数, 相对路径)
+    :param cancel_event: 被设置时中止计算
+    :param mode: "stream"、"records" 或 "merkle"
+    :param workers: records/merkle 模式下的并行工作数
+    :param pool: records/merkle 模式下的池类型，"thread" 或 "process"
+    :param queue_depth: 同时提交到池中的最大文件数，默认为 workers * 4
+    :param cache: 摘要缓存 (records/merkle 模式)，元数据未变化的文件不再读取
+    :param read_options: 读取策略和块大小
+    :param checkpoint: 检查点文件路径 (records/merkle 模式，见 checkpoint.py)。计算中途被取消、出错或崩溃后，
+        用同一路径再次调用会跳过已完成的文件；计算成功后检查点文件被删除
+    :param tracker: 按字节汇总进度 (见 progress.py)，可与 progress_callback 同时使用；
+        多个计算共用同一个 tracker 时得到合并的进度
+    :param file_callback: 每个文件的摘要得出后调用 (相对路径, 大小, {算法名: 摘要})，仅 records 模式；
+        包括来自缓存和检查点的文件，按完成顺序调用
+    :param traversal: 遍历规则 (排序、包含/排除模式、符号链接等，见 scanner.TraversalSpec)；
+        None 时按文件系统返回的顺序遍历全部文件，stream 模式的结果因此可能随文件系统而不同
+    :return: FolderHashResult
+    :raises NotADirectoryError: 文件夹不存在
+    :raises HashCancelled: 计算被取消
+    :raises ValueError: 参数无效
+    :raises OSError: 读取文件失败
+    """
+    algorithms = normalize_algorithms(algorithm)
+    if not os.path.isdir(folder_path):
+        raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), folder_path)
+
+    if file_callback is not None and mode != "records":
+        raise ValueError("per-file results require records mode")
+    if mode == "stream":
+        if workers != 1 or cache is not None or checkpoint is not None:
+            raise ValueError("parallel workers, digest cache and checkpoints require records or merkle mode")
+        return _compute_folder_stream(folder_path, algorithms, progress_callback, cancel_event, read_options,
+                                      tracker, traversal)
+    if mode == "records":
+        compute = functools.partial(_compute_folder_records, file_callback=file_callback)
+    elif mode == "merkle":
+        # merkle 依赖本模块，延迟导入以避免循环导入
+        from merkle import compute_folder_merkle as compute
+    else:
+        raise ValueError("unknown folder hash mode: {}".format(mode))
+
+    if checkpoint is None:
+        return compute(folder_path, algorithms, progress_callback, cancel_event, workers, pool, queue_depth,
+                       cache, read_options, tracker=tracker, traversal=traversal)
+    # 成功时删除检查点，取消或出错时写入已完成的文件后保留
+    with FolderCheckpoint(checkpoint, folder_path, algorithms, mode) as state:
+        return compute(folder_path, algorithms, progress_callback, cancel_event, workers, pool, queue_depth,
+                       cache, read_options, state, tracker=tracker, traversal=traversal)
+
+
+def _folder_result(folder_path, algorithms, digests, total_files, total_size, elapsed, mode, cached_files=0,
+                   resumed_files=0):
+    return FolderHashResult(folder_path, algorithms[0], digests[algorithms[0]], total_files, total_size, elapsed,
+                            mode, cached_files, digests, resumed_files)
+
+
+def _compute_folder_stream(folder_path, algorithms, progress_callback, cancel_event, read_options, tracker=None,
+                           traversal=None):
+    """stream 模式：路径和内容依次写入同一个哈希对象"""
+    hash_obj = MultiHash(algorithms)
+    processed_files = 0
+    total_size = 0
+    start_time = time.perf_counter()
+    bytes_callback = tracker.add_bytes if tracker is not None else None
+
+    # 扫描在后台线程中进行，哈希计算无需等待扫描结束
+    with BackgroundScan(folder_path, tracker, traversal) as scan:
+        for entry in scan:
+            # 添加文件相对路径到哈希
+            hash_obj.update(os.fsencode(entry.rel_path))
+
+            # 添加文件内容到哈希
+            _update_from_file(hash_obj, entry.path, cancel_event, bytes_callback, read_options)
+
+            processed_files += 1
+            total_size += entry.size
+            if progress_callback:
+                progress_callback(processed_files, scan.files_found, entry.rel_path)
+            if tracker is not None:
+                tracker.file_done(entry.rel_path)
+    if tracker is not None:
+        tracker.finish()
+
+    elapsed = time.perf_counter() - start_time
+    return _folder_result(folder_path, algorithms, hash_obj.hexdigests(), processed_files, total_size, elapsed,
+                          "stream")
+
+
+def cached_digests(cache: Optional[DigestCache], entry, algorithms: Sequence[str]) -> Optional[Dict[str, str]]:
+    """
+    查询扫描条目的缓存摘要
+
+    :param entry: FileEntry
+    :return: 所有算法都命中缓存时返回 {算法名: 摘要}，否则返回 None
+    """
+    if cache is None:
+        return None
+    file_digests = {}
+    for name in algorithms:
+        digest = cache.get(entry.path, entry.size, entry.mtime_ns, entry.inode, name)
+        if digest is None:
+            return None
+        file_digests[name] = digest
+    return file_digests
+
+
+def store_digests(cache: Optional[DigestCache], entry, file_digests: Dict[str, str]) -> None:
+    """把扫描条目的摘要写入缓存，cache 为 None 时什么也不做"""
+    if cache is None:
+        return
+    for name, digest in file_digests.items():
+        cache.put(entry.path, entry.size, entry.mtime_ns, entry.inode, name, digest)
+
+
+def iter_completed(func: Callable, items: Iterable, workers: int = 1, pool: str = "thread",
+                   queue_depth: Optional[int] = None, cancel_event: Optional[threading.Event] = None):
+    """
+    并行地对每个条目调用 func(条目)，按完成顺序产出结果
+
+    :param func: 读取文件的函数，使用进程池时必须可以 pickle
+    :param items: 条目，可以是边扫描边产生的生成器
+    :param workers: 并行工作数，1 表示在当前线程中依次调用
+    :param pool: "thread" 或 "process"
+    :param queue_depth: 同时提交到池中的最大条目数，默认为 workers * 4
+    :param cancel_event: 被设置时停止提交新的条目
+    :return: 生成 (条目, 结果, None) 或读取失败时的 (条目, None, OSError)
+    :raises HashCancelled: 计算被取消
+    """
+    queue_depth = queue_depth or workers * 4
+    if workers < 1 or queue_depth < 1:
+        raise ValueError("workers and queue_depth must be positive")
+
+    if workers == 1:
+        for item in items:
+            check_cancel(cancel_event)
+            try:
+                yield item, func(item), None
+            except OSError as e:
+                yield item, None, e
+        return
+
+    pending = {}
+    item_iter = iter(items)
+    with _create_pool(pool, workers) as executor:
+        try:
+            while True:
+                # 保持最多 queue_depth 个条目在池中，避免一次性提交上百万个任务
+                for item in item_iter:
+                    check_cancel(cancel_event)
+                    pending[executor.submit(func, item)] = item
+                    if len(pending) >= queue_depth:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    item = pending.pop(future)
+                    try:
+                        yield item, future.result(), None
+                    except OSError as e:
+                        yield item, None, e
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _hash_entry(algorithms, cancel_event, read_options, bytes_callback, entry):
+    return hash_file_digests(entry.path, algorithms, cancel_event, read_options, bytes_callback)
+
+
+def reads_in_process(workers: int, pool: str) -> bool:
+    """文件是否在当前进程中读取：此时 cancel_event 和字节进度回调可以传给读取函数"""
+    return workers == 1 or pool == "thread"
+
+
+def iter_file_digests(entries: Iterable, algorithms: Sequence[str], workers: int = 1, pool: str = "thread",
+                      queue_depth: Optional[int] = None, cancel_event: Optional[threading.Event] = None,
+                      read_options: Optional[ReadOptions] = None,
+                      bytes_callback: Optional[Callable[[int], None]] = None):
+    """
+    并行计算一批文件的摘要，按完成顺序产出
+
+    :param entries: 具有 path 属性的条目 (如 FileEntry)，可以是边扫描边产生的生成器
+    :param algorithms: 算法名列表
+    :param workers: 并行工作数，1 表示在当前线程中依次计算
+    :param pool: "thread" 或 "process"
+    :param queue_depth: 同时提交到池中的最大文件数，默认为 workers * 4
+    :param cancel_event: 被设置时中止计算
+    :param read_options: 读取策略和块大小
+    :param bytes_callback: 每读取一块调用一次 (本块字节数)，可能在多个线程中同时调用；使用进程池时不调用
+    :return: 生成 (条目, {算法名: 摘要}, None) 或读取失败时的 (条目, None, OSError)
+    :raises HashCancelled: 计算被取消
+    """
+    # 进程池中的任务无法共享 cancel_event 和回调，只能在提交之间检查取消
+    if not reads_in_process(workers, pool):
+        cancel_event, bytes_callback = None, None
+    func = functools.partial(_hash_entry, tuple(algorithms), cancel_event, read_options, bytes_callback)
+    return iter_completed(func, entries, workers, pool, queue_depth, cancel_event)
+
+
+def _compute_folder_records(folder_path, algorithms, progress_callback, cancel_event,
+                            workers, pool, queue_depth, cache, read_options, checkpoint=None, tracker=None,
+                            file_callback=None, traversal=None):
+    """
+    records 模式：并行计算每个文件的摘要，再按相对路径排序合并
+
+    多个算法时每个文件只读取一次，每个算法各自得到一个文件夹摘要。
+    """
+    start_time = time.perf_counter()
+    total_size = 0
+    cached_files = 0
+    digests = {}
+    bytes_callback = tracker.add_bytes if tracker is not None else None
+    # 在其他进程中读取的文件没有逐块进度，完成时一次计入
+    hashed_unread = not reads_in_process(workers, pool)
+
+    with BackgroundScan(folder_path, tracker, traversal) as scan:
+        def record(entry, file_digests, read=False):
+            """
+            :param read: 本次读取了文件内容 (而不是来自检查点或缓存)
+            """
+            digests[entry.rel_path] = file_digests
+            if file_callback:
+                file_callback(entry.rel_path, entry.size, file_digests)
+            if progress_callback:
+                progress_callback(len(digests), scan.files_found, entry.rel_path)
+            if tracker is not None:
+                tracker.file_done(entry.rel_path, entry.size if hashed_unread or not read else 0)
+
+        def entries_to_hash():
+            """跳过检查点中已完成和命中缓存的文件，其余交给 iter_file_digests"""
+            nonlocal total_size, cached_files
+            for entry in scan:
+                total_size += entry.size
+                file_digests = checkpoint.lookup(entry) if checkpoint is not None else None
+                if file_digests is not None:
+                    record(entry, file_digests)
+                    continue
+                file_digests = cached_digests(cache, entry, algorithms)
+                if file_digests is None:
+                    yield entry
+                else:
+                    cached_files += 1
+                    record(entry, file_digests)
+
+        for entry, file_digests, error in iter_file_digests(entries_to_hash(), algorithms, workers, pool,
+                                                            queue_depth, cancel_event, read_options, bytes_callback):
+            if error is not None:
+                raise error
+            store_digests(cache, entry, file_digests)
+            if checkpoint is not None:
+                checkpoint.add(entry, file_digests)
+            record(entry, file_digests, read=True)
+    if cache is not None:
+        cache.flush()
+    if tracker is not None:
+        tracker.finish()
+
+    folder_hashes = {name: new_hash(name) for name in algorithms}
+    for rel_path in sorted(digests):
+        for name, hash_obj in folder_hashes.items():
+            hash_obj.update(folder_record(rel_path, digests[rel_path][name]))
+
+    elapsed = time.perf_counter() - start_time
+    folder_digests = {name: hash_obj.hexdigest() for name, hash_obj in folder_hashes.items()}
+    return _folder_result(folder_path, algorithms, folder_digests, len(digests), total_size, elapsed,
+                          "records", cached_files, checkpoint.resumed if checkpoint is not None else 0)
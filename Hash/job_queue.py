@@ -0,0 +1,290 @@
+"""
+批量任务队列
+
+一次加入大量文件和文件夹，按优先级依次计算摘要：
+    - 所有任务共用一个线程池，同时运行 concurrency 个任务，运行期间仍可加入任务或调整优先级
+    - 每个任务单独记录状态、尝试次数、结果或错误
+    - 读取失败的任务自动重试 retries 次，之后可以手动重试
+    - 所有任务共用一个 ProgressTracker，得到整个队列的字节进度和吞吐量；
+      每次尝试通过 AttemptTracker 报告进度，失败或取消的尝试从中撤销，重试不会重复计入
+"""
+import errno
+import heapq
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import unquote, urlparse
+
+import hash_engine
+from digest_cache import DigestCache
+from file_reader import ReadOptions
+from hash_engine import Algorithms, HashCancelled
+from progress import AttemptTracker, ProgressTracker
+
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+
+# 读取失败后自动重试的次数
+DEFAULT_RETRIES = 1
+
+# 等待运行中的任务时，每隔多少秒检查一次新加入的任务和取消请求
+SCHEDULE_INTERVAL = 0.2
+
+# 重试也不会成功的错误
+_PERMANENT_ERRNOS = (errno.ENOENT, errno.ENOTDIR, errno.EISDIR, errno.EACCES, errno.EPERM)
+
+
+@dataclass(eq=False)
+class Job:
+    """
+    一个文件或文件夹任务
+
+    :param kind: "file" 或 "folder"
+    :param priority: 数值越大越先运行，相同时按加入顺序
+    :param attempts: 已运行的次数
+    :param result: 成功时为 FileHashResult 或 FolderHashResult
+    :param error: 失败时的异常
+    """
+    job_id: int
+    path: str
+    kind: str
+    priority: int = 0
+    status: str = JOB_PENDING
+    attempts: int = 0
+    result: object = None
+    error: Optional[Exception] = None
+
+
+@dataclass
+class QueueReport:
+    """一次 run() 的汇总"""
+    done: int
+    failed: int
+    pending: int
+    total_size: int
+    elapsed: float
+
+
+JobCallback = Callable[[Job], None]
+
+
+def parse_path_list(text: str) -> List[str]:
+    """
+    解析粘贴或拖入的路径列表：每行一个路径，忽略空行，去掉两端的引号，
+    支持文件管理器复制的 file:// URI
+    """
+    paths = []
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) >= 2 and line[0] == line[-1] and line[0] in "\"'":
+            line = line[1:-1]
+        if line.startswith("file://"):
+            line = unquote(urlparse(line).path)
+            # Windows 下的 file:///C:/dir
+            if os.name == "nt" and line.startswith("/") and line[2:3] == ":":
+                line = line[1:]
+        if line:
+            paths.append(line)
+    return paths
+
+
+class JobQueue:
+    """
+    线程安全的任务队列，任务在多次 run() 之间保留
+
+    :param retries: 读取失败后自动重试的次数
+    """
+
+    def __init__(self, retries: int = DEFAULT_RETRIES):
+        self.retries = retries
+        self.jobs: List[Job] = []
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+
+    def add(self, paths: Iterable[str], priority: int = 0) -> List[Job]:
+        """
+        加入任务，已在队列中且尚未完成的路径不重复加入
+
+        :return: 新加入的任务
+        """
+        added = []
+        with self._lock:
+            queued = {job.path for job in self.jobs if job.status in (JOB_PENDING, JOB_RUNNING)}
+            for path in paths:
+                path = os.path.abspath(path)
+                if path in queued:
+                    continue
+                queued.add(path)
+                job = Job(next(self._ids), path, "folder" if os.path.isdir(path) else "file", priority)
+                self.jobs.append(job)
+                self._push(job)
+                added.append(job)
+        return added
+
+    def set_priority(self, job: Job, priority: int) -> None:
+        """调整优先级，对尚未运行的任务立即生效"""
+        with self._lock:
+            job.priority = priority
+            if job.status == JOB_PENDING:
+                self._push(job)
+
+    def retry(self, jobs: Optional[Iterable[Job]] = None) -> List[Job]:
+        """
+        把失败的任务重新放回队列
+
+        :param jobs: 要重试的任务，默认为所有失败的任务
+        :return: 重新排队的任务
+        """
+        requeued = []
+        with self._lock:
+            for job in list(jobs) if jobs is not None else self.jobs:
+                if job.status == JOB_FAILED:
+                    job.status = JOB_PENDING
+                    job.error = None
+                    self._push(job)
+                    requeued.append(job)
+        return requeued
+
+    def remove(self, jobs: Iterable[Job]) -> None:
+        """移除不在运行中的任务"""
+        with self._lock:
+            removing = {id(job) for job in jobs if job.status != JOB_RUNNING}
+            for job in self.jobs:
+                if id(job) in removing:
+                    # 堆中的条目在取出时跳过
+                    job.status = JOB_CANCELLED
+            self.jobs = [job for job in self.jobs if id(job) not in removing]
+
+    def counts(self) -> Dict[str, int]:
+        """各状态的任务数"""
+        with self._lock:
+            counts = dict.fromkeys((JOB_PENDING, JOB_RUNNING, JOB_DONE, JOB_FAILED, JOB_CANCELLED), 0)
+            for job in self.jobs:
+                counts[job.status] += 1
+            return counts
+
+    def run(self, algorithms: Algorithms, concurrency: int = 2, folder_options: Optional[dict] = None,
+            cache: Optional[DigestCache] = None, read_options: Optional[ReadOptions] = None,
+            tracker: Optional[ProgressTracker] = None, cancel_event: Optional[threading.Event] = None,
+            on_update: Optional[JobCallback] = None) -> QueueReport:
+        """
+        运行队列中的任务，直到没有等待中的任务
+
+        :param algorithms: 算法名或多个算法名
+        :param concurrency: 同时运行的任务数
+        :param folder_options: 文件夹任务传给 compute_folder_hash 的参数 (mode、workers 等)
+        :param cache: 摘要缓存
+        :param read_options: 读取策略和块大小
+        :param tracker: 所有任务共用的进度汇总
+        :param cancel_event: 被设置时取消运行中的任务，这些任务和等待中的任务都保留在队列中
+        :param on_update: 任务状态变化时调用 (在工作线程中)
+        :return: QueueReport
+        :raises HashCancelled: 运行被取消
+        """
+        algorithms = hash_engine.normalize_algorithms(algorithms)
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+        start_time = time.perf_counter()
+        done = failed = total_size = 0
+        running = {}
+
+        def notify(job):
+            if on_update:
+                on_update(job)
+
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="hash-job") as executor:
+            while True:
+                if cancel_event is None or not cancel_event.is_set():
+                    while len(running) < concurrency:
+                        job = self._take()
+                        if job is None:
+                            break
+                        attempt = AttemptTracker(tracker) if tracker is not None else None
+                        running[executor.submit(self._run_job, job, algorithms, folder_options or {}, cache,
+                                                read_options, attempt, cancel_event)] = job, attempt
+                        notify(job)
+                if not running:
+                    break
+                finished, _ = wait(running, timeout=SCHEDULE_INTERVAL, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job, attempt = running.pop(future)
+                    if attempt is not None and future.exception() is not None:
+                        # 失败或被取消的尝试不计入队列的进度，重试时重新计入
+                        attempt.rollback()
+                    try:
+                        job.result = future.result()
+                    except HashCancelled:
+                        # 被取消的任务放回队列，下次运行时重新开始
+                        with self._lock:
+                            job.status = JOB_PENDING
+                            job.attempts -= 1
+                            self._push(job)
+                    except Exception as e:
+                        job.error = e
+                        if self._should_retry(job, e):
+                            with self._lock:
+                                job.status = JOB_PENDING
+                                self._push(job)
+                        else:
+                            self._finish(job, JOB_FAILED)
+                            failed += 1
+                    else:
+                        job.error = None
+                        self._finish(job, JOB_DONE)
+                        done += 1
+                        total_size += job.result.total_size if job.kind == "folder" else job.result.size
+                    notify(job)
+        if tracker is not None:
+            tracker.finish()
+        hash_engine.check_cancel(cancel_event)
+        return QueueReport(done, failed, self.counts()[JOB_PENDING], total_size, time.perf_counter() - start_time)
+
+    def _push(self, job: Job) -> None:
+        heapq.heappush(self._heap, (-job.priority, next(self._seq), job))
+
+    def _take(self) -> Optional[Job]:
+        """取出优先级最高的等待中任务并标记为运行中；调整过优先级的任务在堆中有多个条目，只取第一个"""
+        with self._lock:
+            while self._heap:
+                priority, _, job = heapq.heappop(self._heap)
+                if job.status == JOB_PENDING and -priority == job.priority:
+                    job.status = JOB_RUNNING
+                    job.attempts += 1
+                    return job
+        return None
+
+    def _finish(self, job: Job, status: str) -> None:
+        with self._lock:
+            job.status = status
+
+    def _should_retry(self, job: Job, error: Exception) -> bool:
+        """只重试可能是暂时性的读取错误"""
+        if not isinstance(error, OSError) or error.errno in _PERMANENT_ERRNOS:
+            return False
+        return job.attempts <= self.retries
+
+    @staticmethod
+    def _run_job(job, algorithms, folder_options, cache, read_options, tracker, cancel_event):
+        if job.kind == "folder":
+            return hash_engine.compute_folder_hash(job.path, algorithms, None, cancel_event, cache=cache,
+                                                   read_options=read_options, tracker=tracker, **folder_options)
+        if tracker is None:
+            return hash_engine.compute_file_hash(job.path, algorithms, None, cancel_event, cache, read_options)
+        try:
+            tracker.add_total(1, os.path.getsize(job.path))
+        except OSError:
+            tracker.add_total(1, 0)
+        result = hash_engine.compute_file_hash(job.path, algorithms, tracker.file_reporter(), cancel_event, cache,
+                                               read_options)
+        # 命中缓存的文件没有读取进度
+        tracker.file_done(os.path.basename(job.path), result.size if result.cached else 0)
+        return result
@@ -0,0 +1,475 @@
+"""
+校验清单
+
+生成与 sha256sum / md5sum 兼容的逐文件校验清单 ("摘要  相对路径")，
+多个算法时使用 BSD 标签格式，扩展名为 .sfv 时生成 SFV (CRC32) 格式。
+清单开头的注释行记录算法和生成时间，sha256sum -c 会忽略这些行。
+
+按清单校验时先 stat 每个列出的文件：缺失的文件直接报告，快速模式下
+修改时间和状态改变时间都早于清单生成时间的文件视为未变化而跳过，
+其余文件并行计算摘要，最后扫描目录找出清单中没有的多余文件。
+"""
+import errno
+import os
+import re
+import stat
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import hash_engine
+from digest_cache import DigestCache
+from file_reader import ReadOptions
+from scanner import BackgroundScan, FileEntry, TraversalSpec, scan_folder
+
+MANIFEST_VERSION = 1
+
+# 按扩展名推断算法
+EXTENSION_ALGORITHMS = {
+    ".md5": "md5",
+    ".sha1": "sha1",
+    ".sha224": "sha224",
+    ".sha256": "sha256",
+    ".sha384": "sha384",
+    ".sha512": "sha512",
+    ".b2": "blake2b",
+    ".sfv": "crc32",
+}
+
+# 按摘要长度 (十六进制字符数) 推断算法
+DIGEST_LENGTH_ALGORITHMS = {
+    8: "crc32",
+    32: "md5",
+    40: "sha1",
+    56: "sha224",
+    64: "sha256",
+    96: "sha384",
+    128: "sha512",
+}
+
+# 快速校验时，修改时间距清单生成时间小于该值的文件仍重新计算：
+# 同一时间戳内文件可能在清单生成后又被修改
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+# 校验结果状态
+STATUS_OK = "ok"
+STATUS_SKIPPED = "skipped"
+STATUS_MISSING = "missing"
+STATUS_EXTRA = "extra"
+STATUS_CORRUPTED = "corrupted"
+STATUS_ERROR = "error"
+
+_BSD_LINE = re.compile(r"^(\\?)([A-Za-z0-9_-]+) \((.*)\) = ([0-9A-Fa-f]+)$")
+_GNU_LINE = re.compile(r"^(\\?)([0-9A-Fa-f]+) [ *](.*)$")
+_SFV_LINE = re.compile(r"^(.*) ([0-9A-Fa-f]{8})$")
+_HEADER_LINE = re.compile(r"^#\s*([a-z_]+):\s*(.*)$")
+
+ResultCallback = Callable[[str, str, str], None]
+
+
+@dataclass
+class Manifest:
+    """
+    校验清单
+
+    :param entries: {相对路径 ("/" 分隔): {算法名: 摘要}}，按相对路径排序
+    :param created_ns: 生成清单时开始扫描的时间 (time.time_ns())，未知时为 None
+    """
+    path: Optional[str]
+    algorithms: Tuple[str, ...]
+    entries: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    created_ns: Optional[int] = None
+    total_size: int = 0
+    elapsed: float = 0.0
+
+
+@dataclass
+class VerifyReport:
+    """按清单校验的结果，各列表中为相对路径"""
+    manifest_path: str
+    folder: str
+    ok: List[str] = field(default_factory=list)
+    skipped: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    extra: List[str] = field(default_factory=list)
+    corrupted: List[str] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0
+
+    @property
+    def matched(self) -> bool:
+        """目录与清单完全一致"""
+        return not (self.missing or self.extra or self.corrupted or self.errors)
+
+
+def escape_sum_path(path: str):
+    """
+    按 GNU coreutils 的规则转义路径
+
+    :return: (是否需要在行首加反斜杠, 转义后的路径)
+    """
+    if "\\" not in path and "\n" not in path and "\r" not in path:
+        return False, path
+    return True, path.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def unescape_sum_path(path: str) -> str:
+    """escape_sum_path 的逆操作"""
+    return re.sub(r"\\(.)", lambda m: {"n": "\n", "r": "\r"}.get(m.group(1), m.group(1)), path)
+
+
+def format_sum_lines(path: str, digests: Dict[str, str]) -> List[str]:
+    """
+    sha256sum 兼容的输出行
+
+    只有一个算法时使用 GNU 格式 "摘要  路径"，
+    多个算法时使用 BSD 标签格式 "SHA256 (路径) = 摘要"，每个算法一行。
+    """
+    escaped, display_path = escape_sum_path(path)
+    prefix = "\\" if escaped else ""
+    if len(digests) == 1:
+        digest = next(iter(digests.values()))
+        return ["{}{}  {}".format(prefix, digest, display_path)]
+    return ["{}{} ({}) = {}".format(prefix, algorithm.upper(), display_path, digest)
+            for algorithm, digest in digests.items()]
+
+
+def is_sfv_path(path: Optional[str]) -> bool:
+    return bool(path) and path.lower().endswith(".sfv")
+
+
+def default_algorithm(manifest_path: Optional[str]) -> Optional[str]:
+    """按清单文件扩展名推断的算法，无法推断时返回 None"""
+    if not manifest_path:
+        return None
+    name = os.path.basename(manifest_path).lower()
+    for extension, algorithm in EXTENSION_ALGORITHMS.items():
+        if name.endswith(extension) or name.endswith(extension + "sum") or name.endswith(extension + "sums"):
+            return algorithm
+    for extension, algorithm in EXTENSION_ALGORITHMS.items():
+        if name.startswith(extension[1:] + "sum"):
+            # SHA256SUMS、MD5SUMS 这样的文件名
+            return algorithm
+    return None
+
+
+def build_manifest(folder_path: str, algorithm: hash_engine.Algorithms = "sha256", workers: int = 1,
+                   pool: str = "thread", progress_callback: Optional[hash_engine.ProgressCallback] = None,
+                   cancel_event: Optional[threading.Event] = None, cache: Optional[DigestCache] = None,
+                   read_options: Optional[ReadOptions] = None, exclude: Sequence[str] = (),
+                   traversal: Optional[TraversalSpec] = None) -> Manifest:
+    """
+    计算文件夹中每个文件的摘要，生成清单
+
+    :param folder_path: 文件夹路径
+    :param algorithm: 算法名或算法名列表
+    :param workers: 并行工作数
+    :param pool: "thread" 或 "process"
+    :param progress_callback: 进度回调 (已处理文件数, 已发现文件数, 相对路径)
+    :param cancel_event: 被设置时中止计算
+    :param cache: 摘要缓存
+    :param read_options: 读取策略和块大小
+    :param exclude: 不列入清单的文件路径 (如清单文件本身)
+    :param traversal: 遍历规则 (见 scanner.TraversalSpec)，被排除的文件不列入清单
+    :return: Manifest
+    :raises NotADirectoryError: 路径不是文件夹
+    :raises OSError: 文件读取失败
+    :raises HashCancelled: 计算被取消
+    """
+    if not os.path.isdir(folder_path):
+        raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), folder_path)
+    algorithms = hash_engine.normalize_algorithms(algorithm)
+    excluded = {os.path.abspath(path) for path in exclude}
+    start_time = time.perf_counter()
+    # 在扫描之前取时间，之后修改的文件在快速校验时都会被重新计算
+    created_ns = time.time_ns()
+    entries = {}
+    total_size = 0
+
+    with BackgroundScan(folder_path, spec=traversal) as scan:
+        def record(entry, file_digests):
+            entries[_manifest_path(entry.rel_path)] = file_digests
+            if progress_callback:
+                progress_callback(len(entries), scan.files_found, entry.rel_path)
+
+        def entries_to_hash():
+            nonlocal total_size
+            for entry in scan:
+                if excluded and os.path.abspath(entry.path) in excluded:
+                    continue
+                total_size += entry.size
+                file_digests = hash_engine.cached_digests(cache, entry, algorithms)
+                if file_digests is None:
+                    yield entry
+                else:
+                    record(entry, file_digests)
+
+        for entry, file_digests, error in hash_engine.iter_file_digests(
+                entries_to_hash(), algorithms, workers, pool, cancel_event=cancel_event, read_options=read_options):
+            if error is not None:
+                raise error
+            hash_engine.store_digests(cache, entry, file_digests)
+            record(entry, file_digests)
+    if cache is not None:
+        cache.flush()
+
+    sorted_entries = {rel_path: entries[rel_path] for rel_path in sorted(entries)}
+    return Manifest(None, algorithms, sorted_entries, created_ns, total_size, time.perf_counter() - start_time)
+
+
+def _manifest_path(rel_path: str) -> str:
+    """清单中的相对路径统一使用 "/" 分隔"""
+    return rel_path.replace(os.sep, "/")
+
+
+def format_manifest(manifest: Manifest, sfv: bool = False) -> Iterator[str]:
+    """
+    产出清单文件的各行 (不含换行符)
+
+    :param sfv: 生成 SFV 格式，此时算法必须为 crc32
+    :raises ValueError: SFV 格式但算法不是 crc32
+    """
+    if sfv:
+        if manifest.algorithms != ("crc32",):
+            raise ValueError("SFV manifests require the crc32 algorithm")
+        comment = ";"
+    else:
+        comment = "#"
+    yield "{} file-hash manifest v{}".format(comment, MANIFEST_VERSION)
+    yield "{} algorithm: {}".format(comment, ",".join(manifest.algorithms))
+    if manifest.created_ns is not None:
+        yield "{} created: {}".format(comment, time.strftime("%Y-%m-%dT%H:%M:%S%z",
+                                                              time.localtime(manifest.created_ns / 1e9)))
+        yield "{} created_ns: {}".format(comment, manifest.created_ns)
+    yield "{} files: {}".format(comment, len(manifest.entries))
+
+    for rel_path, digests in manifest.entries.items():
+        if sfv:
+            yield "{} {}".format(rel_path, digests["crc32"].upper())
+        else:
+            yield from format_sum_lines(rel_path, {name: digests[name] for name in manifest.algorithms})
+
+
+def save_manifest(manifest: Manifest, manifest_path: str, sfv: Optional[bool] = None) -> None:
+    """
+    写入清单文件，先写临时文件再替换，中途失败不会留下不完整的清单
+
+    :param sfv: 是否使用 SFV 格式，None 表示按扩展名决定
+    """
+    if sfv is None:
+        sfv = is_sfv_path(manifest_path)
+    lines = list(format_manifest(manifest, sfv))
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8", errors="surrogateescape", newline="\n") as f:
+        for line in lines:
+            f.write(line + "\n")
+    os.replace(temp_path, manifest_path)
+    manifest.path = manifest_path
+
+
+def create_manifest(folder_path: str, manifest_path: str, algorithm: Optional[hash_engine.Algorithms] = None,
+                    **kwargs) -> Manifest:
+    """
+    为文件夹生成清单并保存，清单文件本身不会被列入
+
+    :param algorithm: 算法，None 表示按清单扩展名推断 (默认 sha256)
+    :param kwargs: 传给 build_manifest 的其他参数
+    """
+    if algorithm is None:
+        algorithm = default_algorithm(manifest_path) or "sha256"
+    exclude = (manifest_path, manifest_path + ".tmp")
+    manifest = build_manifest(folder_path, algorithm, exclude=exclude, **kwargs)
+    save_manifest(manifest, manifest_path)
+    return manifest
+
+
+def parse_manifest(lines, manifest_path: Optional[str] = None) -> Manifest:
+    """
+    解析清单内容，支持 GNU、BSD 标签和 SFV 格式
+
+    没有算法注释时按扩展名或摘要长度推断算法。
+
+    :param lines: 清单文件的各行
+    :param manifest_path: 清单文件路径，用于推断算法
+    :raises ValueError: 无法解析的行或无法确定算法
+    """
+    sfv = is_sfv_path(manifest_path)
+    header = {}
+    entries = {}
+    algorithms = []
+    for line_number, line in enumerate(lines, 1):
+        line = line.rstrip("\r\n")
+        if not line.strip():
+            continue
+        if line.startswith("#") or (sfv and line.startswith(";")):
+            match = _HEADER_LINE.match("#" + line[1:])
+            if match:
+                header[match.group(1)] = match.group(2).strip()
+            continue
+
+        if sfv:
+            match = _SFV_LINE.match(line)
+            if not match:
+                raise ValueError("{}: line {}: invalid SFV line".format(manifest_path, line_number))
+            rel_path, name, digest = match.group(1).replace("\\", "/"), "crc32", match.group(2)
+        else:
+            match = _BSD_LINE.match(line)
+            if match:
+                escaped, name, rel_path, digest = match.groups()
+                name = name.lower()
+            else:
+                match = _GNU_LINE.match(line)
+                if not match:
+                    raise ValueError("{}: line {}: improperly formatted checksum line".format(
+                        manifest_path, line_number))
+                escaped, digest, rel_path = match.groups()
+                name = None
+            if escaped:
+                rel_path = unescape_sum_path(rel_path)
+
+        if name is None:
+            name = _guess_algorithm(header, manifest_path, digest)
+        if name not in algorithms:
+            algorithms.append(name)
+        entries.setdefault(rel_path, {})[name] = digest.lower()
+
+    created_ns = int(header["created_ns"]) if header.get("created_ns", "").isdigit() else None
+    algorithms = hash_engine.normalize_algorithms(algorithms) if algorithms else ()
+    return Manifest(manifest_path, algorithms, entries, created_ns)
+
+
+def _guess_algorithm(header, manifest_path, digest):
+    """GNU 格式的行本身不带算法名：依次参考注释、扩展名和摘要长度"""
+    declared = header.get("algorithm", "")
+    if declared and "," not in declared:
+        return declared.lower()
+    name = default_algorithm(manifest_path) or DIGEST_LENGTH_ALGORITHMS.get(len(digest))
+    if name is None:
+        raise ValueError("{}: cannot determine the algorithm of a {}-digit digest".format(
+            manifest_path, len(digest)))
+    return name
+
+
+def read_manifest(manifest_path: str) -> Manifest:
+    """读取并解析清单文件"""
+    with open(manifest_path, "r", encoding="utf-8", errors="surrogateescape") as f:
+        return parse_manifest(f, manifest_path)
+
+
+def verify_manifest(manifest_path: str, folder_path: Optional[str] = None, workers: int = 1, pool: str = "thread",
+                    fast: bool = False, check_extra: bool = True, cache: Optional[DigestCache] = None,
+                    read_options: Optional[ReadOptions] = None,
+                    progress_callback: Optional[hash_engine.ProgressCallback] = None,
+                    result_callback: Optional[ResultCallback] = None,
+                    cancel_event: Optional[threading.Event] = None,
+                    traversal: Optional[TraversalSpec] = None) -> VerifyReport:
+    """
+    按清单校验文件夹
+
+    :param manifest_path: 清单文件路径
+    :param folder_path: 清单中相对路径的基准目录，默认为清单所在目录
+    :param workers: 并行工作数
+    :param pool: "thread" 或 "process"
+    :param fast: 跳过修改时间和状态改变时间都早于清单生成时间的文件 (需要清单带有 created_ns)
+    :param check_extra: 扫描目录，报告清单中没有的文件
+    :param cache: 摘要缓存，命中时不读取文件内容
+    :param read_options: 读取策略和块大小
+    :param progress_callback: 进度回调 (已校验文件数, 清单文件数, 相对路径)
+    :param result_callback: 每个文件得出结果时调用 (状态, 相对路径, 说明)
+    :param cancel_event: 被设置时中止校验
+    :param traversal: 查找多余文件时的遍历规则，应与生成清单时相同 (见 scanner.TraversalSpec)
+    :return: VerifyReport
+    :raises ValueError: 清单无法解析
+    :raises HashCancelled: 校验被取消
+    """
+    start_time = time.perf_counter()
+    manifest = read_manifest(manifest_path)
+    if folder_path is None:
+        folder_path = os.path.dirname(os.path.abspath(manifest_path))
+    report = VerifyReport(manifest_path, folder_path)
+    total = len(manifest.entries)
+    done = 0
+    lists = {
+        STATUS_OK: report.ok,
+        STATUS_SKIPPED: report.skipped,
+        STATUS_MISSING: report.missing,
+        STATUS_EXTRA: report.extra,
+        STATUS_CORRUPTED: report.corrupted,
+    }
+
+    def finish(status, rel_path, detail=""):
+        nonlocal done
+        if status == STATUS_ERROR:
+            report.errors[rel_path] = detail
+        else:
+            lists[status].append(rel_path)
+        if status != STATUS_EXTRA:
+            done += 1
+            if progress_callback:
+                progress_callback(done, total, rel_path)
+        if result_callback:
+            result_callback(status, rel_path, detail)
+
+    def compare(rel_path, file_digests):
+        expected = manifest.entries[rel_path]
+        if all(file_digests[name] == digest for name, digest in expected.items()):
+            finish(STATUS_OK, rel_path)
+        else:
+            finish(STATUS_CORRUPTED, rel_path)
+
+    # 先 stat 所有文件：缺失和未变化的文件无需读取内容
+    unchanged_before = manifest.created_ns - RACY_WINDOW_NS if fast and manifest.created_ns else None
+    to_hash = []
+    for rel_path, expected in manifest.entries.items():
+        hash_engine.check_cancel(cancel_event)
+        path = os.path.join(folder_path, *rel_path.split("/"))
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            finish(STATUS_MISSING, rel_path)
+            continue
+        except OSError as e:
+            finish(STATUS_ERROR, rel_path, e.strerror or str(e))
+            continue
+        if not stat.S_ISREG(st.st_mode):
+            finish(STATUS_ERROR, rel_path, "not a regular file")
+            continue
+        if unchanged_before is not None and max(st.st_mtime_ns, st.st_ctime_ns) < unchanged_before:
+            finish(STATUS_SKIPPED, rel_path)
+            continue
+        entry = FileEntry(path, rel_path, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+        file_digests = hash_engine.cached_digests(cache, entry, tuple(expected))
+        if file_digests is None:
+            to_hash.append(entry)
+        else:
+            compare(rel_path, file_digests)
+
+    # 每个文件只计算清单中为它列出的算法
+    by_algorithms = {}
+    for entry in to_hash:
+        by_algorithms.setdefault(tuple(manifest.entries[entry.rel_path]), []).append(entry)
+    for algorithms, entries in by_algorithms.items():
+        for entry, file_digests, error in hash_engine.iter_file_digests(
+                entries, algorithms, workers, pool, cancel_event=cancel_event, read_options=read_options):
+            if error is not None:
+                finish(STATUS_ERROR, entry.rel_path, error.strerror or str(error))
+                continue
+            hash_engine.store_digests(cache, entry, file_digests)
+            compare(entry.rel_path, file_digests)
+    if cache is not None:
+        cache.flush()
+
+    if check_extra:
+        manifest_abspath = os.path.abspath(manifest_path)
+        for entry in scan_folder(folder_path, spec=traversal):
+            hash_engine.check_cancel(cancel_event)
+            rel_path = _manifest_path(entry.rel_path)
+            if rel_path not in manifest.entries and os.path.abspath(entry.path) != manifest_abspath:
+                finish(STATUS_EXTRA, rel_path)
+
+    # 并行计算时按完成顺序记录，最后统一排序
+    for paths in lists.values():
+        paths.sort()
+    report.elapsed = time.perf_counter() - start_time
+    return report
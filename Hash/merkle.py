@@ -0,0 +1,248 @@
+"""
+Merkle 文件夹摘要
+
+每个目录的节点哈希由其直接子项按名称 (字节序) 排序后的记录依次写入得到：
+    文件  b"f " + 名称 + b"\\0" + 文件内容摘要 (十六进制) + b"\\n"
+    目录  b"d " + 名称 + b"\\0" + 子目录节点哈希 (十六进制) + b"\\n"
+名称为 os.fsencode 编码的单个路径组成部分，根目录的节点哈希即文件夹摘要。
+与其他模式一样，不含文件的目录不参与计算。
+
+修改一个文件只会改变从它到根目录路径上的节点哈希。配合 DigestCache 时，
+每个目录节点还会与一个元数据指纹一起保存 (直接子文件的名称、大小、mtime_ns、inode
+以及子目录的指纹)：指纹未变化的子树直接复用保存的节点哈希，既不读取其中的文件，
+也不逐个查询文件缓存；只有元数据变化的路径需要重新计算。
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import hash_engine
+from checkpoint import FolderCheckpoint
+from digest_cache import RACY_WINDOW_SECONDS, DigestCache
+from file_reader import ReadOptions
+from progress import ProgressTracker
+from scanner import BackgroundScan, FileEntry, TraversalSpec
+
+
+def merkle_record(kind: bytes, name: str, digest: str) -> bytes:
+    """
+    目录节点中一个子项的记录
+
+    :param kind: b"f" 表示文件，b"d" 表示目录
+    :param name: 子项名称 (不含路径分隔符)
+    :param digest: 文件摘要或子目录节点哈希 (十六进制)
+    """
+    return kind + b" " + os.fsencode(name) + b"\0" + digest.encode("ascii") + b"\n"
+
+
+class _DirNode:
+    """扫描得到的目录节点"""
+
+    def __init__(self, rel_path: str):
+        self.rel_path = rel_path
+        self.files: List[FileEntry] = []
+        self.subdirs: Dict[str, "_DirNode"] = {}
+        self.fingerprint = ""
+        # 子树中有处于 racy 窗口内的文件时不保存节点哈希
+        self.racy = False
+        self.digests: Optional[Dict[str, str]] = None
+
+    def child(self, name: str) -> "_DirNode":
+        node = self.subdirs.get(name)
+        if node is None:
+            node = _DirNode(os.path.join(self.rel_path, name) if self.rel_path else name)
+            self.subdirs[name] = node
+        return node
+
+    def walk(self):
+        """先序遍历子树中的所有节点"""
+        yield self
+        for node in self.subdirs.values():
+            yield from node.walk()
+
+
+def _add_entry(root: _DirNode, entry: FileEntry) -> None:
+    node = root
+    parent = os.path.dirname(entry.rel_path)
+    if parent:
+        for name in parent.split(os.sep):
+            node = node.child(name)
+    node.files.append(entry)
+
+
+def _fingerprint(node: _DirNode, racy_after_ns: int) -> str:
+    """自底向上计算目录的元数据指纹"""
+    fingerprint = hashlib.sha256()
+    records = []
+    for entry in node.files:
+        name = os.fsencode(os.path.basename(entry.rel_path))
+        records.append((name, b"f %d %d %d" % (entry.size, entry.mtime_ns, entry.inode)))
+        if entry.mtime_ns >= racy_after_ns:
+            node.racy = True
+    for name, subdir in node.subdirs.items():
+        records.append((os.fsencode(name), b"d " + _fingerprint(subdir, racy_after_ns).encode("ascii")))
+        node.racy = node.racy or subdir.racy
+    for name, record in sorted(records):
+        fingerprint.update(name + b"\0" + record + b"\n")
+    node.fingerprint = fingerprint.hexdigest()
+    return node.fingerprint
+
+
+def _cached_node(cache: DigestCache, folder_path: str, node: _DirNode,
+                 algorithms: Sequence[str]) -> Optional[Dict[str, str]]:
+    digests = {}
+    path = os.path.join(folder_path, node.rel_path)
+    for name in algorithms:
+        digest = cache.get_node(path, name, node.fingerprint)
+        if digest is None:
+            return None
+        digests[name] = digest
+    return digests
+
+
+def _node_digests(node: _DirNode, algorithms: Sequence[str], file_digests: Dict[str, Dict[str, str]],
+                  cache: Optional[DigestCache], folder_path: str) -> Dict[str, str]:
+    """自底向上计算节点哈希，跳过已从缓存得到的子树"""
+    if node.digests is not None:
+        return node.digests
+    records = []
+    for entry in node.files:
+        name = os.path.basename(entry.rel_path)
+        records.append((os.fsencode(name), b"f", name, file_digests[entry.rel_path]))
+    for name, subdir in node.subdirs.items():
+        records.append((os.fsencode(name), b"d", name,
+                        _node_digests(subdir, algorithms, file_digests, cache, folder_path)))
+    records.sort()
+
+    node.digests = {}
+    for algorithm in algorithms:
+        hash_obj = hash_engine.new_hash(algorithm)
+        for _, kind, name, digests in records:
+            hash_obj.update(merkle_record(kind, name, digests[algorithm]))
+        node.digests[algorithm] = hash_obj.hexdigest()
+        if cache is not None and not node.racy:
+            cache.put_node(os.path.join(folder_path, node.rel_path), algorithm, node.fingerprint,
+                           node.digests[algorithm])
+    return node.digests
+
+
+def compute_folder_merkle(folder_path: str, algorithms: Sequence[str],
+                          progress_callback: Optional[hash_engine.ProgressCallback] = None,
+                          cancel_event: Optional[threading.Event] = None, workers: int = 1, pool: str = "thread",
+                          queue_depth: Optional[int] = None, cache: Optional[DigestCache] = None,
+                          read_options: Optional[ReadOptions] = None,
+                          checkpoint: Optional[FolderCheckpoint] = None,
+                          tracker: Optional[ProgressTracker] = None,
+                          traversal: Optional[TraversalSpec] = None) -> hash_engine.FolderHashResult:
+    """
+    merkle 模式的文件夹摘要，参数与 compute_folder_hash 相同 (checkpoint 为已打开的检查点)
+
+    没有缓存时边扫描边并行计算文件摘要；有缓存时先完成扫描并计算目录指纹，
+    从根目录向下查找可复用的节点，只计算剩余的文件。检查点中已完成的文件不再读取。
+    """
+    start_time = time.perf_counter()
+    root = _DirNode("")
+    file_digests = {}
+    total_files = 0
+    total_size = 0
+    cached_files = 0
+    processed = 0
+    bytes_callback = tracker.add_bytes if tracker is not None else None
+    # 在其他进程中读取的文件没有逐块进度，完成时一次计入
+    hashed_unread = not hash_engine.reads_in_process(workers, pool)
+
+    def skipped(entry):
+        """未读取内容的文件 (来自检查点或缓存) 计入字节进度"""
+        if tracker is not None:
+            tracker.file_done(entry.rel_path, entry.size)
+
+    def resumed(entry):
+        """检查点中已完成的文件直接记录，返回是否命中"""
+        digests = checkpoint.lookup(entry) if checkpoint is not None else None
+        if digests is not None:
+            file_digests[entry.rel_path] = digests
+            skipped(entry)
+        return digests is not None
+
+    def record(entry, digests, total):
+        nonlocal processed
+        if checkpoint is not None:
+            checkpoint.add(entry, digests)
+        file_digests[entry.rel_path] = digests
+        processed += 1
+        if progress_callback:
+            progress_callback(processed, total, entry.rel_path)
+        if tracker is not None:
+            tracker.file_done(entry.rel_path, entry.size if hashed_unread else 0)
+
+    if cache is None:
+        with BackgroundScan(folder_path, tracker, traversal) as scan:
+            def entries_to_hash():
+                nonlocal total_files, total_size, processed
+                for entry in scan:
+                    _add_entry(root, entry)
+                    total_files += 1
+                    total_size += entry.size
+                    if resumed(entry):
+                        processed += 1
+                    else:
+                        yield entry
+
+            for entry, digests, error in hash_engine.iter_file_digests(
+                    entries_to_hash(), algorithms, workers, pool, queue_depth, cancel_event, read_options,
+                    bytes_callback):
+                if error is not None:
+                    raise error
+                record(entry, digests, scan.files_found)
+    else:
+        with BackgroundScan(folder_path, tracker, traversal) as scan:
+            for entry in scan:
+                hash_engine.check_cancel(cancel_event)
+                _add_entry(root, entry)
+                total_files += 1
+                total_size += entry.size
+        _fingerprint(root, time.time_ns() - RACY_WINDOW_SECONDS * 10 ** 9)
+
+        # 从根目录向下：指纹未变的子树整体复用，其余目录的文件逐个查询文件缓存
+        to_hash = []
+        pending = [root]
+        while pending:
+            node = pending.pop()
+            node.digests = _cached_node(cache, folder_path, node, algorithms)
+            if node.digests is not None:
+                for reused in node.walk():
+                    cached_files += len(reused.files)
+                    for entry in reused.files:
+                        skipped(entry)
+                continue
+            for entry in node.files:
+                if resumed(entry):
+                    continue
+                digests = hash_engine.cached_digests(cache, entry, algorithms)
+                if digests is None:
+                    to_hash.append(entry)
+                else:
+                    file_digests[entry.rel_path] = digests
+                    cached_files += 1
+                    skipped(entry)
+            pending.extend(node.subdirs.values())
+        processed = cached_files + (checkpoint.resumed if checkpoint is not None else 0)
+
+        for entry, digests, error in hash_engine.iter_file_digests(
+                to_hash, algorithms, workers, pool, queue_depth, cancel_event, read_options, bytes_callback):
+            if error is not None:
+                raise error
+            hash_engine.store_digests(cache, entry, digests)
+            record(entry, digests, total_files)
+
+    folder_digests = _node_digests(root, algorithms, file_digests, cache, folder_path)
+    if cache is not None:
+        cache.flush()
+    if tracker is not None:
+        tracker.finish()
+    elapsed = time.perf_counter() - start_time
+    return hash_engine.FolderHashResult(folder_path, algorithms[0], folder_digests[algorithms[0]], total_files,
+                                        total_size, elapsed, "merkle", cached_files, folder_digests,
+                                        checkpoint.resumed if checkpoint is not None else 0)
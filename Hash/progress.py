@@ -0,0 +1,262 @@
+"""
+进度汇总
+
+按字节统计进度：单个大文件也能平滑推进，不会停在某个文件数上。
+ProgressTracker 可以在扫描线程、工作线程中同时更新，最多每 interval 秒调用一次回调，
+期间的更新合并为一个 ProgressSnapshot，界面刷新的次数与文件数无关。
+"""
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+# 默认的最短报告间隔 (秒)，即最多约 10 次/秒
+DEFAULT_INTERVAL = 0.1
+
+# 吞吐量指数平滑的时间常数 (秒)：越大越平稳，越小越快反映速度变化
+RATE_TIME_CONSTANT = 3.0
+
+
+@dataclass(frozen=True)
+class ProgressSnapshot:
+    """
+    某一时刻的进度
+
+    :param scanning: 仍在扫描，总数还会增加
+    :param rate: 平滑后的吞吐量 (字节/秒)
+    :param current: 最近完成的文件
+    """
+    files_done: int
+    files_total: int
+    bytes_done: int
+    bytes_total: int
+    elapsed: float
+    rate: float
+    scanning: bool
+    current: str = ""
+
+    @property
+    def fraction(self) -> float:
+        """完成比例 (0~1)，按字节计算；总字节数为 0 时按文件数计算"""
+        if self.bytes_total:
+            return min(1.0, self.bytes_done / self.bytes_total)
+        if self.files_total:
+            return min(1.0, self.files_done / self.files_total)
+        return 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """预计剩余秒数，仍在扫描或还没有吞吐量数据时为 None"""
+        if self.scanning or self.rate <= 0:
+            return None
+        return max(0, self.bytes_total - self.bytes_done) / self.rate
+
+
+ProgressHandler = Callable[[ProgressSnapshot], None]
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    """把秒数格式化为 h:mm:ss 或 m:ss，None 时返回 "--:--" """
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds + 0.5)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return "{}:{:02d}:{:02d}".format(hours, minutes, seconds)
+    return "{}:{:02d}".format(minutes, seconds)
+
+
+class ProgressTracker:
+    """
+    线程安全的进度累加器
+
+    扫描方调用 begin_scan / add_total / end_scan 增加总数，
+    读取方调用 add_bytes 报告读取的字节，每个文件结束时调用 file_done。
+    回调在调用更新方法的线程中执行，应尽快返回 (如放入队列)。
+
+    :param callback: 接收 ProgressSnapshot 的回调
+    :param interval: 两次回调之间的最短间隔 (秒)
+    """
+
+    def __init__(self, callback: ProgressHandler, interval: float = DEFAULT_INTERVAL):
+        self.callback = callback
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._last_emit = float("-inf")
+        self._last_bytes = 0
+        self._last_time = self._start
+        self._rate = 0.0
+        self._scans = 0
+        self.files_done = 0
+        self.files_total = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.current = ""
+
+    def begin_scan(self) -> None:
+        """开始一次扫描，扫描结束前 ETA 不可用"""
+        with self._lock:
+            self._scans += 1
+
+    def end_scan(self) -> None:
+        with self._lock:
+            self._scans -= 1
+
+    def add_total(self, files: int, size: int) -> None:
+        """扫描发现了新的文件"""
+        with self._lock:
+            self.files_total += files
+            self.bytes_total += size
+
+    def add_bytes(self, length: int) -> None:
+        """读取了 length 字节 (可在多个工作线程中调用)"""
+        with self._lock:
+            self.bytes_done += length
+        self._maybe_emit()
+
+    def file_done(self, name: str, unread: int = 0) -> None:
+        """
+        一个文件处理完毕
+
+        :param name: 文件名或相对路径
+        :param unread: 未通过 add_bytes 报告的字节数 (如命中缓存或在进程池中读取的文件)
+        """
+        with self._lock:
+            self.files_done += 1
+            self.bytes_done += unread
+            self.current = name
+        self._maybe_emit()
+
+    def retract(self, files_done: int, files_total: int, bytes_done: int, bytes_total: int,
+                scans: int = 0) -> None:
+        """撤销之前报告的数量 (失败后将重试的操作)，scans 为其中尚未结束的扫描数"""
+        with self._lock:
+            self._scans -= scans
+            self.files_done -= files_done
+            self.files_total -= files_total
+            self.bytes_done -= bytes_done
+            self.bytes_total -= bytes_total
+            # 吞吐量按字节增量计算，撤销的字节不能变成负的速度
+            self._last_bytes = min(self._last_bytes, self.bytes_done)
+
+    def file_reporter(self) -> Callable[[int, int], None]:
+        """
+        把 compute_file_hash 的进度回调 (已读取字节数, 文件总字节数) 转换为 add_bytes，
+        每个文件使用一个新的回调；文件的总数由调用方通过 add_total 加入
+        """
+        reported = 0
+
+        def report(bytes_read, _file_size):
+            nonlocal reported
+            self.add_bytes(bytes_read - reported)
+            reported = bytes_read
+        return report
+
+    def finish(self) -> None:
+        """立即报告最终进度"""
+        self._maybe_emit(force=True)
+
+    def snapshot(self) -> ProgressSnapshot:
+        with self._lock:
+            return self._snapshot(time.monotonic())
+
+    def _snapshot(self, now: float) -> ProgressSnapshot:
+        return ProgressSnapshot(self.files_done, self.files_total, self.bytes_done, self.bytes_total,
+                                now - self._start, self._rate, self._scans > 0, self.current)
+
+    def _maybe_emit(self, force: bool = False) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._last_emit < self.interval:
+                return
+            self._update_rate(now)
+            self._last_emit = now
+            snapshot = self._snapshot(now)
+        self.callback(snapshot)
+
+    def _update_rate(self, now: float) -> None:
+        """按距上次报告的时间加权更新平滑吞吐量"""
+        dt = now - self._last_time
+        if dt <= 0:
+            return
+        instant = (self.bytes_done - self._last_bytes) / dt
+        if self._rate == 0.0:
+            self._rate = instant
+        else:
+            weight = min(1.0, dt / RATE_TIME_CONSTANT)
+            self._rate += (instant - self._rate) * weight
+        self._last_bytes = self.bytes_done
+        self._last_time = now
+
+
+class AttemptTracker:
+    """
+    一次可能失败后重试的操作 (如批量任务的一次尝试) 使用的进度：
+    更新转发给共用的 ProgressTracker，同时记录本次加入的数量，失败时用 rollback 撤销，
+    重试不会重复计入总数和已完成的字节
+
+    :param parent: 共用的 ProgressTracker
+    """
+
+    def __init__(self, parent: ProgressTracker):
+        self.parent = parent
+        self._lock = threading.Lock()
+        self._closed = False
+        self._scans = 0
+        self.files_done = 0
+        self.files_total = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+
+    def begin_scan(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._scans += 1
+        self.parent.begin_scan()
+
+    def end_scan(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._scans -= 1
+        self.parent.end_scan()
+
+    def add_total(self, files: int, size: int) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.files_total += files
+            self.bytes_total += size
+        self.parent.add_total(files, size)
+
+    def add_bytes(self, length: int) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.bytes_done += length
+        self.parent.add_bytes(length)
+
+    def file_done(self, name: str, unread: int = 0) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self.files_done += 1
+            self.bytes_done += unread
+        self.parent.file_done(name, unread)
+
+    file_reporter = ProgressTracker.file_reporter
+
+    def finish(self) -> None:
+        self.parent.finish()
+
+    def rollback(self) -> None:
+        """从共用的进度中减去本次加入的所有数量，之后的更新被忽略"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            scans = self._scans
+        self.parent.retract(self.files_done, self.files_total, self.bytes_done, self.bytes_total, scans)
@@ -0,0 +1,293 @@
+"""
+结构化结果导出
+
+把逐文件结果和汇总结果边计算边写入 JSON Lines、CSV 或 SQLite 文件，供其他工具读取，
+不必解析界面上的本地化文本。写入按批进行，内存占用与结果数量无关。
+命令行 (--export) 和图形界面使用相同的记录格式和写入器。
+
+每条记录是一个 dict，与 cli.py --format json 输出的 JSON 行相同。
+CSV 和 SQLite 使用固定的列 (RESULT_COLUMNS)：
+常用字段各占一列，error/reason 合并为 detail 列，其余字段以 JSON 写入 extra 列。
+
+文件名不一定是有效的 UTF-8 (Python 以代理字符表示无法解码的字节)：
+JSON 使用默认的 ASCII 转义 (与 checkpoint.py 相同)，CSV 按 surrogateescape 写回原始字节，
+SQLite 中这样的值以 BLOB (原始字节) 保存。
+"""
+import abc
+import csv
+import json
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+SINK_FORMATS = ("jsonl", "csv", "sqlite")
+
+# 累积到该数量的记录时写入一次
+BATCH_SIZE = 1000
+
+RESULT_COLUMNS = ("path", "type", "status", "size", "algorithm", "digest", "detail", "elapsed", "extra")
+
+# 按扩展名推断格式
+_EXTENSIONS = {
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+    ".json": "jsonl",
+    ".csv": "csv",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+    ".sqlite3": "sqlite",
+}
+
+_SCHEMA = """
+DROP TABLE IF EXISTS results;
+CREATE TABLE results (
+    seq INTEGER PRIMARY KEY,
+    path TEXT,
+    type TEXT,
+    status TEXT,
+    size INTEGER,
+    algorithm TEXT,
+    digest TEXT,
+    detail TEXT,
+    elapsed REAL,
+    extra TEXT
+);
+"""
+
+
+def file_record(result) -> dict:
+    """单个文件的结果 (FileHashResult)"""
+    return {
+        "path": result.path,
+        "size": result.size,
+        "algorithm": result.algorithm,
+        "digest": result.digest,
+        "digests": result.digests,
+        "elapsed": round(result.elapsed, 6),
+        "cached": result.cached,
+    }
+
+
+def folder_record(result) -> dict:
+    """文件夹摘要的结果 (FolderHashResult)"""
+    return {
+        "path": result.path,
+        "type": "folder",
+        "mode": result.mode,
+        "files": result.total_files,
+        "size": result.total_size,
+        "algorithm": result.algorithm,
+        "digest": result.digest,
+        "digests": result.digests,
+        "elapsed": round(result.elapsed, 6),
+        "cached_files": result.cached_files,
+        "resumed_files": result.resumed_files,
+    }
+
+
+def folder_file_record(folder: str, rel_path: str, size: int, digests: Dict[str, str]) -> dict:
+    """计算文件夹摘要时某个文件的摘要"""
+    algorithm = next(iter(digests))
+    return {"path": rel_path, "type": "file", "folder": folder, "size": size, "algorithm": algorithm,
+            "digest": digests[algorithm], "digests": digests}
+
+
+def status_record(status: str, rel_path: str, detail: Optional[str] = None, detail_key: str = "reason") -> dict:
+    """逐文件比较或校验的一条结果；出错时说明记为 error，否则记为 detail_key"""
+    record = {"path": rel_path, "status": status}
+    if detail:
+        record["error" if status == "error" else detail_key] = detail
+    return record
+
+
+def diff_summary_record(result) -> dict:
+    """逐文件比较的汇总 (DiffResult)"""
+    return {"folder1": result.folder1, "folder2": result.folder2, "match": result.identical,
+            "added": len(result.added), "removed": len(result.removed),
+            "modified": len(result.modified), "unchanged": len(result.unchanged),
+            "errors": len(result.errors), "files_hashed": result.files_hashed,
+            "bytes_hashed": result.bytes_hashed, "elapsed": round(result.elapsed, 6)}
+
+
+def verify_summary_record(manifest_path: str, report) -> dict:
+    """按清单校验的汇总 (VerifyReport)"""
+    return {"manifest": manifest_path, "match": report.matched, "ok": len(report.ok),
+            "skipped": len(report.skipped), "missing": len(report.missing),
+            "extra": len(report.extra), "corrupted": len(report.corrupted),
+            "errors": len(report.errors), "elapsed": round(report.elapsed, 6)}
+
+
+def sink_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    确定导出格式
+
+    :param fmt: 明确指定的格式，None 时按扩展名推断
+    :raises ValueError: 格式无效或无法推断
+    """
+    if fmt is None:
+        fmt = _EXTENSIONS.get(os.path.splitext(path)[1].lower())
+        if fmt is None:
+            raise ValueError("cannot infer the export format from {}, use one of: {}".format(
+                path, ", ".join(SINK_FORMATS)))
+    if fmt not in SINK_FORMATS:
+        raise ValueError("unknown export format: {}".format(fmt))
+    return fmt
+
+
+def open_sink(path: str, fmt: Optional[str] = None, batch_size: int = BATCH_SIZE) -> "ResultSink":
+    """
+    创建导出文件 (已存在时覆盖；SQLite 数据库中只替换 results 表)
+
+    :param path: 导出文件路径
+    :param fmt: "jsonl"、"csv" 或 "sqlite"，None 时按扩展名推断
+    :raises ValueError: 格式无效或无法推断
+    :raises OSError: 无法创建文件
+    """
+    fmt = sink_format(path, fmt)
+    if fmt == "jsonl":
+        return JsonLinesSink(path, batch_size)
+    if fmt == "csv":
+        return CsvSink(path, batch_size)
+    return SqliteSink(path, batch_size)
+
+
+def _columns(record: dict) -> tuple:
+    """把记录转换为 RESULT_COLUMNS 顺序的一行"""
+    rest = dict(record)
+    detail = rest.pop("error", None)
+    reason = rest.pop("reason", None)
+    row = [rest.pop(name, None) for name in RESULT_COLUMNS[:6]]
+    row.append(detail if detail is not None else reason)
+    row.append(rest.pop("elapsed", None))
+    row.append(json.dumps(rest, sort_keys=True) if rest else None)
+    return tuple(json.dumps(value) if isinstance(value, (dict, list)) else value for value in row)
+
+
+class ExportError(Exception):
+    """写入导出文件失败"""
+
+
+class ResultSink(abc.ABC):
+    """
+    按批写出记录，可在多个线程中调用 write
+
+    子类实现 _write_batch；close 时写出剩余的记录。
+    写入失败时抛出 ExportError，与计算本身的错误 (OSError、ValueError) 区分。
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = max(1, batch_size)
+        self.records_written = 0
+        self._lock = threading.Lock()
+        self._batch: List[dict] = []
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, record: dict) -> None:
+        with self._lock:
+            self._batch.append(record)
+            if len(self._batch) >= self.batch_size:
+                self._flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            try:
+                self._flush()
+            finally:
+                self._closed = True
+                self._close()
+
+    def _flush(self) -> None:
+        if self._batch:
+            batch, self._batch = self._batch, []
+            try:
+                self._write_batch(batch)
+            except (OSError, sqlite3.Error, UnicodeError) as e:
+                raise ExportError("cannot write {}: {}".format(getattr(self, "path", "export file"), e)) from e
+            self.records_written += len(batch)
+
+    @abc.abstractmethod
+    def _write_batch(self, records: List[dict]) -> None:
+        """写出一批记录"""
+
+    def _close(self) -> None:
+        pass
+
+
+class JsonLinesSink(ResultSink):
+    """每条记录一行 JSON"""
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8", newline="\n")
+
+    def _write_batch(self, records):
+        self._file.write("".join(json.dumps(record) + "\n" for record in records))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+class CsvSink(ResultSink):
+    """RESULT_COLUMNS 为表头的 CSV (UTF-8 带 BOM，便于电子表格软件识别编码)"""
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self._file = open(path, "w", encoding="utf-8-sig", errors="surrogateescape", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(RESULT_COLUMNS)
+
+    def _write_batch(self, records):
+        self._writer.writerows(_columns(record) for record in records)
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+
+
+def _sqlite_value(value):
+    """无法编码为 UTF-8 的字符串 (含代理字符的文件名) 以原始字节保存"""
+    if isinstance(value, str):
+        try:
+            value.encode("utf-8")
+        except UnicodeEncodeError:
+            return value.encode("utf-8", "surrogateescape")
+    return value
+
+
+class SqliteSink(ResultSink):
+    """写入 SQLite 数据库的 results 表，每批一个事务"""
+
+    def __init__(self, path: str, batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        try:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+        except sqlite3.Error as e:
+            raise OSError("cannot create {}: {}".format(path, e)) from e
+
+    def _write_batch(self, records):
+        placeholders = ", ".join("?" for _ in RESULT_COLUMNS)
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO results ({}) VALUES ({})".format(", ".join(RESULT_COLUMNS), placeholders),
+                (tuple(_sqlite_value(value) for value in _columns(record)) for record in records))
+
+    def _close(self):
+        self._conn.close()
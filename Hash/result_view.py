@@ -0,0 +1,315 @@
+"""
+虚拟化的结果列表
+
+逐文件的结果 (逐文件比较、按清单校验) 可能有上百万行。把它们拼成一个字符串插入 ScrolledText
+会反复复制字符串，文本框也要保存所有行。这里把行保存在 ResultModel 中，
+ResultView 的 Treeview 只包含当前可见的一页，滚动时替换这一页的内容：
+    - 行在任务运行期间分批追加，停留在末尾时自动跟随
+    - 点击列标题按该列排序，再次点击反向
+    - 筛选框按子串过滤 (不区分大小写)，追加的行同样经过筛选
+"""
+import bisect
+import tkinter as tk
+from tkinter import ttk
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+# 筛选框输入停止后多久再应用筛选 (毫秒)
+FILTER_DELAY_MS = 200
+
+# 无法从样式中获取行高时使用的默认值 (像素)
+DEFAULT_ROW_HEIGHT = 20
+
+# 排序后的行分块保存时每块的大小
+SORT_BLOCK_SIZE = 512
+
+
+def _sort_key(value):
+    """
+    字符串不区分大小写，数字按数值；None 排在最前，其后依次是数字、字符串和其他值
+
+    第一项按类型区分，同一列中混有数字和字符串 (如重复文件分组的出错行) 时排序键也总能比较。
+    """
+    if value is None:
+        return (0, "")
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value.casefold())
+    return (3, str(value))
+
+
+class ResultModel:
+    """
+    只追加的结果行模型
+
+    所有行保存在 rows 中，筛选和排序的结果是行下标的列表，不复制行本身。
+    排序时 (排序键, 下标) 分块保存 (每块至多 2 * SORT_BLOCK_SIZE 个，块内和块间都有序)；
+    追加的行先放入待合并列表，取某一页时才排序并逐个插入所在的块，
+    每行的代价与已有的行数无关，逐批追加上百万行也不会卡住界面线程。
+
+    :param columns: 列数
+    """
+
+    def __init__(self, columns: int):
+        self.columns = columns
+        self.rows: List[tuple] = []
+        self.filter_text = ""
+        self.sort_column: Optional[int] = None
+        self.sort_reverse = False
+        self._visible: List[int] = []
+        self._blocks: List[List[tuple]] = []
+        self._maxes: List[tuple] = []
+        self._sorted_count = 0
+        self._pending: List[tuple] = []
+
+    def clear(self) -> None:
+        self.rows = []
+        self._visible = []
+        self._set_sorted([])
+
+    def __len__(self) -> int:
+        """筛选后的行数"""
+        if self.sort_column is None:
+            return len(self._visible)
+        return self._sorted_count + len(self._pending)
+
+    def append(self, rows: Iterable[Sequence]) -> int:
+        """
+        追加行
+
+        :return: 新增的可见行数
+        """
+        added = 0
+        for row in rows:
+            row = tuple(row)
+            index = len(self.rows)
+            self.rows.append(row)
+            if self._matches(row):
+                self._insert_visible(index)
+                added += 1
+        return added
+
+    def set_filter(self, text: str) -> None:
+        """只显示任一列包含 text 的行 (不区分大小写)，空字符串显示全部"""
+        self.filter_text = text.casefold()
+        self._rebuild()
+
+    def set_sort(self, column: Optional[int], reverse: bool = False) -> None:
+        """按列排序，column 为 None 时按追加顺序"""
+        self.sort_column = column
+        self.sort_reverse = reverse
+        self._rebuild()
+
+    def page(self, start: int, count: int) -> List[tuple]:
+        """筛选和排序后第 start 行开始的至多 count 行"""
+        if self.sort_column is not None:
+            self._merge_pending()
+        total = len(self)
+        start = max(0, min(start, total))
+        end = min(total, start + count)
+        if self.sort_reverse:
+            indexes = self._slice(total - end, total - start)[::-1]
+        else:
+            indexes = self._slice(start, end)
+        return [self.rows[i] for i in indexes]
+
+    def _slice(self, start: int, end: int) -> List[int]:
+        """筛选和排序后第 start 到 end 行 (正序) 的行下标"""
+        if self.sort_column is None:
+            return self._visible[start:end]
+        indexes = []
+        offset = 0
+        for block in self._blocks:
+            if offset + len(block) > start:
+                indexes.extend(index for _, index in block[max(0, start - offset):end - offset])
+            offset += len(block)
+            if offset >= end:
+                break
+        return indexes
+
+    def _matches(self, row: tuple) -> bool:
+        if not self.filter_text:
+            return True
+        return any(self.filter_text in str(value).casefold() for value in row if value is not None)
+
+    def _insert_visible(self, index: int) -> None:
+        if self.sort_column is None:
+            self._visible.append(index)
+        else:
+            # 键相同时按追加顺序排列
+            self._pending.append((_sort_key(self.rows[index][self.sort_column]), index))
+
+    def _merge_pending(self) -> None:
+        """把待合并的行插入所在的块，块过大时一分为二"""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        if not self._blocks:
+            self._set_sorted(sorted(pending))
+            return
+        blocks, maxes = self._blocks, self._maxes
+        for key in sorted(pending):
+            i = min(bisect.bisect_left(maxes, key), len(blocks) - 1)
+            block = blocks[i]
+            bisect.insort(block, key)
+            maxes[i] = block[-1]
+            if len(block) > 2 * SORT_BLOCK_SIZE:
+                blocks[i:i + 1] = [block[:SORT_BLOCK_SIZE], block[SORT_BLOCK_SIZE:]]
+                maxes[i:i + 1] = [blocks[i][-1], blocks[i + 1][-1]]
+        self._sorted_count += len(pending)
+
+    def _set_sorted(self, keys: List[tuple]) -> None:
+        """用已排序的 (排序键, 下标) 列表替换分块的内容"""
+        self._blocks = [keys[i:i + SORT_BLOCK_SIZE] for i in range(0, len(keys), SORT_BLOCK_SIZE)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._sorted_count = len(keys)
+        self._pending = []
+
+    def _rebuild(self) -> None:
+        visible = [index for index, row in enumerate(self.rows) if self._matches(row)]
+        if self.sort_column is None:
+            self._visible = visible
+            self._set_sorted([])
+            return
+        self._visible = []
+        self._set_sorted(sorted((_sort_key(self.rows[index][self.sort_column]), index) for index in visible))
+
+
+class ResultView(ttk.Frame):
+    """
+    显示 ResultModel 的表格，只为可见的行创建 Treeview 条目
+
+    :param parent: 父组件
+    :param columns: 每列的 (标题, 宽度)
+    :param filter_label: 筛选框前的文字
+    """
+
+    def __init__(self, parent, columns: Sequence[Tuple[str, int]], filter_label: str = ""):
+        super().__init__(parent)
+        self.model = ResultModel(len(columns))
+        self._headings = [heading for heading, _ in columns]
+        self._offset = 0
+        self._page_size = 20
+        self._filter_job = None
+
+        filter_frame = ttk.Frame(self)
+        filter_frame.pack(fill=tk.X, pady=(0, 5))
+        if filter_label:
+            ttk.Label(filter_frame, text=filter_label).pack(side=tk.LEFT, padx=(0, 5))
+        self.filter_var = tk.StringVar()
+        self.filter_var.trace_add("write", lambda *args: self._schedule_filter())
+        ttk.Entry(filter_frame, textvariable=self.filter_var).pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.count_var = tk.StringVar()
+        ttk.Label(filter_frame, textvariable=self.count_var).pack(side=tk.RIGHT, padx=(5, 0))
+
+        body = ttk.Frame(self)
+        body.pack(fill=tk.BOTH, expand=True)
+        column_ids = ["c{}".format(i) for i in range(len(columns))]
+        self.tree = ttk.Treeview(body, columns=column_ids, show="headings", selectmode=tk.BROWSE)
+        for i, (heading, width) in enumerate(columns):
+            self.tree.heading(column_ids[i], text=heading, command=lambda i=i: self.toggle_sort(i))
+            self.tree.column(column_ids[i], width=width, stretch=(i == len(columns) - 1))
+        self.scrollbar = ttk.Scrollbar(body, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll(-1 if e.delta > 0 else 1, "units"))
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-1, "units"))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(1, "units"))
+        self.tree.bind("<Prior>", lambda e: self.scroll(-1, "pages"))
+        self.tree.bind("<Next>", lambda e: self.scroll(1, "pages"))
+        self.tree.bind("<Home>", lambda e: self.scroll_to(0))
+        self.tree.bind("<End>", lambda e: self.scroll_to(len(self.model)))
+        self._render()
+
+    def clear(self) -> None:
+        self.model.clear()
+        self._offset = 0
+        self._render()
+
+    def append(self, rows: Iterable[Sequence]) -> None:
+        """
+        追加一批行：停留在末尾时跟随到新的末尾，否则只在新行落入当前页时重绘
+        """
+        at_end = self._offset + self._page_size >= len(self.model)
+        if not self.model.append(rows):
+            self._update_count()
+            return
+        if at_end and self.model.sort_column is None:
+            self._offset = max(0, len(self.model) - self._page_size)
+        self._render()
+
+    def toggle_sort(self, column: int) -> None:
+        """按列排序；再次点击同一列反向，第三次恢复追加顺序"""
+        model = self.model
+        if model.sort_column != column:
+            model.set_sort(column, False)
+        elif not model.sort_reverse:
+            model.set_sort(column, True)
+        else:
+            model.set_sort(None)
+        for i, heading in enumerate(self._headings):
+            mark = ""
+            if i == model.sort_column:
+                mark = " ▼" if model.sort_reverse else " ▲"
+            self.tree.heading("c{}".format(i), text=heading + mark)
+        self.scroll_to(0)
+
+    def scroll(self, amount: int, unit: str) -> None:
+        step = self._page_size if unit == "pages" else 3
+        self.scroll_to(self._offset + amount * step)
+
+    def scroll_to(self, offset: int) -> None:
+        self._offset = max(0, min(offset, len(self.model) - self._page_size))
+        self._render()
+
+    def _schedule_filter(self) -> None:
+        if self._filter_job is not None:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(FILTER_DELAY_MS, self._apply_filter)
+
+    def _apply_filter(self) -> None:
+        self._filter_job = None
+        self.model.set_filter(self.filter_var.get())
+        self.scroll_to(0)
+
+    def _on_scrollbar(self, action, *args) -> None:
+        if action == "moveto":
+            self.scroll_to(int(float(args[0]) * len(self.model)))
+        elif action == "scroll":
+            self.scroll(int(args[0]), args[1])
+
+    def _on_resize(self, event) -> None:
+        """按 Treeview 的高度计算每页行数"""
+        row_height = DEFAULT_ROW_HEIGHT
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT)
+        except (tk.TclError, ValueError):
+            pass
+        # 减去标题行
+        page_size = max(1, event.height // row_height - 1)
+        if page_size != self._page_size:
+            self._page_size = page_size
+            self.scroll_to(self._offset)
+
+    def _render(self) -> None:
+        """用当前页的行替换 Treeview 的全部条目，并更新滚动条位置"""
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        for row in self.model.page(self._offset, self._page_size):
+            self.tree.insert("", tk.END, values=["" if value is None else value for value in row])
+        total = len(self.model)
+        if total:
+            first = self._offset / total
+            last = min(1.0, (self._offset + self._page_size) / total)
+        else:
+            first, last = 0.0, 1.0
+        self.scrollbar.set(first, last)
+        self._update_count()
+
+    def _update_count(self) -> None:
+        shown = len(self.model)
+        total = len(self.model.rows)
+        self.count_var.set(str(total) if shown == total else "{}/{}".format(shown, total))
@@ -0,0 +1,291 @@
+"""
+目录扫描
+
+使用 os.scandir 单次遍历目录树，复用 DirEntry 的类型信息，每个文件只做一次 stat。
+默认的遍历顺序与 os.walk(topdown=True) 一致：先列出当前目录中的文件，再依次进入子目录；
+指向目录的符号链接不会被进入。目录内的顺序取决于文件系统，
+给出 TraversalSpec 时按名称排序，并按其中的规则过滤文件、剪除整个子目录。
+"""
+import fnmatch
+import os
+import queue
+import re
+import stat
+import threading
+from dataclasses import dataclass, field
+from typing import FrozenSet, Iterator, List, Optional, Sequence, Tuple
+
+SYMLINK_MODES = ("skip", "files", "follow")
+
+
+@dataclass
+class FileEntry:
+    """扫描得到的文件条目"""
+    path: str
+    rel_path: str
+    size: int
+    mtime_ns: int
+    inode: int
+    device: int = 0
+
+
+def _split_patterns(patterns: Sequence[str]) -> Tuple[Tuple[str, bool], ...]:
+    """(模式, 是否只匹配目录)，以 "/" 结尾的模式只匹配目录"""
+    return tuple((pattern.rstrip("/"), pattern.endswith("/")) for pattern in patterns if pattern.rstrip("/"))
+
+
+def _compile(pattern: Optional[str]):
+    if not pattern:
+        return None
+    try:
+        return re.compile(pattern)
+    except re.error as e:
+        raise ValueError("invalid regular expression {!r}: {}".format(pattern, e)) from e
+
+
+@dataclass
+class TraversalSpec:
+    """
+    遍历规则。模式与相对路径比较时路径分隔符统一为 "/"，大小写敏感，结果与平台无关；
+    与 fnmatch 相同，glob 模式中的 * 也匹配 "/"。
+
+    :param sort: 每个目录中的条目按名称 (文件系统编码的字节) 排序，遍历顺序与文件系统无关
+    :param include: glob 模式，给出时只保留匹配任一模式的文件；含 "/" 的模式匹配相对路径，否则匹配名称
+    :param exclude: glob 模式，匹配的文件被跳过，匹配的目录不再进入；以 "/" 结尾的模式只匹配目录
+    :param include_regex: 正则表达式，给出时只保留相对路径中能找到匹配的文件
+    :param exclude_regex: 正则表达式，相对路径中能找到匹配的文件被跳过、目录不再进入
+    :param symlinks: "skip" 忽略所有符号链接；"files" 跟随指向文件的链接，不进入指向目录的链接 (默认)；
+        "follow" 也进入指向目录的链接，形成环的链接被跳过
+    :param hidden: 是否包括隐藏的文件和目录 (名称以 "." 开头，Windows 下还包括带隐藏属性的)
+    :param one_file_system: 不进入位于其他文件系统上的目录 (挂载点)
+    :param min_size: 只保留不小于该大小的文件 (字节)
+    :param max_size: 只保留不大于该大小的文件 (字节)
+    :param newer_than: 只保留修改时间不早于该时间的文件 (POSIX 时间戳)
+    :param older_than: 只保留修改时间早于该时间的文件 (POSIX 时间戳)
+    :raises ValueError: 参数无效
+    """
+    sort: bool = True
+    include: Sequence[str] = ()
+    exclude: Sequence[str] = ()
+    include_regex: Optional[str] = None
+    exclude_regex: Optional[str] = None
+    symlinks: str = "files"
+    hidden: bool = True
+    one_file_system: bool = False
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    newer_than: Optional[float] = None
+    older_than: Optional[float] = None
+    _include: tuple = field(init=False, repr=False, compare=False)
+    _exclude: tuple = field(init=False, repr=False, compare=False)
+    _include_re: object = field(init=False, repr=False, compare=False)
+    _exclude_re: object = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.symlinks not in SYMLINK_MODES:
+            raise ValueError("unknown symlink mode: {}".format(self.symlinks))
+        self._include = tuple(pattern for pattern, _ in _split_patterns(self.include))
+        self._exclude = _split_patterns(self.exclude)
+        self._include_re = _compile(self.include_regex)
+        self._exclude_re = _compile(self.exclude_regex)
+
+    @property
+    def needs_dir_stat(self) -> bool:
+        """是否需要 stat 子目录 (判断挂载点或符号链接形成的环)"""
+        return self.one_file_system or self.symlinks == "follow"
+
+    def dir_allowed(self, entry: os.DirEntry, rel_path: str) -> bool:
+        """是否进入子目录，在读取子目录之前调用"""
+        if not self.hidden and _is_hidden(entry):
+            return False
+        return not self._excluded(entry.name, rel_path.replace(os.sep, "/"), True)
+
+    def file_allowed(self, entry: os.DirEntry, rel_path: str, st: os.stat_result) -> bool:
+        """文件是否符合规则"""
+        if not self.hidden and _is_hidden(entry):
+            return False
+        if self.min_size is not None and st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        if self.newer_than is not None and st.st_mtime_ns < int(self.newer_than * 10 ** 9):
+            return False
+        if self.older_than is not None and st.st_mtime_ns >= int(self.older_than * 10 ** 9):
+            return False
+        rel_path = rel_path.replace(os.sep, "/")
+        if self._excluded(entry.name, rel_path, False):
+            return False
+        if self._include and not any(_glob_match(pattern, entry.name, rel_path) for pattern in self._include):
+            return False
+        return self._include_re is None or self._include_re.search(rel_path) is not None
+
+    def _excluded(self, name: str, rel_path: str, is_dir: bool) -> bool:
+        for pattern, dir_only in self._exclude:
+            if (is_dir or not dir_only) and _glob_match(pattern, name, rel_path):
+                return True
+        return self._exclude_re is not None and self._exclude_re.search(rel_path) is not None
+
+
+def _glob_match(pattern: str, name: str, rel_path: str) -> bool:
+    return fnmatch.fnmatchcase(rel_path if "/" in pattern else name, pattern)
+
+
+def _is_hidden(entry: os.DirEntry) -> bool:
+    if entry.name.startswith("."):
+        return True
+    if os.name == "nt":
+        # Windows 下 DirEntry 的 stat 结果来自目录列表，不需要额外的系统调用
+        try:
+            return bool(entry.stat(follow_symlinks=False).st_file_attributes & stat.FILE_ATTRIBUTE_HIDDEN)
+        except OSError:
+            return False
+    return False
+
+
+def _dir_key(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_dev, st.st_ino
+
+
+def _scan_dir(folder_path: str, dir_path: str, spec: Optional[TraversalSpec] = None, root_device: int = 0,
+              ancestors: FrozenSet[Tuple[int, int]] = frozenset()) -> Iterator[List[FileEntry]]:
+    """
+    按目录产出文件条目列表，目录无法读取时跳过 (与 os.walk 的默认行为相同)
+
+    :param root_device: one_file_system 时根目录所在的设备
+    :param ancestors: 符号链接为 "follow" 时从根目录到当前目录的 (设备, inode)，用于跳过形成环的链接
+    """
+    try:
+        scandir_it = os.scandir(dir_path)
+    except OSError:
+        return
+
+    with scandir_it:
+        entries = list(scandir_it)
+    if spec is not None and spec.sort:
+        entries.sort(key=lambda entry: os.fsencode(entry.name))
+
+    files = []
+    subdirs = []
+    for entry in entries:
+        try:
+            if spec is not None and spec.symlinks == "skip" and entry.is_symlink():
+                continue
+            if entry.is_dir():
+                if entry.is_symlink() and (spec is None or spec.symlinks != "follow"):
+                    continue
+                # 在进入之前判断，被排除的子目录既不会被列出也不会被 stat
+                if spec is None or spec.dir_allowed(entry, os.path.relpath(entry.path, folder_path)):
+                    subdirs.append(entry)
+                continue
+            if not entry.is_file():
+                continue
+            st = entry.stat()
+        except OSError:
+            # 文件在扫描过程中被删除或无权限访问
+            continue
+        rel_path = os.path.relpath(entry.path, folder_path)
+        if spec is not None and not spec.file_allowed(entry, rel_path, st):
+            continue
+        files.append(FileEntry(entry.path, rel_path, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev))
+
+    if files:
+        yield files
+    for entry in subdirs:
+        if spec is None or not spec.needs_dir_stat:
+            yield from _scan_dir(folder_path, entry.path, spec)
+            continue
+        key = _dir_key(entry.path)
+        if key is None or key in ancestors or (spec.one_file_system and key[0] != root_device):
+            continue
+        yield from _scan_dir(folder_path, entry.path, spec, root_device, ancestors | {key})
+
+
+def _walk(folder_path: str, dir_path: str, spec: Optional[TraversalSpec]) -> Iterator[List[FileEntry]]:
+    if spec is None or not spec.needs_dir_stat:
+        return _scan_dir(folder_path, dir_path, spec)
+    key = _dir_key(dir_path)
+    if key is None:
+        return iter(())
+    return _scan_dir(folder_path, dir_path, spec, key[0], frozenset([key]))
+
+
+def scan_folder(folder_path: str, subdir: str = "", spec: Optional[TraversalSpec] = None) -> Iterator[FileEntry]:
+    """
+    单次遍历文件夹，按 os.walk 顺序逐个产出 FileEntry
+
+    :param folder_path: 文件夹路径
+    :param subdir: 只遍历该子目录 (相对路径)，条目的 rel_path 仍相对于 folder_path
+    :param spec: 遍历规则，None 时不过滤、不排序
+    """
+    for batch in _walk(folder_path, os.path.join(folder_path, subdir) if subdir else folder_path, spec):
+        yield from batch
+
+
+class BackgroundScan:
+    """
+    在后台线程中扫描文件夹，调用方可以一边迭代一边处理已发现的文件
+
+    files_found / bytes_found 为目前已发现的文件数和字节数，
+    finished 为 True 后二者即为清单的最终统计。
+    给出 tracker (progress.ProgressTracker) 时，发现的文件同时计入其总数。
+    给出 spec (TraversalSpec) 时按其规则排序和过滤。
+    """
+
+    _DONE = object()
+
+    def __init__(self, folder_path: str, tracker=None, spec: Optional[TraversalSpec] = None):
+        self.folder_path = folder_path
+        self.tracker = tracker
+        self.spec = spec
+        self.files_found = 0
+        self.bytes_found = 0
+        self.finished = False
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="folder-scan", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """停止扫描线程"""
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        if self.tracker is not None:
+            self.tracker.begin_scan()
+        try:
+            for batch in _walk(self.folder_path, self.folder_path, self.spec):
+                if self._stop.is_set():
+                    break
+                batch_bytes = sum(entry.size for entry in batch)
+                self.files_found += len(batch)
+                self.bytes_found += batch_bytes
+                if self.tracker is not None:
+                    self.tracker.add_total(len(batch), batch_bytes)
+                self._queue.put(batch)
+            self.finished = True
+            self._queue.put(self._DONE)
+        except BaseException as e:
+            self._queue.put(e)
+        finally:
+            if self.tracker is not None:
+                self.tracker.end_scan()
+
+    def __iter__(self) -> Iterator[FileEntry]:
+        while True:
+            item = self._queue.get()
+            if item is self._DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield from item
@@ -0,0 +1,104 @@
+"""
+后台任务执行
+
+在工作线程中执行耗时的哈希计算，通过线程安全的队列把进度、结果和错误
+传回 Tk 主线程，由 root.after 定时轮询，主循环始终不会被阻塞。
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from hash_engine import HashCancelled
+
+# 队列轮询间隔 (毫秒)
+POLL_INTERVAL_MS = 50
+
+
+class BackgroundTask:
+    """
+    在工作线程中运行 func(report_progress, cancel_event)
+
+    所有回调都在 Tk 主线程中执行：
+    on_progress(*args) 处理进度，on_done(result) 处理结果，
+    on_error(exc) 处理异常，on_cancelled() 处理取消，
+    on_finally() 在以上任一结束回调之后执行。
+    """
+
+    # 所有任务共用一个工作线程池
+    _executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="hash-worker")
+
+    def __init__(self, root, func, on_progress=None, on_done=None, on_error=None,
+                 on_cancelled=None, on_finally=None):
+        self.root = root
+        self.func = func
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.on_finally = on_finally
+        self.cancel_event = threading.Event()
+        self._queue = queue.Queue()
+        self._finished = False
+
+    def start(self):
+        """提交任务并开始轮询结果队列"""
+        self._executor.submit(self._run)
+        self.root.after(POLL_INTERVAL_MS, self._poll)
+        return self
+
+    def cancel(self):
+        """请求取消任务，工作线程会在下一个读取块之前停止"""
+        self.cancel_event.set()
+
+    @property
+    def running(self):
+        return not self._finished
+
+    def _report_progress(self, *args):
+        self._queue.put(("progress", args))
+
+    def _run(self):
+        """在工作线程中执行"""
+        try:
+            result = self.func(self._report_progress, self.cancel_event)
+        except HashCancelled:
+            self._queue.put(("cancelled", None))
+        except Exception as e:
+            self._queue.put(("error", e))
+        else:
+            self._queue.put(("done", result))
+
+    def _poll(self):
+        """在主线程中取出队列消息，多条进度消息只保留最新一条"""
+        latest_progress = None
+        final = None
+        try:
+            while True:
+                kind, payload = self._queue.get_nowait()
+                if kind == "progress":
+                    latest_progress = payload
+                else:
+                    final = (kind, payload)
+                    break
+        except queue.Empty:
+            pass
+
+        if latest_progress is not None and self.on_progress and not self.cancel_event.is_set():
+            self.on_progress(*latest_progress)
+
+        if final is None:
+            self.root.after(POLL_INTERVAL_MS, self._poll)
+            return
+
+        self._finished = True
+        kind, payload = final
+        try:
+            if kind == "done" and self.on_done:
+                self.on_done(payload)
+            elif kind == "error" and self.on_error:
+                self.on_error(payload)
+            elif kind == "cancelled" and self.on_cancelled:
+                self.on_cancelled()
+        finally:
+            if self.on_finally:
+                self.on_finally()
@@ -0,0 +1,151 @@
+"""
+分段并行哈希 (tree hash)
+
+compute_file_hash 顺序读取文件，一个超大文件只能用到一个核心。这里把文件切成固定大小的段，
+由线程池或进程池按位置读取 (os.pread) 并分别计算各段的摘要，再合并为根摘要。
+根摘要与普通的 SHA-256 等不同，只能与同一方案、同一段大小算出的结果比较。
+
+方案 "tree" (版本 1)，对每个算法 H 分别计算:
+    leaf_i = H(第 i 段的内容)          段从偏移 0 开始按 segment_size 切分，最后一段可能较短，空文件没有段
+    root   = H(b"tree-hash-v1\\0" || 算法名 || b"\\0" || segment_size || 文件大小 || leaf_0 || leaf_1 || ...)
+其中 segment_size 和文件大小为 8 字节大端整数，leaf_i 为二进制摘要。结果的十六进制表示即根摘要。
+
+方案 "etag"：与对象存储 (S3 等) 分段上传的 ETag 相同，只支持 MD5:
+    不超过一个段的文件为整个文件的 MD5 (与普通上传一致)；
+    否则为 MD5(md5_0 || md5_1 || ...) 的十六进制加 "-段数"。
+    segment_size 需与上传时的分段大小一致 (aws cli 默认 8 MiB)。
+"""
+import errno
+import functools
+import os
+import stat
+import threading
+import time
+from typing import Dict, Optional, Sequence, Tuple
+
+import hash_engine
+from algorithms import new_hash
+from file_reader import AUTO_CHUNK_SIZE, update_hash_from_range
+from hash_engine import Algorithms, FileHashResult, MultiHash
+
+TREE_SCHEMES = ("tree", "etag")
+
+TREE_HASH_VERSION = 1
+
+# 默认段大小，与常见的分段上传默认值一致
+DEFAULT_SEGMENT_SIZE = 8 * 1024 * 1024
+
+# 一个段: (序号, 偏移, 长度)
+Segment = Tuple[int, int, int]
+
+
+def tree_algorithm_name(algorithm: str, scheme: str = "tree", segment_size: int = DEFAULT_SEGMENT_SIZE) -> str:
+    """结果中记录的算法名，如 "sha256-tree-8M"，用于区分普通摘要"""
+    if segment_size % (1024 * 1024) == 0:
+        size = "{}M".format(segment_size // (1024 * 1024))
+    elif segment_size % 1024 == 0:
+        size = "{}K".format(segment_size // 1024)
+    else:
+        size = str(segment_size)
+    return "{}-{}-{}".format(algorithm, scheme, size)
+
+
+def _segments(file_size: int, segment_size: int):
+    for index, offset in enumerate(range(0, file_size, segment_size)):
+        yield index, offset, min(segment_size, file_size - offset)
+
+
+def _hash_segment(file_path, algorithms, cancel_event, segment: Segment) -> Dict[str, bytes]:
+    """计算一个段的摘要，返回 {算法名: 二进制摘要}"""
+    _, offset, length = segment
+    # 段之间已经并行，不再为每个算法开线程
+    hash_obj = MultiHash(algorithms, threaded=False)
+    cancel_check = (lambda: hash_engine.check_cancel(cancel_event)) if cancel_event is not None else None
+    read = update_hash_from_range(hash_obj, file_path, offset, length, AUTO_CHUNK_SIZE, cancel_check)
+    if read != length:
+        # 文件在计算期间被截断，继续下去得到的根摘要没有意义
+        raise OSError(errno.EIO, "file changed while hashing", file_path)
+    return hash_obj.digests()
+
+
+def _combine(scheme: str, name: str, segment_size: int, file_size: int, leaves: Sequence[bytes]) -> str:
+    """把按序号排列的段摘要合并为根摘要"""
+    if scheme == "etag":
+        if len(leaves) <= 1:
+            return leaves[0].hex() if leaves else new_hash("md5").hexdigest()
+        root = new_hash("md5")
+        for leaf in leaves:
+            root.update(leaf)
+        return "{}-{}".format(root.hexdigest(), len(leaves))
+
+    root = new_hash(name)
+    root.update(b"tree-hash-v%d\0" % TREE_HASH_VERSION + name.encode("ascii") + b"\0")
+    root.update(segment_size.to_bytes(8, "big") + file_size.to_bytes(8, "big"))
+    for leaf in leaves:
+        root.update(leaf)
+    return root.hexdigest()
+
+
+def compute_tree_hash(file_path: str, algorithm: Algorithms = "sha256",
+                      segment_size: int = DEFAULT_SEGMENT_SIZE, scheme: str = "tree",
+                      workers: Optional[int] = None, pool: str = "thread",
+                      progress_callback: Optional[hash_engine.BytesProgressCallback] = None,
+                      cancel_event: Optional[threading.Event] = None) -> FileHashResult:
+    """
+    分段并行计算文件的根摘要 (方案见模块说明)
+
+    同时在池中的段数有上限，内存占用约为 workers 个读取缓冲区，与文件大小无关。
+
+    :param file_path: 文件路径
+    :param algorithm: 算法名，或多个算法名 (每个段只读取一次)；etag 方案只能为 md5
+    :param segment_size: 段大小 (字节)
+    :param scheme: "tree" 或 "etag"
+    :param workers: 并行工作数，默认为 CPU 数
+    :param pool: "thread" 或 "process"；hashlib 计算较大的数据块时会释放 GIL，通常线程池即可
+    :param progress_callback: 进度回调函数 (已完成字节数, 文件总字节数)，每完成一个段调用一次
+    :param cancel_event: 被设置时中止计算
+    :return: FileHashResult，algorithm 为 tree_algorithm_name() 的形式
+    :raises FileNotFoundError: 文件不存在
+    :raises HashCancelled: 计算被取消
+    :raises ValueError: 参数无效
+    :raises OSError: 读取文件失败，或文件在计算期间被截断
+    """
+    algorithms = hash_engine.normalize_algorithms(algorithm)
+    if scheme not in TREE_SCHEMES:
+        raise ValueError("unknown tree hash scheme: {}".format(scheme))
+    if scheme == "etag" and algorithms != ("md5",):
+        raise ValueError("the etag scheme only supports md5")
+    if segment_size <= 0:
+        raise ValueError("segment_size must be positive")
+    workers = workers or os.cpu_count() or 1
+
+    start_time = time.perf_counter()
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        st = None
+    if st is None or not stat.S_ISREG(st.st_mode):
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), file_path)
+    file_size = st.st_size
+
+    # 进程池中的任务无法共享 cancel_event，只能在提交之间检查
+    task_cancel = cancel_event if hash_engine.reads_in_process(workers, pool) else None
+    func = functools.partial(_hash_segment, file_path, algorithms, task_cancel)
+    leaves = [None] * ((file_size + segment_size - 1) // segment_size)
+    done_bytes = 0
+    for segment, digests, error in hash_engine.iter_completed(func, _segments(file_size, segment_size), workers,
+                                                              pool, cancel_event=cancel_event):
+        if error is not None:
+            raise error
+        leaves[segment[0]] = digests
+        done_bytes += segment[2]
+        if progress_callback:
+            progress_callback(done_bytes, file_size)
+
+    digests = {}
+    for name in algorithms:
+        digests[tree_algorithm_name(name, scheme, segment_size)] = _combine(
+            scheme, name, segment_size, file_size, [leaf[name] for leaf in leaves])
+    first = tree_algorithm_name(algorithms[0], scheme, segment_size)
+    return FileHashResult(file_path, first, digests[first], file_size, time.perf_counter() - start_time,
+                          digests=digests)
@@ -0,0 +1,536 @@
+"""
+监视模式
+
+反复计算同一个发布目录来发现变化，每次的代价都与目录大小成正比。FolderWatcher 先计算一次
+每个文件的摘要并保存在内存中，之后只重新计算新增和修改的文件，删除的文件直接去掉：
+    - Linux 上使用 inotify 递归监视目录树，只检查事件涉及的路径
+    - 其他系统，或 inotify 不可用 (如超出 max_user_watches) 时，每隔 interval 秒扫描一次元数据，
+      大小、mtime 或 inode 变化的文件视为已修改
+事件队列溢出时退回一次完整的元数据扫描。
+
+文件夹摘要与 records 模式相同 (见 hash_engine.folder_record)，可以与 compute_folder_hash 的结果直接比较。
+每次变化后用内存中的摘要重新合并，不读取未变化的文件。排序后的相对路径分块保存 (_RecordIndex)，
+每块缓存记录拼接后的字节和哈希到该块末尾时的状态：只有变化所在的块重新生成记录，
+从第一个变化的块开始用缓存的字节继续计算 (只剩 C 层面的哈希)，总文件数、总大小和目录下的文件查找
+也不再遍历所有文件。
+
+    watcher = FolderWatcher("release", "sha256")
+    watcher.start()
+    watcher.run(lambda report: print(report.added, report.modified, report.removed, report.digest))
+"""
+import bisect
+import ctypes
+import ctypes.util
+import errno
+import itertools
+import os
+import select
+import stat
+import struct
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Set
+
+import hash_engine
+from algorithms import new_hash
+from digest_cache import DigestCache
+from file_reader import ReadOptions
+from scanner import FileEntry, scan_folder
+
+# 轮询模式下两次扫描之间的间隔 (秒)
+DEFAULT_INTERVAL = 2.0
+
+# 收到事件后等待这段时间内没有新事件再计算，避免文件写入过程中反复计算 (秒)
+SETTLE_SECONDS = 0.5
+
+# inotify 模式下检查 stop_event 的间隔 (秒)
+_WAIT_TIMEOUT = 0.5
+
+# _RecordIndex 每块的文件数
+RECORD_BLOCK_SIZE = 256
+
+
+@dataclass
+class WatchReport:
+    """
+    一次更新的结果
+
+    :param added: 新增的文件 (相对路径，已排序)
+    :param modified: 内容或元数据变化的文件
+    :param removed: 删除的文件
+    :param errors: 读取失败的文件 {相对路径: OSError}，这些文件暂不计入文件夹摘要
+    :param full_scan: 本次是否扫描了整个目录树
+    :param elapsed: 本次更新的耗时 (秒)
+    """
+    algorithm: str
+    digest: str
+    total_files: int
+    total_size: int
+    elapsed: float
+    full_scan: bool
+    added: List[str] = field(default_factory=list)
+    modified: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    errors: Dict[str, OSError] = field(default_factory=dict)
+    digests: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.modified or self.removed or self.errors)
+
+
+# inotify 事件 (见 inotify(7))
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_DONTFOLLOW = 0x02000000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE
+               | _IN_DELETE | _IN_DELETE_SELF | _IN_MOVE_SELF | _IN_ONLYDIR | _IN_DONTFOLLOW)
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """
+    通过 ctypes 调用 Linux inotify，递归监视目录树
+
+    :raises OSError: 系统不支持 inotify，或监视数量超出限制
+    """
+
+    def __init__(self, folder_path: str):
+        libc_name = ctypes.util.find_library("c") if sys.platform.startswith("linux") else None
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._libc = libc
+        self.folder_path = folder_path
+        self._fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            self._raise_errno(folder_path)
+        # 监视描述符 -> 目录的相对路径 ("" 为根目录)
+        self._watches: Dict[int, str] = {}
+        try:
+            self.add_tree("")
+        except BaseException:
+            self.close()
+            raise
+
+    def _raise_errno(self, path):
+        code = ctypes.get_errno()
+        raise OSError(code, os.strerror(code), path)
+
+    def add_tree(self, rel_dir: str) -> None:
+        """监视 rel_dir 及其所有子目录 (不进入指向目录的符号链接)"""
+        pending = [rel_dir]
+        while pending:
+            current = pending.pop()
+            path = os.path.join(self.folder_path, current) if current else self.folder_path
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                code = ctypes.get_errno()
+                if code in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                    # 目录已被删除或无法访问，与扫描时的处理相同
+                    continue
+                raise OSError(code, os.strerror(code), path)
+            self._watches[wd] = current
+            try:
+                with os.scandir(path) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append(os.path.join(current, entry.name))
+            except OSError:
+                continue
+
+    def read(self, timeout: float) -> Optional[Set[str]]:
+        """
+        等待事件
+
+        :param timeout: 最长等待时间 (秒)
+        :return: 事件涉及的相对路径 (超时为空集合)，事件队列溢出时返回 None 表示需要完整扫描
+        """
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+                offset += length
+                if mask & _IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                rel_dir = self._watches.get(wd)
+                if rel_dir is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    del self._watches[wd]
+                    continue
+                if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+                    changed.add(rel_dir)
+                    continue
+                if not name:
+                    # 目录自身的属性变化
+                    continue
+                rel_path = os.path.join(rel_dir, name) if rel_dir else name
+                if mask & _IN_ISDIR:
+                    if mask & _IN_MOVED_FROM:
+                        self._remove_tree(rel_path)
+                    elif mask & (_IN_CREATE | _IN_MOVED_TO):
+                        # 新目录在加入监视之前可能已经有了文件，由调用方扫描整个子目录
+                        self.add_tree(rel_path)
+                    elif not mask & _IN_DELETE:
+                        continue
+                changed.add(rel_path)
+        return None if overflow else changed
+
+    def _remove_tree(self, rel_dir: str) -> None:
+        """目录被移出原位置：停止监视它和它的子目录 (移入树中其他位置时会重新加入)"""
+        prefix = rel_dir + os.sep
+        for wd, path in list(self._watches.items()):
+            if path == rel_dir or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class _RecordIndex:
+    """
+    排序后的相对路径，分块保存 (每块至多 2 * RECORD_BLOCK_SIZE 个)
+
+    每块缓存各算法的记录字节 (hash_engine.folder_record 拼接) 和哈希到该块末尾时的状态。
+    增删或修改一个文件只使该块的字节和该块起的状态失效，重新合并时
+    从前一块的状态继续，Python 层面的工作与变化的文件数和块数成正比。
+    """
+
+    def __init__(self, algorithms):
+        self.algorithms = algorithms
+        self._blocks: List[List[str]] = []
+        self._maxes: List[str] = []
+        # 每块的 {算法: 记录字节}，None 表示需要重新生成
+        self._bytes: List[Optional[Dict[str, bytes]]] = []
+        # 每块末尾的 {算法: 哈希对象}，只有前 _valid_states 块有效
+        self._states: List[Optional[dict]] = []
+        self._valid_states = 0
+
+    def _locate(self, rel_path: str) -> int:
+        return min(bisect.bisect_left(self._maxes, rel_path), len(self._blocks) - 1)
+
+    def _invalidate(self, i: int) -> None:
+        self._bytes[i] = None
+        self._valid_states = min(self._valid_states, i)
+
+    def add(self, rel_path: str) -> None:
+        """加入新的路径"""
+        if not self._blocks:
+            self._blocks.append([rel_path])
+            self._maxes.append(rel_path)
+            self._bytes.append(None)
+            self._states.append(None)
+            self._valid_states = 0
+            return
+        i = self._locate(rel_path)
+        block = self._blocks[i]
+        bisect.insort(block, rel_path)
+        self._maxes[i] = block[-1]
+        self._invalidate(i)
+        if len(block) > 2 * RECORD_BLOCK_SIZE:
+            self._blocks[i:i + 1] = [block[:RECORD_BLOCK_SIZE], block[RECORD_BLOCK_SIZE:]]
+            self._maxes[i:i + 1] = [self._blocks[i][-1], self._blocks[i + 1][-1]]
+            self._bytes[i:i + 1] = [None, None]
+            self._states[i:i + 1] = [None, None]
+
+    def remove(self, rel_path: str) -> None:
+        """去掉已有的路径"""
+        i = self._locate(rel_path)
+        block = self._blocks[i]
+        block.pop(bisect.bisect_left(block, rel_path))
+        self._invalidate(i)
+        if block:
+            self._maxes[i] = block[-1]
+        else:
+            del self._blocks[i], self._maxes[i], self._bytes[i], self._states[i]
+
+    def changed(self, rel_path: str) -> None:
+        """已有路径的摘要变化"""
+        self._invalidate(self._locate(rel_path))
+
+    def _from(self, key: str):
+        """按顺序产生不小于 key 的路径"""
+        start = bisect.bisect_left(self._maxes, key)
+        for i in range(start, len(self._blocks)):
+            block = self._blocks[i]
+            yield from block[bisect.bisect_left(block, key) if i == start else 0:]
+
+    def under(self, rel_dir: str) -> List[str]:
+        """rel_dir 本身及其下的所有路径 (在排序中相邻，用二分查找定位)"""
+        found = [rel_path for rel_path in itertools.islice(self._from(rel_dir), 1) if rel_path == rel_dir]
+        prefix = rel_dir + os.sep
+        found.extend(itertools.takewhile(lambda rel_path: rel_path.startswith(prefix), self._from(prefix)))
+        return found
+
+    def digests(self, file_digests: Dict[str, Dict[str, str]]) -> Dict[str, str]:
+        """合并出各算法的文件夹摘要"""
+        if self._valid_states:
+            hashes = {name: state.copy() for name, state in self._states[self._valid_states - 1].items()}
+        else:
+            hashes = {name: new_hash(name) for name in self.algorithms}
+        for i in range(self._valid_states, len(self._blocks)):
+            if self._bytes[i] is None:
+                self._bytes[i] = {name: b"".join(hash_engine.folder_record(rel_path, file_digests[rel_path][name])
+                                                 for rel_path in self._blocks[i])
+                                  for name in self.algorithms}
+            for name, hash_obj in hashes.items():
+                hash_obj.update(self._bytes[i][name])
+            self._states[i] = {name: hash_obj.copy() for name, hash_obj in hashes.items()}
+        self._valid_states = len(self._blocks)
+        return {name: hash_obj.hexdigest() for name, hash_obj in hashes.items()}
+
+
+class FolderWatcher:
+    """
+    监视文件夹，增量维护逐文件摘要和文件夹摘要
+
+    :param folder_path: 文件夹路径
+    :param algorithm: 算法名，或多个算法名 (每个文件只读取一次)
+    :param workers: 计算变化文件时的并行工作数
+    :param cache: 摘要缓存，启动时未变化的文件不再读取
+    :param read_options: 读取策略和块大小
+    :param interval: 轮询模式下两次扫描之间的间隔 (秒)
+    :param use_inotify: True 强制使用 inotify，False 强制轮询，None 时优先使用 inotify
+    """
+
+    def __init__(self, folder_path: str, algorithm: hash_engine.Algorithms = "sha256", workers: int = 1,
+                 cache: Optional[DigestCache] = None, read_options: Optional[ReadOptions] = None,
+                 interval: float = DEFAULT_INTERVAL, use_inotify: Optional[bool] = None):
+        self.folder_path = folder_path
+        self.algorithms = hash_engine.normalize_algorithms(algorithm)
+        self.workers = workers
+        self.cache = cache
+        self.read_options = read_options
+        self.interval = interval
+        self.use_inotify = use_inotify
+        self.entries: Dict[str, FileEntry] = {}
+        self.file_digests: Dict[str, Dict[str, str]] = {}
+        self._inotify: Optional[_Inotify] = None
+        self._index = _RecordIndex(self.algorithms)
+        self._total_size = 0
+
+    @property
+    def backend(self) -> str:
+        """当前使用的监视方式："inotify" 或 "polling" """
+        return "inotify" if self._inotify is not None else "polling"
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def start(self, cancel_event: Optional[threading.Event] = None) -> WatchReport:
+        """
+        开始监视并计算所有文件的摘要
+
+        先建立 inotify 监视再扫描，扫描期间发生的变化不会遗漏。
+
+        :return: 初始结果，所有文件都在 added 中
+        :raises NotADirectoryError: 文件夹不存在
+        :raises OSError: use_inotify 为 True 但 inotify 不可用
+        :raises HashCancelled: 计算被取消
+        """
+        if not os.path.isdir(self.folder_path):
+            raise NotADirectoryError(errno.ENOTDIR, os.strerror(errno.ENOTDIR), self.folder_path)
+        self.close()
+        self.entries = {}
+        self.file_digests = {}
+        self._index = _RecordIndex(self.algorithms)
+        self._total_size = 0
+        if self.use_inotify is not False:
+            try:
+                self._inotify = _Inotify(self.folder_path)
+            except OSError:
+                if self.use_inotify:
+                    raise
+        return self.refresh(None, cancel_event)
+
+    def refresh(self, paths: Optional[Set[str]] = None,
+                cancel_event: Optional[threading.Event] = None) -> WatchReport:
+        """
+        检查变化并更新摘要
+
+        :param paths: 需要检查的相对路径 (文件或目录，目录会检查其下所有文件)，None 表示扫描整个目录树
+        :return: WatchReport
+        :raises HashCancelled: 计算被取消
+        """
+        start_time = time.perf_counter()
+        if paths is None:
+            current = {entry.rel_path: entry for entry in scan_folder(self.folder_path)}
+            candidates = set(self.entries) | set(current)
+        else:
+            current = {}
+            candidates = set()
+            for rel_path in paths:
+                candidates.update(self._known_under(rel_path))
+                for entry in self._scan_path(rel_path):
+                    current[entry.rel_path] = entry
+                    candidates.add(entry.rel_path)
+
+        report = WatchReport(self.algorithms[0], "", 0, 0, 0.0, paths is None)
+        to_hash = []
+        for rel_path in sorted(candidates):
+            old = self.entries.get(rel_path)
+            new = current.get(rel_path)
+            if new is None:
+                if old is not None:
+                    self._forget(rel_path)
+                    report.removed.append(rel_path)
+            elif old is None:
+                to_hash.append(new)
+                report.added.append(rel_path)
+            elif (old.size, old.mtime_ns, old.inode) != (new.size, new.mtime_ns, new.inode):
+                to_hash.append(new)
+                report.modified.append(rel_path)
+
+        self._hash_entries(to_hash, report, cancel_event)
+        self._fill_totals(report)
+        report.elapsed = time.perf_counter() - start_time
+        return report
+
+    def run(self, callback: Callable[[WatchReport], None], stop_event: Optional[threading.Event] = None) -> None:
+        """
+        持续监视，每次有变化时调用 callback(WatchReport)，直到 stop_event 被设置
+
+        需要先调用 start()。
+        """
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            if self._inotify is None:
+                if stop_event.wait(self.interval):
+                    break
+                changed = None
+            else:
+                changed = self._inotify.read(_WAIT_TIMEOUT)
+                if changed is not None and not changed:
+                    continue
+                # 等待事件平息：写入大文件时会连续产生修改事件
+                while changed is not None:
+                    more = self._inotify.read(SETTLE_SECONDS)
+                    if more is None:
+                        changed = None
+                    elif not more:
+                        break
+                    else:
+                        changed |= more
+            report = self.refresh(changed, stop_event)
+            if report.changed:
+                callback(report)
+
+    def _known_under(self, rel_path: str) -> List[str]:
+        """已记录的该路径本身及其下的所有文件"""
+        if not rel_path:
+            return list(self.entries)
+        return self._index.under(rel_path)
+
+    def _scan_path(self, rel_path: str) -> List[FileEntry]:
+        """当前磁盘上该路径对应的文件：普通文件本身，或目录下的所有文件"""
+        path = os.path.join(self.folder_path, rel_path) if rel_path else self.folder_path
+        if os.path.isdir(path) and not os.path.islink(path):
+            return list(scan_folder(self.folder_path, rel_path))
+        # 与扫描一致：指向文件的符号链接按目标文件计算
+        try:
+            st = os.stat(path)
+        except OSError:
+            return []
+        if not stat.S_ISREG(st.st_mode):
+            return []
+        return [FileEntry(path, rel_path, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)]
+
+    def _store(self, entry: FileEntry, file_digests: Dict[str, str]) -> None:
+        """记录文件的摘要，同时更新索引和总大小"""
+        rel_path = entry.rel_path
+        old = self.entries.get(rel_path)
+        if rel_path not in self.file_digests:
+            self._index.add(rel_path)
+        else:
+            self._index.changed(rel_path)
+            self._total_size -= old.size
+        self.entries[rel_path] = entry
+        self.file_digests[rel_path] = file_digests
+        self._total_size += entry.size
+
+    def _forget(self, rel_path: str) -> None:
+        entry = self.entries.pop(rel_path, None)
+        if self.file_digests.pop(rel_path, None) is not None:
+            self._index.remove(rel_path)
+            self._total_size -= entry.size
+
+    def _hash_entries(self, entries: List[FileEntry], report: WatchReport,
+                      cancel_event: Optional[threading.Event]) -> None:
+        """计算新增和修改的文件，读取失败的文件从记录中去掉，下次变化时重试"""
+        def entries_to_hash():
+            for entry in entries:
+                file_digests = hash_engine.cached_digests(self.cache, entry, self.algorithms)
+                if file_digests is None:
+                    yield entry
+                else:
+                    self._store(entry, file_digests)
+
+        for entry, file_digests, error in hash_engine.iter_file_digests(
+                entries_to_hash(), self.algorithms, self.workers, cancel_event=cancel_event,
+                read_options=self.read_options):
+            if error is None:
+                hash_engine.store_digests(self.cache, entry, file_digests)
+                self._store(entry, file_digests)
+                continue
+            self._forget(entry.rel_path)
+            if not isinstance(error, FileNotFoundError):
+                report.errors[entry.rel_path] = error
+            elif entry.rel_path in report.added:
+                # 计算前已被删除 (如编辑器保存时的临时文件)
+                report.added.remove(entry.rel_path)
+            else:
+                report.modified.remove(entry.rel_path)
+                report.removed.append(entry.rel_path)
+        if self.cache is not None:
+            self.cache.flush()
+
+    def _fill_totals(self, report: WatchReport) -> None:
+        """用内存中的逐文件摘要合并出 records 模式的文件夹摘要"""
+        report.digests = self._index.digests(self.file_digests)
+        report.digest = report.digests[self.algorithms[0]]
+        report.total_files = len(self.file_digests)
+        report.total_size = self._total_size
+        report.removed.sort()